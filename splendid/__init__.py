@@ -7,22 +7,23 @@ from __future__ import print_function
 https://github.com/pythoncircus/splendid
 """
 
-import datetime
+from itertools import islice
 import os
-import random
-from functools import wraps
-from timeit import default_timer as timer
 
-# noinspection PyUnresolvedReferences
-from six.moves import zip_longest
+# import splendid is kept fast (e.g., for short-lived CLI workers), so only
+# modules python imports on startup anyway are imported here, everything else
+# (and the submodules, see __getattr__) is imported on first use.
+from time import perf_counter as timer
 
 
 # we use http://semver.org
 __version__ = '1.1.1-dev'
 
 __all__ = [
+    'Stream',
     'chunker',
     'get_path',
+    'invalidate_dirs_cache',
     'make_dirs_for',
     'randbool',
     'run_once',
@@ -33,19 +34,131 @@ __all__ = [
 ]
 
 
+# submodules imported on first attribute access, e.g., splendid.windows
+_SUBMODULES = frozenset([
+    'aitertools',
+    'bench',
+    'broadcast',
+    'caching',
+    'combinatorics',
+    'extsort',
+    'files',
+    'itertools_recipies',
+    'metrics',
+    'parallel',
+    'paths',
+    'sampling',
+    'sets',
+    'stream',
+    'timedeltas',
+    'timing',
+    'vectors',
+    'windows',
+])
+
+
+# public names imported on first access from the given submodule
+_LAZY_NAMES = {
+    'Stream': 'stream',
+}
+
+
+def __getattr__(name):
+    """Lazily import submodules and _LAZY_NAMES on first access (python >=
+    3.7)."""
+    if name in _SUBMODULES or name in _LAZY_NAMES:
+        from importlib import import_module
+        module = import_module('.' + _LAZY_NAMES.get(name, name), __name__)
+        if name not in _LAZY_NAMES:
+            return module
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(
+        'module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES | set(_LAZY_NAMES))
+
+
+# (buffer types for which chunker(..., dtype=None) yields memoryview
+# windows, Sequence ABC), set on first use (array and collections.abc are
+# slow to import)
+_sequence_types_cache = []
+
+
+def _sequence_types():
+    if not _sequence_types_cache:
+        from array import array
+        from collections.abc import Sequence
+        _sequence_types_cache[:] = (
+            (bytes, bytearray, memoryview, array), Sequence)
+    return _sequence_types_cache
+
+
 def chunker(iterable, n, fillvalue=None, dtype=list):
-    """Like a grouper but last tuple is shorter.
+    """Like a grouper but last chunk is shorter.
 
     >>> list(chunker([1, 2, 3, 4, 5], 3))
     [[1, 2, 3], [4, 5]]
+
+    None values are kept, only an explicit fillvalue pads the last chunk:
+    >>> list(chunker([None, 1, None], 2))
+    [[None, 1], [None]]
+    >>> list(chunker('abcde', 2, fillvalue='x', dtype=''.join))
+    ['ab', 'cd', 'ex']
+
+    If the input already is of the requested dtype (e.g., a list for the
+    default dtype=list), chunks are created by slicing instead of iterating:
+    >>> list(chunker((1, 2, 3, 4, 5), 2, dtype=tuple))
+    [(1, 2), (3, 4), (5,)]
+
+    With dtype=None chunks are yielded in the input's native form without
+    copying elements where possible: buffers (bytes, bytearray, memoryview,
+    array.array) yield memoryview windows, other sequences (incl. numpy
+    arrays, which return views) yield slices and any other iterable yields
+    tuples:
+    >>> [bytes(c) for c in chunker(b'abcde', 2, dtype=None)]
+    [b'ab', b'cd', b'e']
+    >>> list(chunker(range(5), 2, dtype=None))
+    [range(0, 2), range(2, 4), range(4, 5)]
+    >>> list(chunker(iter('abc'), 2, dtype=None))
+    [('a', 'b'), ('c',)]
+
+    :param iterable: the iterable to split into chunks
+    :param n: maximal size of each chunk
+    :param fillvalue: if not None, used to pad the last chunk to size n
+    :param dtype: callable applied to each chunk or None for native chunks
+    :return: an iterator over the chunks
     """
     if n < 1:
         raise ValueError("can't chunk by n=%d" % n)
-    args = [iter(iterable)] * n
-    return (
-        dtype(e for e in t if e is not None)
-        for t in zip_longest(*args, fillvalue=fillvalue)
-    )
+    if fillvalue is None:
+        buffer_types, sequence = _sequence_types()
+        if dtype is None:
+            if isinstance(iterable, buffer_types):
+                return _slice_chunks(memoryview(iterable), n)
+            if isinstance(iterable, sequence) or hasattr(
+                    iterable, '__array_interface__'):
+                return _slice_chunks(iterable, n)
+        elif type(iterable) is dtype and isinstance(iterable, sequence):
+            return _slice_chunks(iterable, n)
+    return _islice_chunks(iter(iterable), n, fillvalue, dtype or tuple)
+
+
+def _slice_chunks(seq, n):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+
+def _islice_chunks(it, n, fillvalue, dtype):
+    while True:
+        chunk = tuple(islice(it, n))
+        if not chunk:
+            return
+        if fillvalue is not None and len(chunk) < n:
+            chunk += (fillvalue,) * (n - len(chunk))
+        yield chunk if dtype is tuple else dtype(chunk)
 
 
 def get_path(
@@ -57,7 +170,8 @@ def get_path(
 
     Useful to quickly extract information from nested data structures. Typical
     examples are nested dicts and lists that you for example obtained from
-    `json.loads()`.
+    `json.loads()`. If you look up the same paths over and over again (e.g.,
+    in many records), see splendid.paths.compile_path and extract_many.
 
     >>> get_path({'foo':[{'bar':3}]}, ['foo'], 'not found')
     [{'bar': 3}]
@@ -68,44 +182,107 @@ def get_path(
     >>> get_path({'foo':[{'bar':3}]}, ['foo', 0], 'not found')
     {'bar': 3}
 
+    Paths can contain the wildcards splendid.paths.WILDCARD (any list element
+    or dict value) and splendid.paths.RECURSIVE (any depth). In this case a
+    list of all matching values is returned:
+    >>> from splendid.paths import WILDCARD, RECURSIVE
+    >>> get_path({'foo':[{'bar':3}, {'bar': 4}, {}]}, ['foo', WILDCARD, 'bar'])
+    [3, 4]
+    >>> get_path({'a': {'id': 1, 'b': [{'id': 2}]}}, [RECURSIVE, 'id'])
+    [1, 2]
+    >>> get_path({'x': 1}, ['foo', WILDCARD])
+    []
+
     :param nested: a nested dictionary or list like structure
     :param key_path: an iterable resembling a path of keys
     :param default: returned if any key in the path isn't found
     :param expected_errors: expected errors, use for custom data structures
     :return: value of nested[k0][k1]...[kn] or default (default: None) on error
+        or a list of all matches if key_path contains wildcards
     """
     rest = nested
+    key_path = iter(key_path)
     for key in key_path:
         try:
             rest = rest[key]
         except expected_errors:
+            # wildcards are only checked on error to keep the fast path fast
+            from .paths import PathToken, iter_path
+            if isinstance(key, PathToken):
+                return list(iter_path(
+                    rest, (key,) + tuple(key_path), expected_errors))
+            if any(isinstance(k, PathToken) for k in key_path):
+                return []  # no matches for the wildcards (like compile_path)
             return default
     return rest
 
 
-def make_dirs_for(file_path):
+# absolute paths of dirs known to exist, see make_dirs_for
+_existing_dirs = set()
+
+
+def make_dirs_for(file_path, cache=True):
     """Try to create all necessary directories for file.
 
     Use like this:
     with open(make_dirs_for(my_filepath), 'w') as f:
         f.write("hello world")
+
+    Directories that exist (or were created) are remembered, so subsequent
+    calls for files in the same directory don't cost a syscall. If
+    directories are deleted by someone else, call invalidate_dirs_cache().
+
+    :param file_path: path of a file to be written
+    :param cache: remember the directory as existing
+    :return: file_path
+    :raises OSError: if the directory doesn't exist and can't be created
     """
+    dir_path = os.path.dirname(file_path)
+    if not dir_path:
+        return file_path
+    if not os.path.isabs(dir_path):
+        dir_path = os.path.abspath(dir_path)
+    if dir_path in _existing_dirs:
+        return file_path
     try:
-        os.makedirs(os.path.dirname(file_path))
+        os.makedirs(dir_path)
     except OSError:
-        pass
+        if not os.path.isdir(dir_path):
+            raise
+    if cache:
+        _existing_dirs.add(dir_path)
     return file_path
 
 
+def invalidate_dirs_cache(dir_path=None):
+    """Forget about dir_path and its subdirs (None: all) in make_dirs_for.
+
+    :param dir_path: directory that might have been removed or None
+    """
+    if dir_path is None:
+        _existing_dirs.clear()
+        return
+    dir_path = os.path.abspath(dir_path)
+    prefix = os.path.join(dir_path, '')
+    for d in list(_existing_dirs):
+        if d == dir_path or d.startswith(prefix):
+            _existing_dirs.discard(d)
+
+
 def randbool():
     """Randomly return True or False.
 
+    For many values (or biased ones) use splendid.sampling.randbools or
+    randbool_stream, which generate them in bulk.
+
+    >>> import random
     >>> random.seed(43)
     >>> randbool()
     False
     >>> randbool()
     True
     """
+    import random
     return bool(random.randint(0, 1))
 
 
@@ -132,19 +309,44 @@ def run_once(func):
     >>> for i in range(10):
     ...     foo()
     bar
+
+    The first successful call's result is returned by all later calls (their
+    arguments are ignored):
+    >>> @run_once
+    ... def load():
+    ...     print('loading')
+    ...     return 42
+    >>> load(), load()
+    loading
+    (42, 42)
+
+    It's thread-safe: concurrent first calls wait for the one running func.
+    If func raises, the next call will try again. For a cache depending on
+    arguments see splendid.caching.memoize.
     """
+    from functools import wraps
+    from threading import Lock
+    lock = Lock()
+
     @wraps(func)
     def wrapper(*args, **kwds):
         if not wrapper.ran:
-            wrapper.ran = True
-            return func(*args, **kwds)
+            with lock:
+                if not wrapper.ran:
+                    wrapper.result = func(*args, **kwds)
+                    wrapper.ran = True
+        return wrapper.result
     wrapper.ran = False
+    wrapper.result = None
     return wrapper
 
 
 def time_func(func, *args, **kwds):
     """Calls func with given args and returns a (seconds, res) tuple.
 
+    This times a single call. For fast functions use
+    splendid.timing.benchmark, which repeats calls and reports statistics.
+
     >>> def foo(a, b):
     ...    return a + b
     >>> t, res = time_func(foo, 1, b=2)
@@ -171,6 +373,7 @@ def timedelta_to_microseconds(td):
 
     Also see timedelta_to_ms and timedelta_to_s below.
 
+    >>> import datetime
     >>> dt1 = datetime.datetime(2010, 10, 28, 19, 14, 12, 1539)
     >>> dt1
     datetime.datetime(2010, 10, 28, 19, 14, 12, 1539)
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""Async versions of the itertools recipes and chunker.
+
+All functions accept async iterables as well as plain (sync) iterables. The
+ones returning a single result (alist, atake, aconsume, anth) are coroutines,
+all others are async generators.
+
+aroundrobin and amerge pull from all their sources concurrently, so a source
+stalling on I/O doesn't keep the others (and the event loop) idle.
+
+Requires python >= 3.7.
+"""
+
+import asyncio
+from collections import deque
+
+
+__all__ = [
+    'achunker',
+    'aconsume',
+    'aflatten',
+    'agrouper',
+    'alist',
+    'amerge',
+    'anth',
+    'apairwise',
+    'aroundrobin',
+    'atake',
+    'aunique_everseen',
+    'aunique_justseen',
+]
+
+
+def _aiter(iterable):
+    """Return an async iterator for an async or sync iterable."""
+    if hasattr(iterable, '__aiter__'):
+        return iterable.__aiter__()
+    return _sync_to_async(iterable)
+
+
+async def _sync_to_async(iterable):
+    for element in iterable:
+        yield element
+
+
+async def alist(iterable):
+    """Collect all items of an (async) iterable into a list.
+
+    >>> asyncio.run(alist(range(3)))
+    [0, 1, 2]
+    """
+    return [element async for element in _aiter(iterable)]
+
+
+async def atake(n, iterable):
+    """Return first n items of the iterable as a list.
+
+    >>> from itertools import count
+    >>> asyncio.run(atake(5, count()))
+    [0, 1, 2, 3, 4]
+    >>> asyncio.run(atake(5, [1, 2, 3]))
+    [1, 2, 3]
+    """
+    res = []
+    if n <= 0:
+        return res
+    append = res.append
+    async for element in _aiter(iterable):
+        append(element)
+        if len(res) >= n:
+            break
+    return res
+
+
+async def aconsume(iterator, n):
+    """Advance the async iterator n-steps ahead. If n is none, consume entirely.
+
+    >>> async def demo():
+    ...     it = _aiter(range(6))
+    ...     await aconsume(it, 2)
+    ...     first = await atake(1, it)
+    ...     await aconsume(it, None)
+    ...     return first, await alist(it)
+    >>> asyncio.run(demo())
+    ([2], [])
+
+    Plain iterators are advanced as well:
+    >>> it = iter(range(6))
+    >>> asyncio.run(aconsume(it, 4))
+    >>> next(it)
+    4
+    """
+    # async iterators are returned as is, so they're advanced in place
+    iterator = _aiter(iterator)
+    if n is None:
+        async for _ in iterator:
+            pass
+    elif n > 0:
+        i = 0
+        async for _ in iterator:
+            i += 1
+            if i >= n:
+                break
+
+
+async def anth(iterable, n, default=None):
+    """Returns the nth item or a default value.
+
+    >>> asyncio.run(anth([1, 1, 2, 3, 5, 8, 13], 5))
+    8
+    >>> asyncio.run(anth([1, 1, 2], 10, 'nope'))
+    'nope'
+    """
+    i = 0
+    async for element in _aiter(iterable):
+        if i == n:
+            return element
+        i += 1
+    return default
+
+
+async def apairwise(iterable):
+    """s -> (s0,s1), (s1,s2), (s2, s3), ...
+
+    >>> asyncio.run(alist(apairwise('abc')))
+    [('a', 'b'), ('b', 'c')]
+    >>> asyncio.run(alist(apairwise([1])))
+    []
+    """
+    it = _aiter(iterable)
+    try:
+        prev = await it.__anext__()
+    except StopAsyncIteration:
+        return
+    async for element in it:
+        yield prev, element
+        prev = element
+
+
+async def achunker(iterable, n, fillvalue=None, dtype=list):
+    """Like a grouper but last chunk is shorter (see splendid.chunker).
+
+    >>> asyncio.run(alist(achunker([1, 2, 3, 4, 5], 3)))
+    [[1, 2, 3], [4, 5]]
+    >>> asyncio.run(alist(achunker('abcde', 2, 'x', ''.join)))
+    ['ab', 'cd', 'ex']
+    """
+    if n < 1:
+        raise ValueError("can't chunk by n=%d" % n)
+    chunk = []
+    append = chunk.append
+    async for element in _aiter(iterable):
+        append(element)
+        if len(chunk) == n:
+            yield dtype(chunk)
+            chunk = []
+            append = chunk.append
+    if chunk:
+        if fillvalue is not None:
+            chunk.extend([fillvalue] * (n - len(chunk)))
+        yield dtype(chunk)
+
+
+async def agrouper(iterable, n, fillvalue=None):
+    """Collect data into fixed-length chunks or blocks.
+
+    >>> asyncio.run(alist(agrouper('ABCDEFG', 3, 'x')))
+    [('A', 'B', 'C'), ('D', 'E', 'F'), ('G', 'x', 'x')]
+    >>> asyncio.run(alist(agrouper('ABCDEFG', 3)))
+    [('A', 'B', 'C'), ('D', 'E', 'F'), ('G', None, None)]
+    """
+    chunk = []
+    append = chunk.append
+    async for element in _aiter(iterable):
+        append(element)
+        if len(chunk) == n:
+            yield tuple(chunk)
+            chunk = []
+            append = chunk.append
+    if chunk:
+        yield tuple(chunk) + (fillvalue,) * (n - len(chunk))
+
+
+async def aflatten(list_of_lists):
+    """Flatten one level of nesting, inner iterables may be sync or async.
+
+    >>> asyncio.run(alist(aflatten([[1, 2, 3], _aiter([4, 5, 6])])))
+    [1, 2, 3, 4, 5, 6]
+    """
+    async for inner in _aiter(list_of_lists):
+        if hasattr(inner, '__aiter__'):
+            async for element in inner:
+                yield element
+        else:
+            for element in inner:
+                yield element
+
+
+async def aunique_everseen(iterable, key=None):
+    """List unique elements, preserving order. Remember all elements ever seen.
+
+    >>> asyncio.run(alist(aunique_everseen('AAAABBBCCDAABBB')))
+    ['A', 'B', 'C', 'D']
+    >>> asyncio.run(alist(aunique_everseen('ABBCcAD', str.lower)))
+    ['A', 'B', 'C', 'D']
+    """
+    seen = set()
+    seen_add = seen.add
+    async for element in _aiter(iterable):
+        k = element if key is None else key(element)
+        if k not in seen:
+            seen_add(k)
+            yield element
+
+
+async def aunique_justseen(iterable, key=None):
+    """List unique elements, preserving order. Remember only element just seen.
+
+    >>> asyncio.run(alist(aunique_justseen('AAAABBBCCDAABBB')))
+    ['A', 'B', 'C', 'D', 'A', 'B']
+    >>> asyncio.run(alist(aunique_justseen('ABBCcAD', str.lower)))
+    ['A', 'B', 'C', 'A', 'D']
+    """
+    marker = prev = object()
+    async for element in _aiter(iterable):
+        k = element if key is None else key(element)
+        if prev is marker or k != prev:
+            prev = k
+            yield element
+
+
+async def aroundrobin(*iterables):
+    """aroundrobin('ABC', 'D', 'EF') --> A D E B F C
+
+    Items are yielded in round robin order, but the next item of every source
+    is fetched concurrently, so slow sources overlap their waiting times.
+
+    >>> asyncio.run(alist(aroundrobin('ABC', 'D', 'EF')))
+    ['A', 'D', 'E', 'B', 'F', 'C']
+    """
+    ensure_future = asyncio.ensure_future
+    its = deque(_aiter(it) for it in iterables)
+    tasks = deque(ensure_future(it.__anext__()) for it in its)
+    try:
+        while tasks:
+            task = tasks.popleft()
+            it = its.popleft()
+            try:
+                element = await task
+            except StopAsyncIteration:
+                continue
+            its.append(it)
+            tasks.append(ensure_future(it.__anext__()))
+            yield element
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def amerge(*iterables):
+    """Merge several (async) iterables, yielding items as soon as available.
+
+    Unlike aroundrobin no order between the sources is kept: all sources are
+    polled concurrently and whichever produces an item first wins. The order
+    of items from the same source is preserved.
+
+    >>> sorted(asyncio.run(alist(amerge('ABC', 'D', 'EF'))))
+    ['A', 'B', 'C', 'D', 'E', 'F']
+    """
+    ensure_future = asyncio.ensure_future
+    pending = {}
+    for it in map(_aiter, iterables):
+        pending[ensure_future(it.__anext__())] = it
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            # keep the order of the sources for items that are ready together
+            for task in [t for t in pending if t in done]:
+                it = pending.pop(task)
+                try:
+                    element = task.result()
+                except StopAsyncIteration:
+                    continue
+                pending[ensure_future(it.__anext__())] = it
+                yield element
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,662 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Benchmark suite and regression check for splendid.itertools_recipies.
+
+Every public recipe (and splendid.chunker) is timed on several input sizes
+and shapes, next to equivalents using plain itertools (global lookups, no
+local default vars) and naive pure python loops. Results are stored as JSON
+and can be compared against a saved baseline:
+
+    python -m splendid.bench --output baseline.json
+    # ... change things ...
+    python -m splendid.bench --baseline baseline.json --threshold 1.2
+
+The second call exits with status 1 if any benchmark got slower than
+threshold times its baseline median.
+"""
+
+import argparse
+from array import array
+import collections
+from collections import OrderedDict
+import datetime
+from itertools import chain
+from itertools import combinations
+from itertools import count
+from itertools import groupby
+from itertools import islice
+from itertools import repeat
+from itertools import starmap
+from itertools import tee
+from itertools import zip_longest
+import json
+import math
+import operator
+import platform
+import random
+import re
+import sys
+
+from . import chunker
+from . import get_path
+from . import make_dirs_for
+from . import vectors
+from .itertools_recipies import all_equal
+from .itertools_recipies import consume
+from .itertools_recipies import dotproduct
+from .itertools_recipies import flatten
+from .itertools_recipies import grouper
+from .itertools_recipies import interleave
+from .itertools_recipies import iter_except
+from .itertools_recipies import ncycles
+from .itertools_recipies import nth
+from .itertools_recipies import padnone
+from .itertools_recipies import pairwise
+from .itertools_recipies import powerset
+from .itertools_recipies import quantify
+from .itertools_recipies import random_combination
+from .itertools_recipies import random_combination_with_replacement
+from .itertools_recipies import random_permutation
+from .itertools_recipies import random_product
+from .itertools_recipies import repeatfunc
+from .itertools_recipies import roundrobin
+from .itertools_recipies import tabulate
+from .itertools_recipies import take
+from .itertools_recipies import unique_everseen
+from .itertools_recipies import unique_justseen
+from .paths import PathIndex
+from .paths import compile_path
+from .stream import Stream
+from .timing import Benchmark
+
+
+__all__ = [
+    'CASES',
+    'case',
+    'compare_to_baseline',
+    'main',
+    'run',
+]
+
+
+DEFAULT_SIZES = (100, 10000)
+
+# name: function(size) returning a dict of variant name: callable
+CASES = OrderedDict()
+
+
+def case(name):
+    """Decorator registering a benchmark case under name.
+
+    The decorated function is called with the input size and returns a dict
+    mapping variant names (e.g., 'recipe', 'itertools', 'naive') to
+    callables without arguments. Callables should create fresh iterators
+    from prepared data, so each call does the same work.
+    """
+    def decorator(func):
+        CASES[name] = func
+        return func
+    return decorator
+
+
+def _exhaust(iterable, _deque=collections.deque):
+    _deque(iterable, maxlen=0)
+
+
+def _with_arrays(variants, data, func):
+    """Add 'recipe_array' and (if NumPy is installed) 'recipe_numpy' variants
+    calling func on data as array.array and 1-D NumPy array."""
+    arr = array('q', data)
+    variants['recipe_array'] = lambda: func(arr)
+    try:
+        import numpy
+    except ImportError:
+        return variants
+    np_arr = numpy.array(data)
+    variants['recipe_numpy'] = lambda: func(np_arr)
+    return variants
+
+
+@case('take')
+def _bench_take(size):
+    data = list(range(size))
+    k = size // 2
+
+    def naive():
+        res = []
+        for i, x in enumerate(data):
+            if i >= k:
+                break
+            res.append(x)
+        return res
+
+    return _with_arrays({
+        'recipe': lambda: take(k, data),
+        'recipe_iter': lambda: take(k, iter(data)),
+        'itertools': lambda: list(islice(data, k)),
+        'slice': lambda: data[:k],
+        'naive': naive,
+    }, data, lambda seq: take(k, seq))
+
+
+@case('tabulate')
+def _bench_tabulate(size):
+    return {
+        'recipe': lambda: _exhaust(islice(tabulate(abs), size)),
+        'itertools': lambda: _exhaust(islice(map(abs, count()), size)),
+        'naive': lambda: [abs(i) for i in range(size)],
+    }
+
+
+@case('consume')
+def _bench_consume(size):
+    data = list(range(size))
+
+    def naive():
+        it = iter(data)
+        for _ in range(size - 1):
+            next(it)
+
+    return _with_arrays({
+        'recipe': lambda: consume(iter(data), size - 1),
+        'recipe_all': lambda: consume(iter(data), None),
+        'recipe_generator': lambda: consume(
+            (x for x in data), size - 1),
+        'itertools': lambda: next(islice(iter(data), size - 1, size - 1), None),
+        'naive': naive,
+    }, data, lambda seq: consume(iter(seq), size - 1))
+
+
+@case('nth')
+def _bench_nth(size):
+    data = list(range(size))
+    k = size - 1
+
+    def naive():
+        for i, x in enumerate(data):
+            if i == k:
+                return x
+
+    return _with_arrays({
+        'recipe': lambda: nth(data, k),
+        'recipe_iter': lambda: nth(iter(data), k),
+        'recipe_generator': lambda: nth((x for x in data), k),
+        'itertools': lambda: next(islice(data, k, None), None),
+        'index': lambda: data[k],
+        'naive': naive,
+    }, data, lambda seq: nth(seq, k))
+
+
+@case('all_equal')
+def _bench_all_equal(size):
+    data = [1] * size
+
+    def naive():
+        it = iter(data)
+        first = next(it, None)
+        for x in it:
+            if x != first:
+                return False
+        return True
+
+    def itertools_():
+        g = groupby(data)
+        return next(g, True) and not next(g, False)
+
+    return _with_arrays({
+        'recipe': lambda: all_equal(data),
+        'recipe_iter': lambda: all_equal(iter(data)),
+        'itertools': itertools_,
+        'count': lambda: not data or data.count(data[0]) == len(data),
+        'naive': naive,
+    }, data, all_equal)
+
+
+@case('quantify')
+def _bench_quantify(size):
+    data = [i % 3 for i in range(size)]
+    return _with_arrays({
+        'recipe': lambda: quantify(data),
+        'recipe_iter': lambda: quantify(iter(data)),
+        'itertools': lambda: sum(map(bool, data)),
+        'filter': lambda: len(list(filter(None, data))),
+        'naive': lambda: sum(1 for x in data if x),
+    }, data, quantify)
+
+
+@case('padnone')
+def _bench_padnone(size):
+    data = list(range(size))
+    return {
+        'recipe': lambda: _exhaust(islice(padnone(data), 2 * size)),
+        'itertools': lambda: _exhaust(
+            islice(chain(data, repeat(None)), 2 * size)),
+    }
+
+
+@case('ncycles')
+def _bench_ncycles(size):
+    data = list(range(10))
+    n = size // 10
+    return {
+        'recipe': lambda: _exhaust(ncycles(data, n)),
+        'itertools': lambda: _exhaust(
+            chain.from_iterable(repeat(tuple(data), n))),
+        'naive': lambda: [x for _ in range(n) for x in data],
+    }
+
+
+@case('dotproduct')
+def _bench_dotproduct(size):
+    v1 = [float(i) for i in range(size)]
+    v2 = [float(i % 7) for i in range(size)]
+
+    def naive():
+        s = 0.
+        for a, b in zip(v1, v2):
+            s += a * b
+        return s
+
+    return {
+        'recipe': lambda: dotproduct(v1, v2),
+        'itertools': lambda: sum(map(operator.mul, v1, v2)),
+        'naive': naive,
+        'vectors': lambda: vectors.dotproduct(v1, v2),
+    }
+
+
+@case('flatten')
+def _bench_flatten(size):
+    data = [list(range(10)) for _ in range(size // 10)]
+    return {
+        'recipe': lambda: _exhaust(flatten(data)),
+        'itertools': lambda: _exhaust(chain.from_iterable(data)),
+        'naive': lambda: [x for sub in data for x in sub],
+    }
+
+
+@case('repeatfunc')
+def _bench_repeatfunc(size):
+    return {
+        'recipe': lambda: _exhaust(repeatfunc(abs, size, -1)),
+        'itertools': lambda: _exhaust(starmap(abs, repeat((-1,), size))),
+        'naive': lambda: [abs(-1) for _ in range(size)],
+    }
+
+
+@case('pairwise')
+def _bench_pairwise(size):
+    data = list(range(size))
+
+    def itertools_():
+        a, b = tee(data)
+        next(b, None)
+        return _exhaust(zip(a, b))
+
+    return {
+        'recipe': lambda: _exhaust(pairwise(data)),
+        'itertools': itertools_,
+        'slices': lambda: _exhaust(zip(data, data[1:])),
+        'naive': lambda: [(data[i], data[i + 1]) for i in range(size - 1)],
+    }
+
+
+@case('grouper')
+def _bench_grouper(size):
+    data = list(range(size))
+    return {
+        'recipe': lambda: _exhaust(grouper(data, 7)),
+        'itertools': lambda: _exhaust(zip_longest(*[iter(data)] * 7)),
+        'naive': lambda: [
+            tuple(data[i:i + 7]) for i in range(0, size, 7)],
+    }
+
+
+@case('chunker')
+def _bench_chunker(size):
+    data = list(range(size))
+    return {
+        'recipe': lambda: _exhaust(chunker(data, 7)),
+        'recipe_iter': lambda: _exhaust(chunker(iter(data), 7)),
+        'recipe_native': lambda: _exhaust(chunker(data, 7, dtype=None)),
+        'naive': lambda: [data[i:i + 7] for i in range(0, size, 7)],
+    }
+
+
+@case('roundrobin')
+def _bench_roundrobin(size):
+    few = [list(range(size // 4))] * 4
+    # many short and some long sources, all exhausted at different times
+    many = [list(range(i % 10)) for i in range(size // 5)]
+
+    def naive(iterables):
+        its = [iter(it) for it in iterables]
+        while its:
+            alive = []
+            for it in its:
+                for x in it:
+                    alive.append(it)
+                    yield x
+                    break
+            its = alive
+
+    return {
+        'recipe_4': lambda: _exhaust(roundrobin(*few)),
+        'naive_4': lambda: _exhaust(naive(few)),
+        'recipe_many': lambda: _exhaust(roundrobin(*many)),
+        'naive_many': lambda: _exhaust(naive(many)),
+        'interleave_4': lambda: _exhaust(interleave(*few)),
+        'interleave_many': lambda: _exhaust(interleave(*many)),
+    }
+
+
+@case('interleave')
+def _bench_interleave(size):
+    # fan-in from 1000+ sources of which many are short
+    num = max(1000, size // 10)
+    sources = [list(range((i * 7) % (2 * size // num + 1))) for i in range(num)]
+    weights = [1 + i % 3 for i in range(num)]
+    return {
+        'roundrobin': lambda: _exhaust(roundrobin(*sources)),
+        'recipe': lambda: _exhaust(interleave(*sources)),
+        'recipe_batch_32': lambda: _exhaust(interleave(*sources, batch=32)),
+        'recipe_weighted': lambda: _exhaust(
+            interleave(*sources, weights=weights)),
+    }
+
+
+@case('stream')
+def _bench_stream(size):
+    # map/filter/map + chunk/flatten + unique pipeline
+    data = list(range(size))
+
+    def triple(x):
+        return x * 3
+
+    def odd(x):
+        return x % 2
+
+    def mod(x):
+        return x % 1000
+
+    def generators():
+        it = (triple(x) for x in data)
+        it = (x for x in it if odd(x))
+        it = (mod(x) for x in it)
+        return unique_everseen(flatten(chunker(it, 100)))
+
+    return {
+        'generators': lambda: _exhaust(generators()),
+        'builtins': lambda: _exhaust(unique_everseen(flatten(chunker(
+            map(mod, filter(odd, map(triple, data))), 100)))),
+        'stream': lambda: _exhaust(
+            Stream(data).map(triple).filter(odd).map(mod).chunk(100)
+            .flatten().unique()),
+    }
+
+
+@case('path_index')
+def _bench_path_index(size):
+    # find the records of a user (about 10 per user) and a range of users
+    records = [
+        {'user': {'id': i % (size // 10 + 1)}, 'n': i} for i in range(size)]
+    uid = size // 20
+    path = ['user', 'id']
+    index = PathIndex(records, path)
+    index.range(0)  # build the sorted keys
+    get_uid = compile_path(path)
+
+    return {
+        'index': lambda: index.get(uid),
+        'index_range': lambda: index.range(uid, uid + 10),
+        'compiled_scan': lambda: [r for r in records if get_uid(r) == uid],
+        'naive': lambda: [r for r in records if get_path(r, path) == uid],
+        'build': lambda: PathIndex(records, path),
+    }
+
+
+@case('powerset')
+def _bench_powerset(size):
+    data = list(range(int(math.log(size, 2)) + 1))
+
+    def naive():
+        res = [()]
+        for x in data:
+            res += [s + (x,) for s in res]
+        return res
+
+    return {
+        'recipe': lambda: _exhaust(powerset(data)),
+        'itertools': lambda: _exhaust(chain.from_iterable(
+            combinations(data, r) for r in range(len(data) + 1))),
+        'naive': naive,
+    }
+
+
+@case('unique_everseen')
+def _bench_unique_everseen(size):
+    data = [i % (size // 10 + 1) for i in range(size)]
+    strs = [str(x) for x in data]
+
+    def naive():
+        seen = set()
+        res = []
+        for x in data:
+            if x not in seen:
+                seen.add(x)
+                res.append(x)
+        return res
+
+    return {
+        'recipe': lambda: _exhaust(unique_everseen(data)),
+        'recipe_key': lambda: _exhaust(unique_everseen(strs, key=str.lower)),
+        'dict': lambda: list(dict.fromkeys(data)),
+        'naive': naive,
+    }
+
+
+@case('unique_justseen')
+def _bench_unique_justseen(size):
+    data = [i // 3 for i in range(size)]
+
+    def naive():
+        res = []
+        prev = object()
+        for x in data:
+            if x != prev:
+                res.append(x)
+                prev = x
+        return res
+
+    return {
+        'recipe': lambda: _exhaust(unique_justseen(data)),
+        'itertools': lambda: _exhaust(
+            map(next, map(operator.itemgetter(1), groupby(data)))),
+        'naive': naive,
+    }
+
+
+@case('iter_except')
+def _bench_iter_except(size):
+    data = list(range(size))
+
+    def naive():
+        d = collections.deque(data)
+        while d:
+            d.popleft()
+
+    return {
+        'recipe': lambda: _exhaust(iter_except(
+            collections.deque(data).popleft, IndexError)),
+        'naive': naive,
+    }
+
+
+@case('random_product')
+def _bench_random_product(size):
+    pools = [list(range(10))] * 3
+    return {
+        'recipe': lambda: [random_product(*pools) for _ in range(size // 10)],
+        'naive': lambda: [
+            tuple(random.choice(p) for p in pools)
+            for _ in range(size // 10)],
+    }
+
+
+@case('random_permutation')
+def _bench_random_permutation(size):
+    data = list(range(20))
+    return {
+        'recipe': lambda: [
+            random_permutation(data, 5) for _ in range(size // 10)],
+        'naive': lambda: [
+            tuple(random.sample(data, 5)) for _ in range(size // 10)],
+    }
+
+
+@case('random_combination')
+def _bench_random_combination(size):
+    data = list(range(20))
+    return {
+        'recipe': lambda: [
+            random_combination(data, 5) for _ in range(size // 10)],
+        'naive': lambda: [
+            tuple(sorted(random.sample(data, 5))) for _ in range(size // 10)],
+    }
+
+
+@case('random_combination_with_replacement')
+def _bench_random_combination_with_replacement(size):
+    data = list(range(20))
+    return {
+        'recipe': lambda: [
+            random_combination_with_replacement(data, 5)
+            for _ in range(size // 10)],
+    }
+
+
+def run(names=None, sizes=DEFAULT_SIZES, bench=None, out=None):
+    """Run the given benchmark cases (default: all), return results dict.
+
+    :param names: iterable of case names or None for all
+    :param sizes: input sizes to run each case with
+    :param bench: splendid.timing.Benchmark instance (default settings if
+        None)
+    :param out: file like object to print progress to (None: silent)
+    :return: dict with 'meta' information and 'results' mapping
+        'case/size/variant' to BenchmarkResult.to_dict() dicts
+    """
+    bench = bench or Benchmark(repeat=5, min_time=0.05)
+    results = OrderedDict()
+    for name in names or CASES:
+        for size in sizes:
+            variants = CASES[name](size)
+            for variant in sorted(variants):
+                key = '%s/%d/%s' % (name, size, variant)
+                res = bench.run(variants[variant])
+                res.name = key
+                results[key] = res.to_dict()
+                if out is not None:
+                    print(res, file=out)
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(),
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare_to_baseline(current, baseline, threshold=1.2):
+    """Compare two run() results, return list of regressions.
+
+    A regression is a benchmark in both results whose current median is more
+    than threshold times its baseline median.
+
+    >>> base = {'results': {'a': {'median': 1.}, 'b': {'median': 1.}}}
+    >>> cur = {'results': {'a': {'median': 1.1}, 'b': {'median': 1.5}}}
+    >>> compare_to_baseline(cur, base)
+    [('b', 1.0, 1.5, 1.5)]
+
+    :return: list of (key, baseline median, current median, ratio) tuples
+    """
+    regressions = []
+    base = baseline['results']
+    for key, res in current['results'].items():
+        if key not in base:
+            continue
+        ratio = res['median'] / base[key]['median']
+        if ratio > threshold:
+            regressions.append(
+                (key, base[key]['median'], res['median'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m splendid.bench',
+        description='Benchmark suite and regression check for '
+                    'splendid.itertools_recipies.')
+    parser.add_argument(
+        '-k', '--filter', default=None,
+        help='only run cases whose name matches this regular expression')
+    parser.add_argument(
+        '-s', '--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+        help='input sizes (default: %(default)s)')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help='trials per benchmark (default: %(default)s)')
+    parser.add_argument(
+        '-t', '--min-time', type=float, default=0.05,
+        help='min seconds per trial (default: %(default)s)')
+    parser.add_argument(
+        '-o', '--output', default=None,
+        help='write results as JSON to this file')
+    parser.add_argument(
+        '-b', '--baseline', default=None,
+        help='JSON results of a previous run to compare against')
+    parser.add_argument(
+        '--threshold', type=float, default=1.2,
+        help='max allowed ratio of current / baseline median '
+             '(default: %(default)s)')
+    parser.add_argument(
+        '-l', '--list', action='store_true',
+        help='list available cases and exit')
+    parser.add_argument(
+        '-q', '--quiet', action='store_true',
+        help="don't print individual results")
+    args = parser.parse_args(argv)
+
+    names = list(CASES)
+    if args.filter:
+        names = [n for n in names if re.search(args.filter, n)]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    bench = Benchmark(repeat=args.repeat, min_time=args.min_time)
+    results = run(
+        names, args.sizes, bench, out=None if args.quiet else sys.stdout)
+    if args.output:
+        with open(make_dirs_for(args.output), 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for key, base, cur, ratio in regressions:
+            print('REGRESSION %s: %.3g s -> %.3g s (%.2fx slower)' % (
+                key, base, cur, ratio))
+        if regressions:
+            return 1
+        print('no regressions (threshold %.2fx)' % args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
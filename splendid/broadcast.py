@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Bounded, thread-safe fan-out of one iterable to several consumers.
+
+itertools.tee buffers without bound when one of its iterators lags behind
+and its iterators must not be used from different threads. broadcast feeds
+one source to n consumer iterators through a shared ring buffer of fixed
+size: when the slowest consumer is maxbuffer items behind the fastest, the
+fastest one blocks (backpressure) or raises BufferFull. The source is only
+advanced by one consumer at a time, each item is pulled once.
+"""
+
+from threading import Condition
+from threading import Lock
+
+
+__all__ = [
+    'Broadcast',
+    'BufferFull',
+    'broadcast',
+]
+
+
+class BufferFull(RuntimeError):
+    """Raised by a consumer that is maxbuffer items ahead of the slowest."""
+
+
+def broadcast(iterable, n=2, maxbuffer=1024, block=True, timeout=None):
+    """Split iterable into n consumer iterators (like tee), bounded.
+
+    >>> a, b = broadcast(range(5), 2, maxbuffer=2, block=False)
+    >>> next(a), next(a), next(b), next(a)
+    (0, 1, 0, 2)
+    >>> a.lag, b.lag
+    (0, 2)
+
+    Single-threaded, a consumer that gets too far ahead can't wait for the
+    others, so use block=False (or a large enough maxbuffer) there:
+    >>> next(a)
+    Traceback (most recent call last):
+    ...
+    splendid.broadcast.BufferFull: consumer 0 is 2 items ahead of the slowest
+    >>> next(b), next(b), next(a), list(b), list(a)
+    (1, 2, 3, [3, 4], [4])
+
+    Each consumer can be used from its own thread (usually a sink):
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> consumers = broadcast(iter(range(10000)), 3, maxbuffer=64)
+    >>> with ThreadPoolExecutor(3) as pool:
+    ...     sums = list(pool.map(sum, consumers))
+    >>> sums
+    [49995000, 49995000, 49995000]
+    >>> consumers[0].broadcast.stats()['produced']
+    10000
+
+    Consumers that stop early should be closed (or used as context
+    managers), so they no longer hold back the others.
+
+    :param iterable: the source, consumed lazily
+    :param n: number of consumers
+    :param maxbuffer: max number of items buffered for the slowest consumer
+    :param block: if a consumer that is maxbuffer items ahead waits for the
+        slowest one (True) or raises BufferFull (False)
+    :param timeout: max seconds to block before raising BufferFull (None:
+        wait forever)
+    :return: a tuple of n Consumer iterators
+    """
+    return Broadcast(iterable, n, maxbuffer, block, timeout).consumers
+
+
+class Consumer(object):
+    """Iterator over the items of a Broadcast (thread-safe)."""
+    def __init__(self, broadcast, index):
+        self.broadcast = broadcast
+        self.index = index
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.broadcast._next(self.index)
+
+    @property
+    def lag(self):
+        """Number of items buffered for this consumer."""
+        return self.broadcast.lag(self.index)
+
+    def close(self):
+        """Stop consuming, the others are no longer held back by this one."""
+        self.broadcast._close(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return '<Consumer %d, lag %d>' % (self.index, self.lag)
+
+
+class Broadcast(object):
+    """Shared state of the consumers of broadcast(), see there.
+
+    Item k of the source is stored at position k % maxbuffer of the ring
+    buffer, each consumer only remembers the index of its next item.
+    """
+    def __init__(self, iterable, n=2, maxbuffer=1024, block=True,
+                 timeout=None):
+        if n < 1:
+            raise ValueError('n must be >= 1, got %r' % (n,))
+        if maxbuffer < 1:
+            raise ValueError('maxbuffer must be >= 1, got %r' % (maxbuffer,))
+        self._source = iter(iterable)
+        self.maxbuffer = maxbuffer
+        self.block = block
+        self.timeout = timeout
+        self._buffer = [None] * maxbuffer
+        self._lock = Lock()
+        self._cond = Condition(self._lock)
+        # index of the next item of each consumer (None: closed)
+        self._positions = [0] * n
+        # lower bound of the slowest position (positions only increase)
+        self._min = 0
+        self._produced = 0
+        self._fetching = False
+        # StopIteration or the source's exception and its traceback
+        self._end = None
+        self._end_tb = None
+        self._waits = [0] * n
+        self._waiting = 0  # number of consumers waiting on _cond
+        self.consumers = tuple(Consumer(self, i) for i in range(n))
+
+    def _min_position(self):
+        positions = [p for p in self._positions if p is not None]
+        self._min = min(positions) if positions else self._produced
+        return self._min
+
+    def _next(self, i):
+        with self._lock:
+            while True:
+                pos = self._positions[i]
+                if pos is None:
+                    raise StopIteration
+                if pos < self._produced:
+                    item = self._buffer[pos % self.maxbuffer]
+                    self._positions[i] = pos + 1
+                    if self._waiting:
+                        # this might have been the slowest consumer
+                        self._cond.notify_all()
+                    return item
+                if self._end is StopIteration:
+                    raise StopIteration
+                if self._end is not None:
+                    # reset the traceback, as each raise of the shared
+                    # exception would add to it
+                    raise self._end.with_traceback(self._end_tb)
+                if self._fetching:
+                    self._wait()
+                    continue
+                if (self._produced - self._min >= self.maxbuffer and
+                        self._produced - self._min_position() >=
+                        self.maxbuffer):
+                    self._wait_for_space(i)
+                    continue
+                self._fetching = True
+                break
+        # pull the next item without holding the lock, so the others can
+        # read buffered items meanwhile
+        try:
+            item = next(self._source)
+        except BaseException as e:
+            with self._lock:
+                self._fetching = False
+                if isinstance(e, StopIteration):
+                    self._end = StopIteration
+                else:
+                    self._end = e
+                    self._end_tb = e.__traceback__
+                self._cond.notify_all()
+            raise
+        with self._lock:
+            self._buffer[self._produced % self.maxbuffer] = item
+            self._produced += 1
+            self._positions[i] += 1
+            self._fetching = False
+            if self._waiting:
+                self._cond.notify_all()
+        return item
+
+    def _wait(self, timeout=None):
+        self._waiting += 1
+        try:
+            return self._cond.wait(timeout)
+        finally:
+            self._waiting -= 1
+
+    def _wait_for_space(self, i):
+        if not self.block:
+            raise BufferFull(
+                'consumer %d is %d items ahead of the slowest'
+                % (i, self._produced - self._min))
+        self._waits[i] += 1
+        if not self._wait(self.timeout):
+            raise BufferFull(
+                'consumer %d waited %s s for the slowest' % (i, self.timeout))
+
+    def _close(self, i):
+        with self._lock:
+            self._positions[i] = None
+            self._cond.notify_all()
+
+    def lag(self, i):
+        """Number of items buffered for consumer i (0 if closed)."""
+        with self._lock:
+            pos = self._positions[i]
+            return 0 if pos is None else self._produced - pos
+
+    def stats(self):
+        """Dict of produced items and per consumer lags and backpressure
+        waits."""
+        with self._lock:
+            lags = [
+                0 if p is None else self._produced - p
+                for p in self._positions]
+            return {
+                'produced': self._produced,
+                'maxbuffer': self.maxbuffer,
+                'lags': lags,
+                'max_lag': max(lags),
+                'waits': list(self._waits),
+                'closed': [p is None for p in self._positions],
+            }
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Thread-safe memoization with LRU and TTL eviction.
+
+Also see splendid.run_once for functions that only need to run once.
+"""
+
+from collections import namedtuple
+from collections import OrderedDict
+from functools import wraps
+from threading import Event
+from threading import Lock
+from time import monotonic as _clock
+from timeit import default_timer as timer
+
+
+__all__ = [
+    'CacheInfo',
+    'memoize',
+]
+
+
+CacheInfo = namedtuple(
+    'CacheInfo', 'hits misses evictions maxsize currsize load_time')
+
+
+class _Call(object):
+    """A computation in flight that concurrent callers can wait for."""
+    __slots__ = ('event', 'result', 'exc')
+
+    def __init__(self):
+        self.event = Event()
+        self.result = None
+        self.exc = None
+
+
+_kwd_mark = (object(),)
+
+
+def _make_key(args, kwds, typed, _fast_types=frozenset((int, str))):
+    key = args
+    if kwds:
+        key += _kwd_mark + tuple(sorted(kwds.items()))
+    if typed:
+        key += tuple(type(v) for v in args)
+        if kwds:
+            key += tuple(type(v) for _, v in sorted(kwds.items()))
+    elif len(key) == 1 and type(key[0]) in _fast_types:
+        return key[0]
+    return key
+
+
+def memoize(maxsize=128, ttl=None, typed=False, clock=_clock):
+    """Decorator caching results of func by its (hashable) arguments.
+
+    Like functools.lru_cache, but additionally:
+    - entries can expire after ttl seconds,
+    - concurrent calls with the same arguments are collapsed into a single
+      computation (the others wait for its result or exception), which
+      prevents cache stampedes on cold start,
+    - cache_info() also reports evictions and the total time spent loading.
+
+    >>> @memoize(maxsize=2)
+    ... def square(x):
+    ...     print('computing %d' % x)
+    ...     return x * x
+    >>> square(2), square(2), square(3)
+    computing 2
+    computing 3
+    (4, 4, 9)
+    >>> square(4)
+    computing 4
+    16
+    >>> square(2)  # was evicted as least recently used
+    computing 2
+    4
+    >>> info = square.cache_info()
+    >>> info.hits, info.misses, info.evictions, info.currsize
+    (1, 4, 2, 2)
+
+    Can also be used without arguments:
+    >>> @memoize
+    ... def double(x):
+    ...     return 2 * x
+    >>> double(2), double.cache_info().misses
+    (4, 1)
+
+    :param maxsize: max number of cached results (None: unbounded)
+    :param ttl: seconds after which a cached result expires (None: never)
+    :param typed: cache arguments of different types separately (1 vs. 1.0)
+    :param clock: monotonic clock used for ttl
+    :return: decorator adding cache_info(), cache_clear() and
+        cache_invalidate(*args, **kwds) to the wrapped function
+    """
+    if callable(maxsize) and not isinstance(maxsize, int):
+        # used as @memoize without arguments
+        return memoize()(maxsize)
+    if maxsize is not None and maxsize < 0:
+        maxsize = 0
+
+    def decorator(func):
+        cache = OrderedDict()
+        inflight = {}
+        lock = Lock()
+        stats = [0, 0, 0, 0.]  # hits, misses, evictions, load_time
+        make_key = _make_key
+        sentinel = object()
+
+        @wraps(func)
+        def wrapper(*args, **kwds):
+            key = make_key(args, kwds, typed)
+            with lock:
+                entry = cache.get(key, sentinel)
+                if entry is not sentinel:
+                    if ttl is None or entry[1] > clock():
+                        cache.move_to_end(key)
+                        stats[0] += 1
+                        return entry[0]
+                    del cache[key]
+                    stats[2] += 1
+                call = inflight.get(key)
+                if call is None:
+                    call = inflight[key] = _Call()
+                    stats[1] += 1
+                    leader = True
+                else:
+                    stats[0] += 1
+                    leader = False
+            if not leader:
+                call.event.wait()
+                if call.exc is not None:
+                    raise call.exc
+                return call.result
+
+            start = timer()
+            try:
+                result = func(*args, **kwds)
+            except BaseException as e:
+                with lock:
+                    del inflight[key]
+                call.exc = e
+                call.event.set()
+                raise
+            load_time = timer() - start
+            with lock:
+                stats[3] += load_time
+                del inflight[key]
+                if maxsize != 0:
+                    expires = None if ttl is None else clock() + ttl
+                    cache[key] = (result, expires)
+                    if maxsize is not None and len(cache) > maxsize:
+                        cache.popitem(last=False)
+                        stats[2] += 1
+            call.result = result
+            call.event.set()
+            return result
+
+        def cache_info():
+            """Report cache statistics."""
+            with lock:
+                return CacheInfo(
+                    stats[0], stats[1], stats[2], maxsize, len(cache),
+                    stats[3])
+
+        def cache_clear():
+            """Clear the cache and its statistics."""
+            with lock:
+                cache.clear()
+                stats[:] = [0, 0, 0, 0.]
+
+        def cache_invalidate(*args, **kwds):
+            """Remove the cached result for the given arguments if any."""
+            with lock:
+                return cache.pop(make_key(args, kwds, typed), None) is not None
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_invalidate = cache_invalidate
+        return wrapper
+    return decorator
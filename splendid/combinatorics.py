@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Lazy sequences of combinations, permutations and subsets.
+
+Powerset, Combinations and Permutations behave like the (exponentially large)
+lists of what powerset, itertools.combinations and itertools.permutations
+yield (in the same order), without materializing them: len() is computed,
+seq[i] unranks the i-th element, seq.index(x) ranks x, and slices resume
+the (C speed) enumeration at any offset. This allows to shard a search space
+across workers by index range or to sample from it uniformly.
+"""
+
+from collections.abc import Sequence
+from itertools import chain
+from itertools import combinations
+from itertools import islice
+from itertools import permutations
+import random
+
+try:
+    from math import comb as _comb
+    from math import perm as _perm
+except ImportError:  # python < 3.8
+    def _perm(n, k):
+        if not 0 <= k <= n:
+            return 0
+        res = 1
+        for i in range(n - k + 1, n + 1):
+            res *= i
+        return res
+
+    def _comb(n, k):
+        if not 0 <= k <= n:
+            return 0
+        k = min(k, n - k)
+        return _perm(n, k) // _perm(k, k)
+
+
+__all__ = [
+    'Combinations',
+    'Permutations',
+    'Powerset',
+]
+
+
+class _LazySequence(Sequence):
+    """Base class, subclasses implement size, _unrank, _rank, __iter__ and
+    _iter_from (all on pool positions)."""
+    def __init__(self, iterable):
+        self.pool = tuple(iterable)
+        self._positions = None
+
+    def __len__(self):
+        # raises an OverflowError beyond sys.maxsize (like range), use size
+        return self.size
+
+    def __getitem__(self, i):
+        """Return the i-th element, or a lazy iterator for slices.
+
+        Slices don't return lists (which could be huge) but iterators that
+        unrank their start and then continue enumerating from there.
+        """
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self.size)
+            if step < 0:
+                return (self[j] for j in range(start, stop, step))
+            return islice(self.iter_from(start, stop), 0, None, step)
+        length = self.size
+        if i < 0:
+            i += length
+        if not 0 <= i < length:
+            raise IndexError('%s index out of range' % type(self).__name__)
+        return self._elements(self._unrank(i))
+
+    def _elements(self, positions):
+        pool = self.pool
+        return tuple([pool[p] for p in positions])
+
+    def iter_from(self, start=0, stop=None):
+        """Iterate over the elements with index start <= i < stop."""
+        length = self.size
+        stop = length if stop is None else min(stop, length)
+        if start < 0:
+            start = max(start + length, 0)
+        if start >= stop:
+            return iter(())
+        it = iter(self) if start == 0 else self._iter_from(
+            self._unrank(start))
+        return islice(it, stop - start)
+
+    def shard(self, index, num_shards):
+        """Iterate over the index-th of num_shards contiguous index ranges.
+
+        >>> c = Combinations('abcd', 2)
+        >>> list(c.shard(0, 3)), list(c.shard(2, 3))
+        ([('a', 'b'), ('a', 'c')], [('b', 'd'), ('c', 'd')])
+        """
+        if not 0 <= index < num_shards:
+            raise ValueError(
+                'need 0 <= index < num_shards, got %r, %r'
+                % (index, num_shards))
+        length = self.size
+        return self.iter_from(
+            length * index // num_shards, length * (index + 1) // num_shards)
+
+    def choice(self, rng=None):
+        """Return a uniformly random element (without enumerating)."""
+        return self[(rng or random).randrange(self.size)]
+
+    def _pool_positions(self, element, increasing):
+        """Pool positions of the items of element (ValueError if none)."""
+        if len(element) > len(self.pool):
+            raise ValueError('%r is not in %r' % (element, self))
+        if self._positions is None:
+            try:
+                positions = {x: p for p, x in enumerate(self.pool)}
+            except TypeError:  # unhashable items
+                positions = {}
+            # only unique items can be looked up
+            self._positions = (
+                positions if len(positions) == len(self.pool) else False)
+        lookup = self._positions
+        res = []
+        used = set()
+        for x in element:
+            if lookup:
+                try:
+                    p = lookup[x]
+                except (KeyError, TypeError):
+                    raise ValueError('%r is not in %r' % (element, self))
+            else:  # duplicates: next position that fits
+                p = -1
+                while True:
+                    try:
+                        p = self.pool.index(x, p + 1)
+                    except ValueError:
+                        raise ValueError('%r is not in %r' % (element, self))
+                    if (res and p <= res[-1]) if increasing else p in used:
+                        continue
+                    break
+                used.add(p)
+            if increasing and res and p <= res[-1]:
+                raise ValueError('%r is not in %r' % (element, self))
+            res.append(p)
+        if not increasing and len(set(res)) < len(res):
+            raise ValueError('%r is not in %r' % (element, self))
+        return res
+
+    def index(self, element, start=0, stop=None):
+        """Rank of element (without enumerating)."""
+        i = self._rank(self._index_positions(tuple(element)))
+        if i < start or stop is not None and i >= stop:
+            raise ValueError('%r is not in range' % (element,))
+        return i
+
+    def __contains__(self, element):
+        try:
+            self.index(element)
+        except (ValueError, TypeError):
+            return False
+        return True
+
+    def count(self, element):
+        return int(element in self)
+
+    def __repr__(self):
+        return '%s(%r%s)' % (type(self).__name__, self.pool, self._args())
+
+    def _args(self):
+        return ''
+
+
+class Combinations(_LazySequence):
+    """Lazy sequence of combinations(iterable, r).
+
+    >>> c = Combinations('abcdef', 3)
+    >>> len(c), c[0], c[7], c[-1]
+    (20, ('a', 'b', 'c'), ('a', 'd', 'e'), ('d', 'e', 'f'))
+    >>> c.index(('a', 'c', 'e'))
+    5
+    >>> list(c[17:])
+    [('c', 'd', 'f'), ('c', 'e', 'f'), ('d', 'e', 'f')]
+    >>> big = Combinations(range(100), 10)
+    >>> big.size, big[10 ** 12], big.index(big[10 ** 12])
+    (17310309456440, (0, 9, 21, 28, 64, 78, 84, 90, 91, 92), 1000000000000)
+    """
+    def __init__(self, iterable, r):
+        super(Combinations, self).__init__(iterable)
+        if r < 0:
+            raise ValueError('r must be >= 0, got %r' % (r,))
+        self.r = r
+
+    @property
+    def size(self):
+        return _comb(len(self.pool), self.r)
+
+    def __iter__(self):
+        return combinations(self.pool, self.r)
+
+    def _args(self):
+        return ', %d' % self.r
+
+    def _unrank(self, i):
+        return _unrank_combination(len(self.pool), self.r, i)
+
+    def _index_positions(self, element):
+        if len(element) != self.r:
+            raise ValueError('%r is not in %r' % (element, self))
+        return self._pool_positions(element, increasing=True)
+
+    def _rank(self, positions):
+        return _rank_combination(len(self.pool), self.r, positions)
+
+    def _iter_from(self, positions):
+        return _combinations_from(self.pool, self.r, positions)
+
+
+def _unrank_combination(n, r, i):
+    """Positions of the i-th combination of r out of n (lexicographic)."""
+    res = []
+    c = 0
+    for k in range(r, 0, -1):
+        # number of combinations with c as next position (exact update of
+        # binomials instead of recomputing them)
+        m = n - c - 1
+        count = _comb(m, k - 1)
+        while i >= count:
+            i -= count
+            c += 1
+            count = count * (m - k + 1) // m
+            m -= 1
+        res.append(c)
+        c += 1
+    return res
+
+
+def _rank_combination(n, r, positions):
+    return _comb(n, r) - 1 - sum(
+        _comb(n - 1 - p, r - j) for j, p in enumerate(positions))
+
+
+def _combinations_from(pool, r, positions):
+    """Iterate combinations from the one at positions on, in C.
+
+    Everything after it are the combinations that share the first j
+    positions and have a larger one at j (j = r-1, ..., 0), the rest of each
+    of which is just a combinations() of the following items.
+    """
+    n = len(pool)
+
+    def parts():
+        for j in range(r - 1, -1, -1):
+            prefix = tuple([pool[p] for p in positions[:j]])
+            first = positions[j] + (j < r - 1)
+            for v in range(first, n - (r - j - 1)):
+                head = prefix + (pool[v],)
+                yield map(head.__add__, combinations(pool[v + 1:], r - j - 1))
+    if r == 0:
+        return iter([()])
+    return chain.from_iterable(parts())
+
+
+class Permutations(_LazySequence):
+    """Lazy sequence of permutations(iterable, r).
+
+    >>> p = Permutations('abcd', 2)
+    >>> len(p), p[0], p[5], p[-1], p.index(('b', 'd'))
+    (12, ('a', 'b'), ('b', 'd'), ('d', 'c'), 5)
+    >>> list(p[4:7])
+    [('b', 'c'), ('b', 'd'), ('c', 'a')]
+    >>> Permutations(range(20))[10 ** 17]
+    (0, 16, 12, 3, 9, 13, 10, 17, 18, 7, 19, 14, 8, 11, 15, 2, 5, 6, 1, 4)
+    """
+    def __init__(self, iterable, r=None):
+        super(Permutations, self).__init__(iterable)
+        self.r = len(self.pool) if r is None else r
+        if self.r < 0:
+            raise ValueError('r must be >= 0, got %r' % (r,))
+
+    @property
+    def size(self):
+        return _perm(len(self.pool), self.r)
+
+    def __iter__(self):
+        return permutations(self.pool, self.r)
+
+    def _args(self):
+        return ', %d' % self.r
+
+    def _unrank(self, i):
+        n, r = len(self.pool), self.r
+        remaining = list(range(n))
+        res = []
+        radix = _perm(n, r)
+        for k in range(r):
+            radix //= n - k
+            d, i = divmod(i, radix)
+            res.append(remaining.pop(d))
+        return res
+
+    def _index_positions(self, element):
+        if len(element) != self.r:
+            raise ValueError('%r is not in %r' % (element, self))
+        return self._pool_positions(element, increasing=False)
+
+    def _rank(self, positions):
+        n = len(self.pool)
+        remaining = list(range(n))
+        rank = 0
+        radix = _perm(n, self.r)
+        for k, p in enumerate(positions):
+            radix //= n - k
+            d = remaining.index(p)
+            del remaining[d]
+            rank += d * radix
+        return rank
+
+    def _iter_from(self, positions):
+        pool, r = self.pool, self.r
+
+        def parts():
+            for j in range(r - 1, -1, -1):
+                taken = set(positions[:j])
+                prefix = tuple([pool[p] for p in positions[:j]])
+                rest = [p for p in range(len(pool)) if p not in taken]
+                first = positions[j] + (j < r - 1)
+                for v in rest:
+                    if v < first:
+                        continue
+                    head = prefix + (pool[v],)
+                    others = tuple([pool[p] for p in rest if p != v])
+                    yield map(head.__add__, permutations(others, r - j - 1))
+        if r == 0:
+            return iter([()])
+        return chain.from_iterable(parts())
+
+
+class Powerset(_LazySequence):
+    """Lazy sequence of powerset(iterable) (all subsets, by size).
+
+    >>> s = Powerset('abc')
+    >>> len(s), list(s[:5])
+    (8, [(), ('a',), ('b',), ('c',), ('a', 'b')])
+    >>> s[5], s.index(('a', 'c')), list(s[6:])
+    (('a', 'c'), 5, [('b', 'c'), ('a', 'b', 'c')])
+
+    Beyond sys.maxsize elements len() fails (like for range), use size:
+    >>> s = Powerset(range(64))
+    >>> s.size, s.index(s[2 ** 63]) == 2 ** 63
+    (18446744073709551616, True)
+    """
+    @property
+    def size(self):
+        return 2 ** len(self.pool)
+
+    def __iter__(self):
+        pool = self.pool
+        return chain.from_iterable(
+            combinations(pool, r) for r in range(len(pool) + 1))
+
+    def _split(self, i):
+        """(size r, index among the combinations of size r) of index i."""
+        n = len(self.pool)
+        for r in range(n + 1):
+            count = _comb(n, r)
+            if i < count:
+                return r, i
+            i -= count
+        raise IndexError(i)
+
+    def _unrank(self, i):
+        r, i = self._split(i)
+        return _unrank_combination(len(self.pool), r, i)
+
+    def _index_positions(self, element):
+        return self._pool_positions(element, increasing=True)
+
+    def _rank(self, positions):
+        n, r = len(self.pool), len(positions)
+        return sum(_comb(n, k) for k in range(r)) + _rank_combination(
+            n, r, positions)
+
+    def _iter_from(self, positions):
+        pool, r = self.pool, len(positions)
+        return chain(
+            _combinations_from(pool, r, positions),
+            chain.from_iterable(
+                combinations(pool, k) for k in range(r + 1, len(pool) + 1)))
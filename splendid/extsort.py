@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""External memory sorting for streams larger than RAM.
+
+external_sort sorts chunks of the input in memory, spills them as sorted
+runs to temp files (blocks of pickled lists or raw array.array data) and
+lazily k-way merges the runs with a heap (merge_sorted). Sorting the runs can
+be spread over a process pool.
+"""
+
+from array import array
+from functools import partial
+import heapq
+from itertools import chain
+from itertools import islice
+import os
+import pickle
+import shutil
+import tempfile
+
+from . import chunker
+
+
+__all__ = [
+    'external_sort',
+    'merge_sorted',
+]
+
+
+# items per pickled block in a run file
+_BLOCK_SIZE = 1024
+
+
+def merge_sorted(*iterables, **kwds):
+    """Lazily merge sorted iterables into one sorted iterator.
+
+    Like heapq.merge (which is used): only one item per iterable is kept in
+    memory and the merge is stable, i.e., equal items are yielded in the
+    order of the iterables.
+
+    >>> list(merge_sorted([1, 4, 7], [2, 5], [3, 6, 9]))
+    [1, 2, 3, 4, 5, 6, 7, 9]
+    >>> list(merge_sorted(['b', 'C'], ['A', 'c'], key=str.lower))
+    ['A', 'b', 'C', 'c']
+    >>> list(merge_sorted([3, 1], [2], reverse=True))
+    [3, 2, 1]
+
+    :param iterables: iterables sorted by key (and reverse)
+    :param key: function computing the key to sort by
+    :param reverse: if the iterables are sorted in descending order
+    """
+    key = kwds.pop('key', None)
+    reverse = kwds.pop('reverse', False)
+    if kwds:
+        raise TypeError('unexpected keyword arguments: %s' % sorted(kwds))
+    if len(iterables) == 1:
+        return iter(iterables[0])
+    return heapq.merge(*iterables, key=key, reverse=reverse)
+
+
+def _dump_run(items, f, typecode):
+    if typecode is not None:
+        array(typecode, items).tofile(f)
+        return
+    dump = pickle.dump
+    for i in range(0, len(items), _BLOCK_SIZE):
+        dump(items[i:i + _BLOCK_SIZE], f, pickle.HIGHEST_PROTOCOL)
+
+
+def _write_run(items, dir_path, typecode, key=None, reverse=False):
+    """Sort items (a list, in place) and write them to a new run file."""
+    items.sort(key=key, reverse=reverse)
+    fd, path = tempfile.mkstemp(suffix='.run', dir=dir_path)
+    with os.fdopen(fd, 'wb') as f:
+        _dump_run(items, f, typecode)
+    return path
+
+
+def _read_run(f, typecode):
+    if typecode is None:
+        load = pickle.load
+        while True:
+            try:
+                block = load(f)
+            except EOFError:
+                return
+            for item in block:
+                yield item
+    else:
+        while True:
+            block = array(typecode)
+            try:
+                block.fromfile(f, _BLOCK_SIZE)
+            except EOFError:  # the remaining items were still read
+                pass
+            if not block:
+                return
+            for item in block:
+                yield item
+
+
+def _merge_runs(paths, typecode, key, reverse):
+    """Generator merging run files, closes them when done (or closed)."""
+    files = []
+    try:
+        for path in paths:
+            files.append(open(path, 'rb'))
+        for item in merge_sorted(
+                *[_read_run(f, typecode) for f in files],
+                key=key, reverse=reverse):
+            yield item
+    finally:
+        for f in files:
+            f.close()
+
+
+def external_sort(
+        iterable,
+        key=None,
+        reverse=False,
+        chunk_size=100000,
+        tmpdir=None,
+        typecode=None,
+        processes=None,
+        max_merge=256):
+    """Lazily sort an iterable that might not fit into memory.
+
+    Like sorted(iterable, key=key, reverse=reverse) (including stability),
+    but at most chunk_size items (plus one block per run while merging) are
+    held in memory:
+
+    >>> import random
+    >>> data = [random.random() for _ in range(1000)]
+    >>> list(external_sort(data, chunk_size=100)) == sorted(data)
+    True
+    >>> list(external_sort(['b', 'C', 'a'], key=str.lower, chunk_size=2))
+    ['a', 'b', 'C']
+
+    Inputs with less than chunk_size items are sorted in memory without any
+    temp files. Temp files are removed when the result is exhausted or
+    closed.
+
+    :param iterable: the items to sort (picklable unless typecode is given)
+    :param key: function computing the key to sort by (has to be picklable,
+        e.g., a module level function, when using processes)
+    :param reverse: sort in descending order
+    :param chunk_size: number of items sorted in memory per run
+    :param tmpdir: directory for the run files (default: system temp dir)
+    :param typecode: array.array typecode (e.g., 'q' or 'd') to store
+        numeric items as compact raw binary instead of pickles
+    :param processes: sort and write runs in a process pool of that size
+        (None: sort in this process)
+    :param max_merge: max number of runs merged at once, more runs are first
+        merged into intermediate runs (bounding the number of open files)
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be >= 1, got %r' % (chunk_size,))
+    if max_merge < 2:
+        raise ValueError('max_merge must be >= 2, got %r' % (max_merge,))
+    it = iter(iterable)
+    first = list(islice(it, chunk_size))
+    if len(first) < chunk_size:
+        first.sort(key=key, reverse=reverse)
+        return iter(first)
+    return _external_sort(
+        chain(first, it), key, reverse, chunk_size, tmpdir, typecode,
+        processes, max_merge)
+
+
+def _external_sort(
+        items, key, reverse, chunk_size, tmpdir, typecode, processes,
+        max_merge):
+    run_dir = tempfile.mkdtemp(prefix='splendid-extsort-', dir=tmpdir)
+    try:
+        write_run = partial(
+            _write_run, dir_path=run_dir, typecode=typecode,
+            key=key, reverse=reverse)
+        if processes is None:
+            paths = list(map(write_run, chunker(items, chunk_size)))
+        else:
+            from .parallel import map_chunks
+            # ordered, so equal items stay in input order (stable sort)
+            paths = list(map_chunks(
+                write_run, items, chunk_size,
+                executor='process', max_workers=processes))
+        while len(paths) > max_merge:
+            # merge consecutive groups of runs, keeping the sort stable
+            paths = [
+                _write_merged(
+                    paths[i:i + max_merge], run_dir, typecode, key, reverse)
+                for i in range(0, len(paths), max_merge)
+            ]
+        for item in _merge_runs(paths, typecode, key, reverse):
+            yield item
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _write_merged(paths, dir_path, typecode, key, reverse):
+    if len(paths) == 1:
+        return paths[0]
+    fd, path = tempfile.mkstemp(suffix='.run', dir=dir_path)
+    with os.fdopen(fd, 'wb') as f:
+        for block in chunker(
+                _merge_runs(paths, typecode, key, reverse), _BLOCK_SIZE):
+            _dump_run(block, f, typecode)
+    for p in paths:
+        os.unlink(p)
+    return path
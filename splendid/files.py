@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""High-throughput file helpers.
+
+BulkWriter writes many (small) files through a thread pool, atomically via
+temp file and rename, using make_dirs_for's directory cache.
+
+mmap_chunks, mmap_lines and mmap_records read large files by memory mapping
+them and yielding memoryview slices (no copies) that end on block, line or
+record boundaries. byte_ranges splits a file into aligned ranges, so
+several processes can each map and parse their own region.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+import mmap
+import os
+import re
+import threading
+from timeit import default_timer as timer
+
+from . import make_dirs_for
+
+
+__all__ = [
+    'BulkWriter',
+    'atomic_write',
+    'byte_ranges',
+    'mmap_chunks',
+    'mmap_lines',
+    'mmap_records',
+]
+
+
+_tmp_counter = count()
+
+
+def atomic_write(path, data, fsync=False):
+    """Atomically write data (bytes or text, encoded as utf-8) to path.
+
+    The data is written to a temp file in the same directory which is then
+    renamed to path, so readers either see the old or the new file, never a
+    partially written one. Missing directories are created.
+
+    :param path: file to write
+    :param data: bytes or text
+    :param fsync: flush the file to disk before renaming it (the rename
+        itself is only durable after the directory was fsynced, see
+        BulkWriter for batching that)
+    :return: number of bytes written
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    make_dirs_for(path)
+    tmp = '%s.%d.%d.tmp' % (path, os.getpid(), next(_tmp_counter))
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return len(data)
+
+
+def _fsync_dir(dir_path):
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:  # e.g., windows can't open directories
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class BulkWriter(object):
+    """Write many files concurrently through a thread pool.
+
+    Use as context manager, leaving it waits for all writes and raises the
+    first error that occurred (if any):
+
+    >>> import os, tempfile, shutil
+    >>> tmpdir = tempfile.mkdtemp()
+    >>> with BulkWriter(max_workers=4) as writer:
+    ...     for i in range(100):
+    ...         path = os.path.join(tmpdir, str(i % 7), '%d.txt' % i)
+    ...         _ = writer.write(path, 'file %d' % i)
+    >>> writer.files, writer.bytes
+    (100, 690)
+    >>> open(os.path.join(tmpdir, '3', '10.txt')).read()
+    'file 10'
+    >>> writer.files_per_sec > 0 and writer.bytes_per_sec > 0
+    True
+    >>> shutil.rmtree(tmpdir)
+
+    :param max_workers: number of writer threads
+    :param atomic: write via temp file and rename (see atomic_write)
+    :param fsync: fsync each file before renaming it and the containing
+        directories once per fsync_batch files (and on close), so writes
+        are durable without one directory fsync per file
+    :param fsync_batch: number of files after which dirs are fsynced
+    :param max_pending: max number of queued writes, write() blocks when
+        reached to bound memory usage (default: 4 * max_workers)
+    """
+    def __init__(self, max_workers=8, atomic=True, fsync=False,
+                 fsync_batch=1000, max_pending=None):
+        self.atomic = atomic
+        self.fsync = fsync
+        self.fsync_batch = fsync_batch
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = threading.BoundedSemaphore(
+            max_pending or 4 * max_workers)
+        self._lock = threading.Lock()
+        self._dirty_dirs = set()
+        self._unsynced = 0
+        self._errors = []
+        self.files = 0
+        self.bytes = 0
+        self._start = None
+        self._stop = None
+
+    def write(self, path, data):
+        """Schedule writing data (bytes or text) to path, returns a Future."""
+        if self._start is None:
+            self._start = timer()
+        self._pending.acquire()
+        try:
+            future = self._pool.submit(self._write, path, data)
+        except BaseException:
+            self._pending.release()
+            raise
+        return future
+
+    def _write(self, path, data):
+        try:
+            if self.atomic:
+                n = atomic_write(path, data, self.fsync)
+            else:
+                if isinstance(data, str):
+                    data = data.encode('utf-8')
+                with open(make_dirs_for(path), 'wb') as f:
+                    f.write(data)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                n = len(data)
+            dirs = None
+            with self._lock:
+                self.files += 1
+                self.bytes += n
+                if self.fsync:
+                    self._dirty_dirs.add(os.path.dirname(path) or '.')
+                    self._unsynced += 1
+                    if self._unsynced >= self.fsync_batch:
+                        dirs, self._dirty_dirs = self._dirty_dirs, set()
+                        self._unsynced = 0
+            if dirs:
+                for d in dirs:
+                    _fsync_dir(d)
+            return n
+        except BaseException as e:
+            with self._lock:
+                self._errors.append(e)
+            raise
+        finally:
+            self._pending.release()
+
+    def flush(self):
+        """Fsync all directories with unsynced renames."""
+        with self._lock:
+            dirs, self._dirty_dirs = self._dirty_dirs, set()
+            self._unsynced = 0
+        for d in dirs:
+            _fsync_dir(d)
+
+    def close(self):
+        """Wait for all writes, fsync dirs if needed, raise first error."""
+        self._pool.shutdown(wait=True)
+        if self.fsync:
+            self.flush()
+        self._stop = timer()
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # don't mask the original exception
+            self._pool.shutdown(wait=True)
+            self._stop = timer()
+
+    @property
+    def elapsed(self):
+        """Seconds from the first write until close (or now)."""
+        if self._start is None:
+            return 0.
+        return (self._stop or timer()) - self._start
+
+    @property
+    def files_per_sec(self):
+        elapsed = self.elapsed
+        return self.files / elapsed if elapsed else 0.
+
+    @property
+    def bytes_per_sec(self):
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed else 0.
+
+
+def _map_region(path, start, stop):
+    """Map bytes start:stop of path (read-only).
+
+    Only the region (from the allocation granularity boundary before start)
+    is mapped. Returns (mmap, start, stop) with start and stop relative to
+    the mmap or None if the region is empty.
+    """
+    if start < 0:
+        raise ValueError('start must be >= 0, got %r' % (start,))
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        stop = size if stop is None else min(stop, size)
+        if start >= stop:
+            return None
+        offset = start - start % mmap.ALLOCATIONGRANULARITY
+        # the mapping stays valid after the file is closed
+        mm = mmap.mmap(
+            f.fileno(), stop - offset, access=mmap.ACCESS_READ, offset=offset)
+    return mm, start - offset, stop - offset
+
+
+def _mmap_views(path, start, stop, boundaries):
+    """Yield memoryviews of the regions between boundaries(mm, start, stop).
+
+    The mmap is closed when done, unless views are still referenced (then
+    it's closed once they are garbage collected).
+    """
+    region = _map_region(path, start, stop)
+    if region is None:
+        return
+    mm, start, stop = region
+    view = memoryview(mm)
+    try:
+        for a, b in boundaries(mm, start, stop):
+            yield view[a:b]
+    finally:
+        view.release()
+        try:
+            mm.close()
+        except BufferError:  # views are still in use
+            pass
+
+
+def _after_sep(mm, pos, sep, stop):
+    """Position after the first sep ending at or after pos (or stop)."""
+    i = mm.find(sep, max(pos - len(sep), 0), stop)
+    return stop if i < 0 else i + len(sep)
+
+
+def mmap_chunks(path, block_size, sep=None, start=0, stop=None):
+    """Yield memoryviews of block_size bytes of the memory mapped file.
+
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> _ = os.write(fd, b'one\\ntwo\\nthree\\n'); os.close(fd)
+    >>> [bytes(v) for v in mmap_chunks(path, 5)]
+    [b'one\\nt', b'wo\\nth', b'ree\\n']
+
+    With sep each chunk is extended up to the next sep (e.g., b'\\n'), so no
+    record is split between chunks:
+    >>> [bytes(v) for v in mmap_chunks(path, 5, sep=b'\\n')]
+    [b'one\\ntwo\\n', b'three\\n']
+    >>> os.remove(path)
+
+    The views point into the mapping, so nothing is copied. Convert (parts
+    of) them with bytes() if needed after the next chunk was requested.
+
+    :param path: file to read
+    :param block_size: (min) number of bytes per chunk
+    :param sep: if given, chunks end after a separator (or at the end)
+    :param start: first byte to read (see byte_ranges)
+    :param stop: end of the region to read (default: end of file); with
+        sep, it should be aligned (like start) on a separator
+    :return: an iterator over memoryviews
+    """
+    if block_size < 1:
+        raise ValueError('block_size must be >= 1, got %r' % (block_size,))
+
+    def boundaries(mm, pos, end):
+        while pos < end:
+            nxt = min(pos + block_size, end)
+            if sep is not None and nxt < end:
+                nxt = _after_sep(mm, nxt, sep, end)
+            yield pos, nxt
+            pos = nxt
+    return _mmap_views(path, start, stop, boundaries)
+
+
+def mmap_lines(path, batch=1000, start=0, stop=None):
+    """Yield memoryviews of batch lines (including their newlines).
+
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> _ = os.write(fd, b'a\\nbb\\n\\nccc'); os.close(fd)
+    >>> [bytes(v) for v in mmap_lines(path, batch=2)]
+    [b'a\\nbb\\n', b'\\nccc']
+    >>> [bytes(v).splitlines() for v in mmap_lines(path)]
+    [[b'a', b'bb', b'', b'ccc']]
+    >>> os.remove(path)
+
+    Each batch is a single view into the mapping (no objects per line), use
+    bytes(view).splitlines() or a parser accepting buffers on it. Lines are
+    counted by a regex (in C), for batches of about the same size in bytes
+    mmap_chunks(path, n, sep=b'\\n') is faster as it doesn't count lines.
+
+    :param path: file to read
+    :param batch: number of lines per view
+    :param start: first byte to read, should be a line start (see
+        byte_ranges)
+    :param stop: end of the region to read, should be a line end
+    :return: an iterator over memoryviews
+    """
+    if batch < 1:
+        raise ValueError('batch must be >= 1, got %r' % (batch,))
+
+    # matches up to batch lines in C, the last one may lack its newline
+    match = re.compile(
+        b'(?:[^\\n]*\\n){0,%d}(?:[^\\n]*\\n|[^\\n]+\\Z)' % (batch - 1)).match
+
+    def boundaries(mm, pos, end):
+        while pos < end:
+            nxt = match(mm, pos, end).end()
+            yield pos, nxt
+            pos = nxt
+    return _mmap_views(path, start, stop, boundaries)
+
+
+def mmap_records(path, record_size, batch=1, start=0, stop=None):
+    """Yield memoryviews of batch fixed-size records.
+
+    >>> import os, struct, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> _ = os.write(fd, struct.pack('<5i', *range(5))); os.close(fd)
+    >>> [v.cast('i').tolist() for v in mmap_records(path, 4, batch=2)]
+    [[0, 1], [2, 3], [4]]
+    >>> os.remove(path)
+
+    :param path: file to read
+    :param record_size: number of bytes per record
+    :param batch: number of records per view
+    :param start: first byte to read, a multiple of record_size
+    :param stop: end of the region to read, a multiple of record_size
+    :return: an iterator over memoryviews
+    :raises ValueError: if the region doesn't consist of whole records
+    """
+    if record_size < 1:
+        raise ValueError('record_size must be >= 1, got %r' % (record_size,))
+    if batch < 1:
+        raise ValueError('batch must be >= 1, got %r' % (batch,))
+    if start % record_size:
+        raise ValueError('start %d is not a multiple of record_size %d' % (
+            start, record_size))
+
+    def boundaries(mm, pos, end):
+        if (end - pos) % record_size:
+            raise ValueError('%s: %d bytes are no multiple of %d' % (
+                path, end - pos, record_size))
+        step = record_size * batch
+        for a in range(pos, end, step):
+            yield a, min(a + step, end)
+    return _mmap_views(path, start, stop, boundaries)
+
+
+def byte_ranges(path, num_ranges, sep=b'\n', record_size=None):
+    """Split the file into about equally large aligned (start, stop) ranges.
+
+    The ranges end after a sep (default: lines) or, if record_size is given,
+    on record boundaries, so each can be processed independently, e.g., by
+    mmap_lines(path, start=start, stop=stop) in separate processes:
+
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> _ = os.write(fd, b'aaa\\nb\\ncc\\ndddd\\ne\\n'); os.close(fd)
+    >>> ranges = byte_ranges(path, 3)
+    >>> ranges
+    [(0, 6), (6, 14), (14, 16)]
+    >>> [bytes(v) for a, b in ranges for v in mmap_lines(path, 10, a, b)]
+    [b'aaa\\nb\\n', b'cc\\ndddd\\n', b'e\\n']
+    >>> os.remove(path)
+
+    :param path: file to split
+    :param num_ranges: max number of ranges (fewer for small files)
+    :param sep: separator the ranges end with
+    :param record_size: split on multiples of record_size instead of sep
+    :return: a list of (start, stop) byte offsets
+    """
+    if num_ranges < 1:
+        raise ValueError('num_ranges must be >= 1, got %r' % (num_ranges,))
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    cuts = [size * i // num_ranges for i in range(1, num_ranges)]
+    if record_size is not None:
+        cuts = [c - c % record_size for c in cuts]
+    else:
+        mm = _map_region(path, 0, size)[0]
+        try:
+            cuts = [_after_sep(mm, c, sep, size) for c in cuts]
+        finally:
+            mm.close()
+    bounds = [0] + sorted(set(c for c in cuts if 0 < c < size)) + [size]
+    return list(zip(bounds[:-1], bounds[1:]))
@@ -12,8 +12,11 @@ Main changes:
 - doctests
 - python 2 and 3 compatibility via six
 - optimization by replacing global lookups with local default vars
+- O(1) / C speed fast paths for sequences in take, consume, nth, all_equal
+  and quantify
 '''
 
+from array import array
 import collections
 from itertools import chain
 from itertools import combinations
@@ -40,7 +43,82 @@ from six.moves import (
 )
 
 
-def take(n, iterable, _list=list, _islice=islice):
+__all__ = [
+    'all_equal',
+    'consume',
+    'dotproduct',
+    'flatten',
+    'grouper',
+    'interleave',
+    'iter_except',
+    'ncycles',
+    'nth',
+    'padnone',
+    'pairwise',
+    'powerset',
+    'quantify',
+    'random_combination',
+    'random_combination_with_replacement',
+    'random_permutation',
+    'random_product',
+    'repeatfunc',
+    'roundrobin',
+    'tabulate',
+    'take',
+    'unique_everseen',
+    'unique_justseen',
+]
+
+
+# exact types (no subclasses, they might override __iter__ or __getitem__)
+# that iterate like indexing them from 0 to len - 1 and slice in C
+_SEQUENCE_TYPES = frozenset([list, tuple, str, bytes, bytearray, range, array])
+
+# iterators over the above that can be moved in O(1) with __setstate__
+_SEEKABLE_ITERATORS = frozenset(
+    type(iter(seq)) for seq in (
+        [], (), '', u'\xe9', b'', bytearray(), range(0), array('b')))
+
+
+class _SequenceKinds(dict):
+    """Maps types to 'seq' (_SEQUENCE_TYPES), 'numpy' (NumPy arrays), 'seek'
+    (_SEEKABLE_ITERATORS) or None, computed on the first lookup of a type.
+
+    So the fast paths only cost one dict lookup for other iterables.
+    """
+    def __missing__(self, t):
+        if t in _SEQUENCE_TYPES:
+            kind = 'seq'
+        elif t in _SEEKABLE_ITERATORS:
+            kind = 'seek'
+        elif t.__module__ == 'numpy' and hasattr(t, '__array_interface__'):
+            kind = 'numpy'
+        else:
+            kind = None
+        self[t] = kind
+        return kind
+
+
+_sequence_kinds = _SequenceKinds()
+
+
+def _seek(iterator, n, _next=next):
+    """Advance a _SEEKABLE_ITERATORS iterator by n >= 0 (None: to the end)
+    in O(1)."""
+    state = iterator.__reduce__()
+    if len(state) < 3:
+        return  # already exhausted (and released its sequence)
+    size = len(state[1][0])
+    if n is not None and state[2] + n < size:
+        iterator.__setstate__(state[2] + n)
+    else:
+        # exhaust it, so it releases the sequence like after iterating
+        iterator.__setstate__(size)
+        _next(iterator, None)
+
+
+def take(n, iterable, _list=list, _islice=islice, _kinds=_sequence_kinds,
+         _int=int):
     """Return first n items of the iterable as a list.
 
     >>> c = count()
@@ -54,7 +132,17 @@ def take(n, iterable, _list=list, _islice=islice):
     [1, 2, 3]
     >>> take(0, [1, 2, 3])
     []
+
+    Sequences (lists, tuples, str, bytes, ranges, arrays, NumPy arrays) are
+    sliced instead of iterated:
+    >>> take(3, 'abcdef')
+    ['a', 'b', 'c']
     """
+    kind = _kinds[type(iterable)]
+    if (kind == 'seq' or kind == 'numpy' and iterable.ndim) and (
+            type(n) is _int and n >= 0):
+        part = iterable[:n]
+        return part if type(part) is _list else _list(part)
     return _list(_islice(iterable, n))
 
 
@@ -69,7 +157,8 @@ def tabulate(f, start=0, _imap=map, _count=count):
     return _imap(f, _count(start))
 
 
-def consume(iterator, n, _deque=collections.deque, _next=next, _islice=islice):
+def consume(iterator, n, _deque=collections.deque, _next=next, _islice=islice,
+            _kinds=_sequence_kinds, _int=int):
     """Advance the iterator n-steps ahead. If n is none, consume entirely.
 
     >>> l = [1, 2, 3, 4, 5, 6]
@@ -87,9 +176,22 @@ def consume(iterator, n, _deque=collections.deque, _next=next, _islice=islice):
     >>> consume(it, 3)
     >>> next(it)
     3
+
+    Iterators over lists, tuples, str, bytes, ranges and arrays are moved in
+    O(1) instead of stepping through the items:
+    >>> it = iter(range(10**12))
+    >>> consume(it, 10**12 - 1)
+    >>> next(it)
+    999999999999
     """
+    kind = _kinds[type(iterator)]
+    if kind == 'seek' and (n is None or type(n) is _int and n >= 0):
+        _seek(iterator, n)
+    elif kind == 'seq' or kind == 'numpy' and iterator.ndim:
+        # iterating a sequence creates a new iterator, nothing to advance
+        pass
     # Use functions that consume iterators at C speed.
-    if n is None:
+    elif n is None:
         # feed the entire iterator into a zero-length deque
         _deque(iterator, maxlen=0)
     else:
@@ -97,7 +199,8 @@ def consume(iterator, n, _deque=collections.deque, _next=next, _islice=islice):
         _next(_islice(iterator, n, n), None)
 
 
-def nth(iterable, n, default=None, _next=next, _islice=islice):
+def nth(iterable, n, default=None, _next=next, _islice=islice,
+        _kinds=_sequence_kinds, _int=int, _len=len):
     """Returns the nth item or a default value.
 
     >>> l = [1, 1, 2, 3, 5, 8, 13]
@@ -109,11 +212,24 @@ def nth(iterable, n, default=None, _next=next, _islice=islice):
     8
     >>> nth(l, 10) is None
     True
+
+    Sequences are indexed and their iterators moved in O(1) (see consume):
+    >>> it = iter(l)
+    >>> nth(it, 4), next(it)
+    (5, 8)
     """
+    kind = _kinds[type(iterable)]
+    if kind and type(n) is _int and n >= 0:
+        if kind == 'seek':
+            _seek(iterable, n)
+            return _next(iterable, default)
+        if kind == 'seq' or iterable.ndim:
+            return iterable[n] if n < _len(iterable) else default
     return _next(_islice(iterable, n, None), default)
 
 
-def all_equal(iterable, _groupby=groupby, _next=next):
+def all_equal(iterable, _groupby=groupby, _next=next, _kinds=_sequence_kinds,
+              _len=len, _bool=bool):
     """Returns True if all the elements are equal to each other.
 
     >>> all_equal([2, 2, 2, 2])
@@ -130,12 +246,28 @@ def all_equal(iterable, _groupby=groupby, _next=next):
     False
     >>> all_equal([False, True])
     False
+
+    Sequences are checked with their C speed count method:
+    >>> all_equal('aaa'), all_equal(b'aab'), all_equal(range(1))
+    (True, False, True)
     """
+    kind = _kinds[type(iterable)]
+    if kind == 'seq':
+        if not iterable:
+            return True
+        first = iterable[0]
+        last = iterable[-1]
+        # the last item cheaply catches most unequal sequences
+        return ((last is first or last == first) and
+                iterable.count(first) == _len(iterable))
+    if kind == 'numpy' and iterable.ndim == 1:
+        return not _len(iterable) or _bool((iterable == iterable[0]).all())
     g = _groupby(iterable)
     return _next(g, True) and not _next(g, False)
 
 
-def quantify(iterable, pred=bool, _sum=sum, _imap=map):
+def quantify(iterable, pred=bool, _sum=sum, _imap=map, _kinds=_sequence_kinds,
+             _len=len, _list=list, _filter=filter):
     """Count how many times the predicate is true.
 
     >>> quantify([True, False, True, True, False])
@@ -144,7 +276,21 @@ def quantify(iterable, pred=bool, _sum=sum, _imap=map):
     19
     >>> quantify(range(20), lambda x: x < 10)
     10
+
+    With the default pred, sequences are counted at C speed:
+    >>> quantify(bytearray([0, 1, 2, 0])), quantify(array('d', [0., .5]))
+    (2, 1)
     """
+    if pred is bool:
+        kind = _kinds[type(iterable)]
+        if kind == 'seq':
+            if type(iterable) in (bytes, bytearray, array):
+                # numbers, only 0 is false
+                return _len(iterable) - iterable.count(0)
+            return _len(_list(_filter(None, iterable)))
+        if kind == 'numpy' and iterable.ndim == 1:
+            import numpy
+            return int(numpy.count_nonzero(iterable))
     return _sum(_imap(pred, iterable))
 
 
@@ -181,7 +327,9 @@ def dotproduct(vec1, vec2, _sum=sum, _imap=map, _mul=operator.mul):
     If you do a lot of computations with vectors, we recommend to have a look at
     numpy and its numpy.dot() function. For a single calculation however this
     method is competitive. Also this method will work in case vec1 and vec2 are
-    too large to fit into memory.
+    too large to fit into memory. For long float vectors rounding errors
+    accumulate though, see splendid.vectors.dotproduct for an exact sum (and
+    dot products of many vectors).
 
     >>> dotproduct([1, 2, 3], [4, 5, 6])
     32
@@ -223,7 +371,8 @@ def repeatfunc(func, times=None, *args):
 def pairwise(iterable, _tee=tee, _next=next, _izip=zip):
     """s -> (s0,s1), (s1,s2), (s2, s3), ...
 
-    Generates a pairwise window that overlaps.
+    Generates a pairwise window that overlaps. For wider windows, steps and
+    rolling aggregates see splendid.windows.
 
     >>> list(pairwise('hello'))
     [('h', 'e'), ('e', 'l'), ('l', 'l'), ('l', 'o')]
@@ -277,6 +426,121 @@ def roundrobin(*iterables):
             nexts = cycle(islice(nexts, pending))
 
 
+def interleave(*iterables, **kwds):
+    """Like roundrobin, but cheap for many (short) iterables, weighted or
+    batched.
+
+    >>> list(interleave('ABC', 'D', 'EF'))
+    ['A', 'D', 'E', 'B', 'F', 'C']
+
+    With batch=k up to k items are taken from each iterable per turn, which
+    reduces switching overhead:
+    >>> ''.join(interleave('ABCDE', 'abc', batch=2))
+    'ABabCDcE'
+
+    weights scale the number of items per turn for each iterable (deficit
+    round robin, so fractional weights are fine):
+    >>> ''.join(interleave('ABCDEF', 'abcdef', weights=[2, 0.5]))
+    'ABCDaEFbcdef'
+
+    Exhausted iterables are dropped once per turn instead of rebuilding
+    a cycle every time one is exhausted (as roundrobin does), which for
+    hundreds of iterables is much faster.
+
+    :param iterables: the iterables to interleave
+    :param batch: (max) number of items per turn
+    :param weights: per iterable positive weights multiplying batch
+    """
+    batch = kwds.pop('batch', 1)
+    weights = kwds.pop('weights', None)
+    if kwds:
+        raise TypeError('unexpected keyword arguments: %s' % sorted(kwds))
+    if batch < 1:
+        raise ValueError('batch must be >= 1, got %r' % (batch,))
+    if weights is None:
+        if batch == 1:
+            return _interleave(iterables)
+        chunks = _interleave_batches(iterables, batch)
+    else:
+        weights = list(weights)
+        if len(weights) != len(iterables):
+            raise ValueError('%d weights for %d iterables' % (
+                len(weights), len(iterables)))
+        if not all(w > 0 for w in weights):
+            raise ValueError('weights must be positive')
+        chunks = _interleave_weighted(
+            iterables, [w * batch for w in weights])
+    # flattening the chunks in C is what makes batches cheaper per item
+    return chain.from_iterable(chunks)
+
+
+def _interleave(iterables, _set=set):
+    # an exhausted iterator ends the inner for loop (no exception raised
+    # per exhausted iterable) and is dropped at the end of the turn
+    iterators = [iter(it) for it in iterables]
+    while iterators:
+        exhausted = None
+        for it in iterators:
+            for item in it:
+                yield item
+                break
+            else:
+                if exhausted is None:
+                    exhausted = _set()
+                exhausted.add(it)
+        if exhausted:
+            iterators = [it for it in iterators if it not in exhausted]
+
+
+def _interleave_batches(iterables, batch, _list=list, _islice=islice,
+                        _set=set):
+    iterators = [iter(it) for it in iterables]
+    while iterators:
+        exhausted = None
+        for it in iterators:
+            items = _list(_islice(it, batch))
+            yield items
+            if len(items) < batch:
+                if exhausted is None:
+                    exhausted = _set()
+                exhausted.add(it)
+        if exhausted:
+            iterators = [it for it in iterators if it not in exhausted]
+
+
+def _interleave_weighted(iterables, quanta, _list=list, _islice=islice,
+                         _int=int):
+    # deficit round robin: every turn an iterable's deficit grows by its
+    # quantum and it yields the integer part of it
+    iterators = [iter(it) for it in iterables]
+    quanta = _list(quanta)
+    deficits = [0.] * len(iterators)
+    while iterators:
+        exhausted = False
+        for i, it in enumerate(iterators):
+            deficit = deficits[i] + quanta[i]
+            n = _int(deficit)
+            deficits[i] = deficit - n
+            if n == 1:  # cheaper than islice
+                for item in it:
+                    yield (item,)
+                    break
+                else:
+                    iterators[i] = None
+                    exhausted = True
+            elif n:
+                items = _list(_islice(it, n))
+                yield items
+                if len(items) < n:
+                    iterators[i] = None
+                    exhausted = True
+        if exhausted:
+            keep = [i for i, it in enumerate(iterators) if it is not None]
+            iterators = [iterators[i] for i in keep]
+            quanta = [quanta[i] for i in keep]
+            deficits = [deficits[i] for i in keep]
+
+
 def powerset(
         iterable,
         _list=list,
@@ -286,6 +550,9 @@ def powerset(
         _len=len
 ):
     """powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3)
+
+    For len(), random access and resuming at an offset see
+    splendid.combinatorics.Powerset.
     
     >>> list(powerset([1, 2, 3]))
     [(), (1,), (2,), (3,), (1, 2), (1, 3), (2, 3), (1, 2, 3)]
@@ -294,7 +561,8 @@ def powerset(
     return _from_iterable(_combinations(s, r) for r in _range(_len(s)+1))
 
 
-def unique_everseen(iterable, key=None, _set=set, _ifilterfalse=filterfalse):
+def unique_everseen(iterable, key=None, max_seen=None, seen=None,
+                    _set=set, _ifilterfalse=filterfalse):
     """List unique elements, preserving order. Remember all elements ever seen.
     
     >>> list(unique_everseen('AAAABBBCCDAABBB'))
@@ -307,8 +575,39 @@ def unique_everseen(iterable, key=None, _set=set, _ifilterfalse=filterfalse):
     Works on infinite lists (uses memory for each new element):
     >>> take(5, unique_everseen(roundrobin(count(), count(10), count())))
     [0, 10, 1, 11, 2]
+
+    To bound memory, max_seen only remembers the max_seen most recently seen
+    elements (exact within that window, see splendid.sets.LRUSet):
+    >>> list(unique_everseen('ABCAD', max_seen=2))
+    ['A', 'B', 'C', 'A', 'D']
+
+    Any seen set can be passed in, e.g., a splendid.sets.BloomFilter which
+    remembers all elements in fixed memory but has false positives (might
+    drop some unique elements). Its stats can be inspected afterwards:
+    >>> from splendid.sets import BloomFilter
+    >>> bf = BloomFilter(capacity=10 ** 6, error_rate=0.001)
+    >>> take(5, unique_everseen(roundrobin(count(), count()), seen=bf))
+    [0, 1, 2, 3, 4]
+    >>> len(bf), bf.memory_usage
+    (5, 1797199)
+
+    :param iterable: the elements
+    :param key: function computing the key to compare elements by
+    :param max_seen: max number of most recently seen keys to remember
+    :param seen: set-like container for seen keys (with add and
+        __contains__ or test_and_add(key) returning if key was contained)
     """
-    seen = _set()
+    if max_seen is not None:
+        if seen is not None:
+            raise ValueError('pass either max_seen or seen, not both')
+        from .sets import LRUSet
+        seen = LRUSet(max_seen)
+    if seen is not None and not isinstance(seen, _set):
+        for element in _unique_everseen_bounded(iterable, key, seen):
+            yield element
+        return
+    if seen is None:
+        seen = _set()
     seen_add = seen.add
     if key is None:
         for element in _ifilterfalse(seen.__contains__, iterable):
@@ -322,6 +621,25 @@ def unique_everseen(iterable, key=None, _set=set, _ifilterfalse=filterfalse):
                 yield element
 
 
+def _unique_everseen_bounded(iterable, key, seen):
+    test_and_add = getattr(seen, 'test_and_add', None)
+    if test_and_add is None:
+        contains, add = seen.__contains__, seen.add
+
+        def test_and_add(k):
+            if contains(k):
+                return True
+            add(k)
+            return False
+    if key is None:
+        for element in filterfalse(test_and_add, iterable):
+            yield element
+    else:
+        for element in iterable:
+            if not test_and_add(key(element)):
+                yield element
+
+
 def unique_justseen(iterable, key=None,
                     _imap=map, _itemgetter=itemgetter(1), _groupby=groupby):
     """List unique elements, preserving order. Remember only element just seen.
@@ -376,6 +694,9 @@ def iter_except(func, exception, first=None):
 
 def random_product(*args, **kwds):
     """Random selection from product(*args, **kwds)
+
+    For many samples from the same pool use
+    splendid.sampling.ProductSampler.
     
     >>> random.seed(1)
     >>> random_product([1, 2, 3], [4, 5, 6])
@@ -389,6 +710,9 @@ def random_product(*args, **kwds):
 def random_permutation(iterable, r=2,
                        _tuple=tuple, _len=len, _sample=random.sample):
     """Random selection from permutations(iterable, r)
+
+    For many samples from the same pool use
+    splendid.sampling.PermutationSampler.
     
     >>> random.seed(11)
     >>> random_permutation([1, 2, 3])
@@ -408,6 +732,9 @@ def random_combination(
         _range=range
 ):
     """Random selection from combinations(iterable, r)
+
+    For many samples from the same pool use
+    splendid.sampling.CombinationSampler.
     
     >>> random.seed(0)
     >>> random_combination([1, 2, 3], 2)
@@ -428,6 +755,9 @@ def random_combination_with_replacement(
         _range=range
 ):
     """Random selection from combinations_with_replacement(iterable, r)
+
+    For many samples from the same pool use
+    splendid.sampling.CombinationWithReplacementSampler.
     
     >>> random.seed(42)
     >>> random_combination_with_replacement([1, 2, 3], 6)
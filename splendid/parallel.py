@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Parallel map over chunks of (possibly unbounded) iterables.
+
+Items are batched with splendid.chunker and whole chunks are sent to a
+concurrent.futures pool, so the per task overhead (and for processes the
+pickling overhead) is paid once per chunk instead of once per item. Results
+are streamed back lazily and only a bounded number of chunks is in flight at
+any time, so memory stays flat even on infinite inputs.
+"""
+
+from collections import deque
+from concurrent.futures import as_completed
+from concurrent.futures import Executor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from itertools import chain
+import os
+
+from . import chunker
+
+
+__all__ = [
+    'chunked_map',
+    'map_chunks',
+]
+
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+class _ChunkMapper(object):
+    """Picklable callable applying func to every item of a chunk."""
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, chunk):
+        return list(map(self.func, chunk))
+
+
+def chunked_map(
+        func, iterable, chunksize,
+        executor='thread',
+        ordered=True,
+        max_in_flight=None,
+        max_workers=None):
+    """Lazily map func over iterable in parallel, chunksize items per task.
+
+    >>> list(chunked_map(abs, range(-5, 5), 3))
+    [5, 4, 3, 2, 1, 0, 1, 2, 3, 4]
+
+    Works on infinite iterables as only max_in_flight chunks are submitted
+    ahead of the consumer:
+    >>> from itertools import count, islice
+    >>> list(islice(chunked_map(str, count(), 100), 3))
+    ['0', '1', '2']
+
+    With ordered=False chunks are yielded as soon as they complete (items
+    within a chunk keep their order):
+    >>> sorted(chunked_map(abs, range(-5, 5), 2, ordered=False))
+    [0, 1, 1, 2, 2, 3, 3, 4, 4, 5]
+
+    :param func: function to apply to each item, must be picklable for
+        executor='process'
+    :param iterable: input items, consumed lazily
+    :param chunksize: number of items sent to a worker per task
+    :param executor: 'thread', 'process' or an existing Executor instance
+        (which is not shut down afterwards)
+    :param ordered: yield results in input order (default) or as completed
+    :param max_in_flight: max number of submitted but not yet consumed chunks
+        (default: 2 * max_workers)
+    :param max_workers: number of workers if a new pool is created
+    :return: an iterator over func(item) for all items
+    """
+    return chain.from_iterable(map_chunks(
+        _ChunkMapper(func), iterable, chunksize,
+        executor=executor,
+        ordered=ordered,
+        max_in_flight=max_in_flight,
+        max_workers=max_workers,
+    ))
+
+
+def map_chunks(
+        func, iterable, chunksize,
+        executor='thread',
+        ordered=True,
+        max_in_flight=None,
+        max_workers=None):
+    """Lazily yield func(chunk) for chunks of iterable computed in parallel.
+
+    Lower level version of chunked_map: func is called once per chunk (a
+    list of up to chunksize items), which allows workers to filter, aggregate
+    or batch process their chunk.
+
+    >>> list(map_chunks(sum, range(10), 3))
+    [3, 12, 21, 9]
+
+    See chunked_map for a description of the parameters.
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be >= 1, got %d" % max_in_flight)
+    if not isinstance(executor, Executor):
+        try:
+            executor_cls = EXECUTORS[executor]
+        except KeyError:
+            raise ValueError(
+                "executor must be one of %s or an Executor instance, got %r"
+                % (sorted(EXECUTORS), executor))
+        return _owned_pool(
+            executor_cls, max_workers,
+            func, chunker(iterable, chunksize), ordered, max_in_flight)
+    return _map_chunks(
+        executor, func, chunker(iterable, chunksize), ordered, max_in_flight)
+
+
+def _owned_pool(executor_cls, max_workers, *args):
+    pool = executor_cls(max_workers=max_workers)
+    try:
+        for res in _map_chunks(pool, *args):
+            yield res
+    finally:
+        pool.shutdown(wait=True)
+
+
+def _map_chunks(pool, func, chunks, ordered, max_in_flight):
+    submit = pool.submit
+    if ordered:
+        pending = deque()
+        popleft = pending.popleft
+        append = pending.append
+    else:
+        pending = set()
+        append = pending.add
+    try:
+        for chunk in chunks:
+            if len(pending) >= max_in_flight:
+                if ordered:
+                    yield popleft().result()
+                else:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    append = pending.add
+                    for future in done:
+                        yield future.result()
+            append(submit(func, chunk))
+        if ordered:
+            while pending:
+                yield popleft().result()
+        else:
+            for future in as_completed(pending):
+                pending.discard(future)
+                yield future.result()
+    finally:
+        # consumer stopped early or an error occurred, drop what we can
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,678 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Fast repeated lookups of key paths in nested data structures.
+
+splendid.get_path walks a key path in a python loop with a try/except per
+key. When the same few paths are looked up in millions of records (e.g.,
+from `json.loads()`), the functions in here compile the paths once into
+specialised python code instead.
+
+Key paths may contain the wildcards WILDCARD (all list elements or dict
+values) and RECURSIVE (zero or more levels of nesting), in which case all
+matching values are returned as a list.
+
+query_jsonl streams these lookups over (large) JSON Lines files and
+PathIndex indexes many records by the values at key paths.
+"""
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
+from collections.abc import Mapping
+from itertools import product
+import json
+import os
+
+
+__all__ = [
+    'PathIndex',
+    'RECURSIVE',
+    'WILDCARD',
+    'compile_path',
+    'extract_many',
+    'iter_path',
+    'query_jsonl',
+]
+
+
+DEFAULT_EXPECTED_ERRORS = (LookupError, TypeError)
+
+
+class _Missing(object):
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<missing>'
+
+
+_missing = _Missing()
+
+
+class PathToken(object):
+    """Special (non key) element of a key path, see WILDCARD and RECURSIVE."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+    def __reduce__(self):
+        return self.name
+
+
+WILDCARD = PathToken('WILDCARD')
+RECURSIVE = PathToken('RECURSIVE')
+
+
+def _children(node, _mapping=Mapping):
+    if isinstance(node, _mapping):
+        return node.values()
+    if isinstance(node, (list, tuple)):
+        return node
+    return ()
+
+
+def _descendants(node):
+    """Yield node and all its (transitive) children depth first."""
+    stack = [node]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        node = pop()
+        yield node
+        children = _children(node)
+        if children:
+            extend(reversed(list(children)))
+
+
+def iter_path(nested, key_path, expected_errors=None):
+    """Yield all values in nested matching key_path (which may use wildcards).
+
+    >>> data = {'a': [{'id': 1}, {'id': 2, 'b': {'id': 3}}], 'id': 0}
+    >>> list(iter_path(data, ['a', WILDCARD, 'id']))
+    [1, 2]
+    >>> list(iter_path(data, ['a', 1, WILDCARD]))
+    [2, {'id': 3}]
+    >>> list(iter_path(data, [RECURSIVE, 'id']))
+    [0, 1, 2, 3]
+    >>> list(iter_path(data, ['a', 0, 'nope']))
+    []
+
+    :param nested: a nested dictionary or list like structure
+    :param key_path: an iterable of keys, WILDCARD and RECURSIVE
+    :param expected_errors: expected errors, use for custom data structures
+    :return: iterator over all matching values
+    """
+    return _iter_path(
+        nested, tuple(key_path), 0, expected_errors or DEFAULT_EXPECTED_ERRORS)
+
+
+def _iter_path(node, key_path, i, expected_errors):
+    for i in range(i, len(key_path)):
+        key = key_path[i]
+        if key is WILDCARD:
+            subs = _children(node)
+        elif key is RECURSIVE:
+            subs = _descendants(node)
+        else:
+            try:
+                node = node[key]
+            except expected_errors:
+                return
+            continue
+        for sub in subs:
+            for res in _iter_path(sub, key_path, i + 1, expected_errors):
+                yield res
+        return
+    yield node
+
+
+def _split_path(key_path):
+    """Split key_path into its literal prefix and the rest (from a token)."""
+    for i, key in enumerate(key_path):
+        if isinstance(key, PathToken):
+            return key_path[:i], key_path[i:]
+    return key_path, ()
+
+
+def compile_path(
+        key_path,
+        default=None,
+        expected_errors=DEFAULT_EXPECTED_ERRORS):
+    """Compile key_path into a function equivalent to get_path(nested, ...).
+
+    The returned function does all lookups in a single expression guarded by
+    a single try/except, so it's several times faster than get_path for
+    repeated lookups of the same path.
+
+    >>> get_bar = compile_path(['foo', 0, 'bar'], 'not found')
+    >>> get_bar({'foo':[{'bar':3}]})
+    3
+    >>> get_bar({'foo':[{'baz':3}]})
+    'not found'
+    >>> get_bar({'foo': None})
+    'not found'
+    >>> get_bar.key_path
+    ('foo', 0, 'bar')
+    >>> compile_path([])({'foo': 1})
+    {'foo': 1}
+
+    Paths with wildcards return lists of all matches:
+    >>> compile_path(['foo', WILDCARD, 'bar'])({'foo':[{'bar':3}, {'bar': 4}]})
+    [3, 4]
+
+    :param key_path: an iterable resembling a path of keys
+    :param default: returned if any key in the path isn't found
+    :param expected_errors: expected errors, use for custom data structures
+    :return: a function mapping nested to nested[k0][k1]...[kn] or default
+    """
+    key_path = tuple(key_path)
+    prefix, rest = _split_path(key_path)
+    if rest:
+        get_prefix = compile_path(prefix, _missing, expected_errors)
+
+        def get_path(nested):
+            node = get_prefix(nested)
+            if node is _missing:
+                return []
+            return list(_iter_path(node, rest, 0, expected_errors))
+        get_path.__doc__ = 'Compiled get_path(nested, %r).' % (key_path,)
+        get_path.key_path = key_path
+        return get_path
+
+    ns = {'_errors': expected_errors, '_default': default}
+    args = ['nested', '_errors=_errors', '_default=_default']
+    for i, key in enumerate(key_path):
+        ns['_k%d' % i] = key
+        args.append('_k%d=_k%d' % (i, i))
+    src = (
+        'def get_path(%s):\n'
+        '    try:\n'
+        '        return nested%s\n'
+        '    except _errors:\n'
+        '        return _default\n'
+    ) % (', '.join(args), ''.join('[_k%d]' % i for i in range(len(key_path))))
+    exec(src, ns)
+    func = ns['get_path']
+    func.__doc__ = 'Compiled get_path(nested, %r).' % (key_path,)
+    func.key_path = key_path
+    return func
+
+
+def extract_many(
+        records,
+        paths,
+        default=None,
+        typecodes=None,
+        expected_errors=DEFAULT_EXPECTED_ERRORS):
+    """Extract several key paths from many records in a single pass.
+
+    Returns the extracted values column wise as a dict mapping the names in
+    paths to lists (or arrays, see typecodes). The paths are merged into a
+    prefix tree, so lookups for a common prefix are done once per record and
+    not once per path.
+
+    >>> records = [
+    ...     {'user': {'id': 1, 'name': 'ann'}, 'n': 3},
+    ...     {'user': {'id': 2}, 'n': 5},
+    ...     {'n': 7},
+    ... ]
+    >>> cols = extract_many(records, {
+    ...     'uid': ['user', 'id'],
+    ...     'name': ['user', 'name'],
+    ...     'n': ['n'],
+    ... })
+    >>> cols['uid'], cols['name'], cols['n']
+    ([1, 2, None], ['ann', None, None], [3, 5, 7])
+
+    Paths with wildcards extract lists of all matches:
+    >>> extract_many(records, {'fields': ['user', WILDCARD]})
+    {'fields': [[1, 'ann'], [2], []]}
+
+    Numeric columns can be collected into compact arrays:
+    >>> extract_many(records, {'n': ['n']}, typecodes={'n': 'q'})
+    {'n': array('q', [3, 5, 7])}
+
+    :param records: iterable of nested dictionary or list like structures
+    :param paths: dict mapping column names to key paths
+    :param default: value for missing paths (must fit the typecode if any)
+    :param typecodes: dict mapping column names to array.array typecodes,
+        columns not in it are collected as lists
+    :param expected_errors: expected errors, use for custom data structures
+    :return: dict mapping column names to lists or arrays of values
+    """
+    typecodes = typecodes or {}
+    columns = {}
+    for name in paths:
+        tc = typecodes.get(name)
+        columns[name] = array(tc) if tc else []
+    _compile_extractor(paths, columns, default, expected_errors)(records)
+    return columns
+
+
+def _compile_extractor(paths, columns, default, expected_errors):
+    """Generate a function appending all paths of each record to columns.
+
+    Every node of the prefix tree of paths gets a variable v<i> holding the
+    looked up value or _missing. The generated code is flat (no nesting
+    deeper than two blocks), so arbitrarily deep paths can be compiled.
+    """
+    ns = {
+        '_errors': expected_errors,
+        '_default': default,
+        '_missing': _missing,
+    }
+    nodes = {(): 0}  # path prefix: node id
+    lines = []
+    for ci, (name, key_path) in enumerate(paths.items()):
+        key_path, rest = _split_path(tuple(key_path))
+        for depth in range(1, len(key_path) + 1):
+            prefix = key_path[:depth]
+            if prefix in nodes:
+                continue
+            i = nodes[prefix] = len(nodes)
+            p = nodes[key_path[:depth - 1]]
+            ns['_k%d' % i] = prefix[-1]
+            lines.extend([
+                '        if v%d is _missing:' % p,
+                '            v%d = _missing' % i,
+                '        else:',
+                '            try:',
+                '                v%d = v%d[_k%d]' % (i, p, i),
+                '            except _errors:',
+                '                v%d = _missing' % i,
+            ])
+        ns['_a%d' % ci] = columns[name].append
+        i = nodes[key_path]
+        if rest:
+            # wildcards: literal prefix is shared, rest is iterated per record
+            ns['_r%d' % ci] = compile_path(rest, None, expected_errors)
+            lines.append(
+                '        _a%d([] if v%d is _missing else _r%d(v%d))'
+                % (ci, i, ci, i))
+        else:
+            lines.append(
+                '        _a%d(_default if v%d is _missing else v%d)'
+                % (ci, i, i))
+    src = 'def extract(records, %s):\n    for v0 in records:\n%s\n' % (
+        ', '.join('%s=%s' % (k, k) for k in sorted(ns)),
+        '\n'.join(lines) or '        pass',
+    )
+    exec(src, ns)
+    return ns['extract']
+
+
+def query_jsonl(
+        path_or_file,
+        key_paths,
+        default=None,
+        prefilter=True,
+        blocksize=1 << 20,
+        expected_errors=DEFAULT_EXPECTED_ERRORS):
+    """Stream values of key_paths from each record of a JSON Lines file.
+
+    For every (non blank) line a tuple with one value per key path is
+    yielded. The file is read in blocks of about blocksize bytes. If
+    prefilter is True, lines that don't contain the first key of any of the
+    key paths (as JSON string) are not decoded at all and just yield
+    defaults. This assumes that keys aren't written with unnecessary escape
+    sequences (e.g., "\\u0075ser" instead of "user"), non-ASCII keys may be
+    written escaped or not.
+
+    >>> import io
+    >>> f = io.BytesIO(
+    ...     b'{"user": {"id": 1, "tags": ["a", "b"]}, "msg": "hi"}\\n'
+    ...     b'{"msg": "no user here"}\\n'
+    ...     b'\\n'
+    ...     b'{"user": {"id": 2, "tags": []}}\\n'
+    ... )
+    >>> for res in query_jsonl(f, [['user', 'id'], ['user', 'tags', WILDCARD]]):
+    ...     print(res)
+    (1, ['a', 'b'])
+    (None, [])
+    (2, [])
+
+    :param path_or_file: file name (or os.PathLike) or (binary or text) file
+        object
+    :param key_paths: list of key paths (which may contain wildcards)
+    :param default: value for missing paths without wildcards
+    :param prefilter: skip decoding of lines not containing any first key
+    :param blocksize: approximate number of bytes to read at once
+    :param expected_errors: expected errors, use for custom data structures
+    :return: iterator over tuples of values, one per record
+    """
+    getters = [
+        compile_path(key_path, default, expected_errors)
+        for key_path in key_paths
+    ]
+    wildcards = [bool(_split_path(tuple(kp))[1]) for kp in key_paths]
+    needles = None
+    if prefilter:
+        needles = []
+        for key_path in key_paths:
+            key_path = tuple(key_path)
+            if not key_path or not isinstance(key_path[0], str):
+                needles = None  # can't prefilter, need to decode all
+                break
+            # non-ASCII keys might be written escaped (json.dumps default)
+            # or as is (ensure_ascii=False)
+            needles.append(json.dumps(key_path[0], ensure_ascii=False))
+            escaped = json.dumps(key_path[0])
+            if escaped != needles[-1]:
+                needles.append(escaped)
+    if isinstance(path_or_file, (str, os.PathLike)):
+        with open(path_or_file, 'rb') as f:
+            for res in _query_lines(
+                    f, getters, wildcards, default, needles, blocksize):
+                yield res
+    else:
+        for res in _query_lines(
+                path_or_file, getters, wildcards, default, needles,
+                blocksize):
+            yield res
+
+
+def _query_lines(f, getters, wildcards, default, needles, blocksize):
+    loads = json.loads
+    defaults = tuple(default for _ in getters)
+    if any(wildcards):
+        defaults = None  # fresh empty lists for each skipped record
+    readlines = f.readlines
+    binary = None
+    while True:
+        lines = readlines(blocksize)
+        if not lines:
+            return
+        if binary is None:
+            binary = not isinstance(lines[0], str)
+            if needles is not None and binary:
+                needles = [n.encode('utf-8') for n in needles]
+        for line in lines:
+            if not line.strip():
+                continue
+            if needles is not None:
+                for needle in needles:
+                    if needle in line:
+                        break
+                else:
+                    yield defaults or tuple([
+                        [] if w else default for w in wildcards])
+                    continue
+            record = loads(line.decode('utf-8') if binary else line)
+            yield tuple([g(record) for g in getters])
+
+
+def _compile_keys(key_paths, expected_errors):
+    """Function mapping a record to a tuple of its index keys.
+
+    The tuple is empty if a path is missing, has one key per distinct match
+    for wildcard paths and composite (tuple) keys for several key paths.
+    """
+    getters = [
+        (compile_path(key_path, _missing, expected_errors),
+         bool(_split_path(tuple(key_path))[1]))
+        for key_path in key_paths
+    ]
+    if len(getters) == 1 and not getters[0][1]:
+        get = getters[0][0]
+
+        def keys(record):
+            key = get(record)
+            return () if key is _missing else (key,)
+        return keys
+
+    def keys(record):
+        values = []
+        for get, wildcard in getters:
+            value = get(record)
+            if wildcard:
+                value = tuple(set(value))
+            elif value is _missing:
+                return ()
+            else:
+                value = (value,)
+            if not value:
+                return ()
+            values.append(value)
+        if len(values) == 1:
+            return values[0]
+        return tuple(product(*values))
+    return keys
+
+
+def _insert_position(positions, pos):
+    """Insert pos into the sorted array positions (usually appending)."""
+    if not positions or positions[-1] < pos:
+        positions.append(pos)
+    else:
+        i = bisect_left(positions, pos)
+        if i == len(positions) or positions[i] != pos:
+            positions.insert(i, pos)
+
+
+def _remove_position(positions, pos):
+    """Remove pos from the sorted array positions (if in there)."""
+    i = bisect_left(positions, pos)
+    if i < len(positions) and positions[i] == pos:
+        del positions[i]
+
+
+class PathIndex(object):
+    """Secondary index of records by the value(s) at key path(s).
+
+    Built once from compiled get_path lookups, it turns scans for records
+    with a certain nested value into dict lookups (and range queries into
+    binary searches). For each key only the positions of its records are
+    stored, in arrays of 8 byte ints.
+
+    >>> records = [
+    ...     {'user': {'id': 3}, 'type': 'click', 'tags': ['a', 'b']},
+    ...     {'user': {'id': 1}, 'type': 'view', 'tags': ['b']},
+    ...     {'user': {'id': 3}, 'type': 'view', 'tags': []},
+    ...     {'type': 'click'},
+    ... ]
+    >>> by_user = PathIndex(records, ['user', 'id'])
+    >>> [r['type'] for r in by_user.get(3)]
+    ['click', 'view']
+    >>> by_user.get(3, positions=True), by_user.get(7)
+    (array('q', [0, 2]), [])
+
+    Records lacking a key path aren't indexed, their positions are kept:
+    >>> by_user.missing
+    array('q', [3])
+
+    Range queries (lo <= key < hi) and groups use the sorted keys:
+    >>> by_user.range(2, positions=True)
+    array('q', [0, 2])
+    >>> [(k, len(rs)) for k, rs in by_user.groups(sort=True)]
+    [(1, 1), (3, 2)]
+
+    Several key paths result in composite (tuple) keys, wildcard paths index
+    a record under each of its matches:
+    >>> PathIndex(records, ['user', 'id'], ['type']).count((3, 'view'))
+    1
+    >>> by_tag = PathIndex(records, ['tags', WILDCARD])
+    >>> by_tag.get('b', positions=True)
+    array('q', [0, 1])
+
+    The index can be updated when records are added, removed or changed:
+    >>> pos = by_user.add({'user': {'id': 1}})
+    >>> by_user.get(1, positions=True)
+    array('q', [1, 4])
+    >>> by_user.update(1, {'user': {'id': 2}})
+    >>> by_user.remove(4)
+    >>> by_user.keys(sort=True), by_user.range(1, 2, inclusive=True)
+    ([2, 3], [{'user': {'id': 2}}])
+
+    :param records: list of records (positions refer to it, add() appends to
+        it) or iterable (copied into a list), available as .records
+    :param key_paths: one or more key paths (which may contain wildcards),
+        values at the key paths must be hashable (and comparable for range
+        queries and sorted groups)
+    :param expected_errors: expected errors, use for custom data structures
+    """
+    def __init__(self, records, *key_paths, **kwds):
+        expected_errors = kwds.pop('expected_errors', DEFAULT_EXPECTED_ERRORS)
+        if kwds:
+            raise TypeError('unexpected keyword arguments: %s' % sorted(kwds))
+        if not key_paths:
+            raise TypeError('PathIndex needs at least one key path')
+        self.key_paths = tuple(tuple(key_path) for key_path in key_paths)
+        self.records = records if isinstance(records, list) else list(records)
+        self.missing = array('q')
+        self._expected_errors = expected_errors
+        self._keys_of = _compile_keys(self.key_paths, expected_errors)
+        self._index = {}
+        self._sorted = None  # sorted keys, built by the first range query
+        self._build()
+
+    def _build(self, _array=array, _missing=_missing):
+        index = self._index
+        get = index.get
+        missing = self.missing.append
+        if len(self.key_paths) == 1 and not _split_path(self.key_paths[0])[1]:
+            # single key per record: skip the tuples of _keys_of
+            get_key = compile_path(
+                self.key_paths[0], _missing, self._expected_errors)
+            for pos, record in enumerate(self.records):
+                key = get_key(record)
+                if key is _missing:
+                    missing(pos)
+                    continue
+                positions = get(key)
+                if positions is None:
+                    index[key] = _array('q', (pos,))
+                else:
+                    positions.append(pos)
+            return
+        keys_of = self._keys_of
+        for pos, record in enumerate(self.records):
+            keys = keys_of(record)
+            if not keys:
+                missing(pos)
+            for key in keys:
+                positions = get(key)
+                if positions is None:
+                    index[key] = _array('q', (pos,))
+                else:
+                    positions.append(pos)
+
+    def _insert(self, pos):
+        keys = self._keys_of(self.records[pos])
+        if not keys:
+            _insert_position(self.missing, pos)
+        for key in keys:
+            positions = self._index.get(key)
+            if positions is None:
+                self._index[key] = array('q', (pos,))
+                if self._sorted is not None:
+                    insort(self._sorted, key)
+            else:
+                _insert_position(positions, pos)
+
+    def add(self, record):
+        """Append record to records and index it, returning its position."""
+        self.records.append(record)
+        pos = len(self.records) - 1
+        self._insert(pos)
+        return pos
+
+    def remove(self, pos):
+        """Remove the record at pos from the index.
+
+        It stays in records (so positions don't change). Its keys are looked
+        up again, so remove a record before changing it in place (and add it
+        again with update(pos) afterwards).
+        """
+        keys = self._keys_of(self.records[pos])
+        if not keys:
+            _remove_position(self.missing, pos)
+        for key in keys:
+            positions = self._index.get(key)
+            if positions is None:
+                continue
+            _remove_position(positions, pos)
+            if not positions:
+                del self._index[key]
+                if self._sorted is not None:
+                    del self._sorted[bisect_left(self._sorted, key)]
+
+    def update(self, pos, record=_missing):
+        """Re-index the record at pos, replacing it with record if given.
+
+        Without record, the record at pos must have been removed before it
+        was changed in place.
+        """
+        if record is not _missing:
+            self.remove(pos)
+            self.records[pos] = record
+        self._insert(pos)
+
+    def _result(self, positions, as_positions):
+        if as_positions:
+            return array('q', positions)
+        return list(map(self.records.__getitem__, positions))
+
+    def get(self, key, positions=False):
+        """Records (or their positions) with the given key (in order)."""
+        return self._result(self._index.get(key, ()), positions)
+
+    def count(self, key):
+        """Number of records with the given key."""
+        return len(self._index.get(key, ()))
+
+    def keys(self, sort=False):
+        """List of the distinct keys (sorted by key if sort)."""
+        return list(self._sorted_keys() if sort else self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def _sorted_keys(self):
+        # built on first use, then maintained by _insert and remove
+        if self._sorted is None:
+            self._sorted = sorted(self._index)
+        return self._sorted
+
+    def range(self, lo=None, hi=None, inclusive=False, positions=False):
+        """Records (or positions) with lo <= key < hi, ordered by key.
+
+        :param lo: lower bound (None: unbounded)
+        :param hi: upper bound (None: unbounded)
+        :param inclusive: if keys equal to hi are included
+        :param positions: return an array of positions instead of records
+        """
+        keys = self._sorted_keys()
+        i = 0 if lo is None else bisect_left(keys, lo)
+        if hi is None:
+            j = len(keys)
+        else:
+            j = (bisect_right if inclusive else bisect_left)(keys, hi)
+        res = array('q')
+        index = self._index
+        for key in keys[i:j]:
+            res.extend(index[key])
+        return res if positions else self._result(res, False)
+
+    def groups(self, sort=False, positions=False):
+        """Iterate over (key, records (or positions)) pairs.
+
+        :param sort: yield the groups sorted by key
+        :param positions: yield arrays of positions instead of records
+        """
+        index = self._index
+        for key in self.keys(sort):
+            yield key, self._result(index[key], positions)
+
+    def __repr__(self):
+        return '<PathIndex %s: %d keys, %d records>' % (
+            ', '.join(map(repr, map(list, self.key_paths))), len(self),
+            len(self.records))
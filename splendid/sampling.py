@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Bulk random sampling.
+
+splendid.randbool produces one bit per call through several python frames.
+randbools draws all bits for n (possibly biased) booleans with a few
+getrandbits calls and converts them in C, randbool_stream buffers those
+blocks for an infinite stream.
+
+The random_product, random_permutation, random_combination and
+random_combination_with_replacement recipes re-tuple their pool on every call
+and use the global random module. The *Sampler classes freeze the pool once
+and draw many samples per call from their own rng.
+
+All of them accept an explicit rng (a random.Random instance for
+reproducible per-thread streams or a NumPy Generator).
+"""
+
+import random
+
+
+__all__ = [
+    'CombinationSampler',
+    'CombinationWithReplacementSampler',
+    'PermutationSampler',
+    'ProductSampler',
+    'randbool_stream',
+    'randbools',
+]
+
+
+# maps the ascii digits of a binary string to 0 / 1 bytes
+_BIN_TO_BYTES = bytes(bytearray(
+    1 if i == ord('1') else 0 for i in range(256)))
+
+# max number of bits of p used to bias the bits (see _biased_bits)
+_P_PRECISION = 64
+
+
+def _is_numpy_generator(rng):
+    return hasattr(rng, 'bit_generator')
+
+
+def _p_fraction(p):
+    """Return (num, k) with p ~= num / 2**k, num odd (or 0), k <= 64."""
+    if not 0. <= p <= 1.:
+        raise ValueError('p must be in [0, 1], got %r' % (p,))
+    num, den = float(p).as_integer_ratio()
+    k = den.bit_length() - 1
+    if k > _P_PRECISION:
+        num = (num << _P_PRECISION) + (den >> 1) >> k  # round
+        k = _P_PRECISION
+    while num and not num & 1:
+        num >>= 1
+        k -= 1
+    return num, k
+
+
+def _biased_bits(n, p, getrandbits):
+    """Return an n bit int in which each bit is set with probability p.
+
+    Every draw of n random bits either halves the probability of each bit
+    being set (and) or moves it halfway towards 1 (or). Processing the binary
+    digits of p from least to most significant ends at exactly p, so with k
+    binary digits this takes k calls of getrandbits(n) and big int ops in C
+    instead of n python level comparisons.
+    """
+    num, k = _p_fraction(p)
+    if num == 0:
+        return 0
+    if k == 0:  # p == 1
+        return (1 << n) - 1
+    bits = 0
+    for _ in range(k):
+        if num & 1:
+            bits |= getrandbits(n)
+        else:
+            bits &= getrandbits(n)
+        num >>= 1
+    return bits
+
+
+def _bits_to_bytes(bits, n):
+    """Bytearray of n 0 / 1 bytes, item i being bit i of bits."""
+    s = format(bits, '0%db' % n)[::-1]
+    return bytearray(s.encode('ascii').translate(_BIN_TO_BYTES))
+
+
+def randbools(n, p=0.5, rng=None, out='list'):
+    """Return n random booleans which are True with probability p.
+
+    >>> rng = random.Random(42)
+    >>> randbools(10, rng=rng)
+    [False, True, True, True, False, False, False, True, False, True]
+    >>> sum(randbools(10000, p=0.1, rng=rng))
+    1003
+
+    Besides lists of bools, bytearrays with one 0 / 1 byte per value and
+    bit-packed bytearrays (value i is bit i % 8 of byte i // 8, like
+    numpy.packbits(..., bitorder='little')) can be returned:
+    >>> randbools(10, rng=random.Random(42), out='bytearray')
+    bytearray(b'\\x00\\x01\\x01\\x01\\x00\\x00\\x00\\x01\\x00\\x01')
+    >>> randbools(10, rng=random.Random(42), out='packed')
+    bytearray(b'\\x8e\\x02')
+
+    Instead of n python level calls this needs just one getrandbits(n) call
+    for p=0.5. Other probabilities are used with their exact binary
+    expansion (rounded to 64 bits), which takes one call per binary digit
+    of p (e.g., 2 calls for p=0.25, 64 for p=0.1).
+
+    :param n: number of values
+    :param p: probability for True
+    :param rng: random.Random instance or NumPy Generator (which draws
+        uniform floats in bulk), defaults to the global random module
+    :param out: 'list', 'bytearray', 'packed' or 'numpy' (bool array)
+    """
+    if n < 0:
+        raise ValueError('n must be >= 0, got %r' % (n,))
+    if out not in ('list', 'bytearray', 'packed', 'numpy'):
+        raise ValueError(
+            "out must be 'list', 'bytearray', 'packed' or 'numpy', got %r"
+            % (out,))
+    if rng is None:
+        rng = random
+    if _is_numpy_generator(rng):
+        _p_fraction(p)  # validate p
+        return _from_numpy(rng.random(n) < p, out)
+    bits = _biased_bits(n, p, rng.getrandbits) if n else 0
+    if out == 'packed':
+        return bytearray(bits.to_bytes((n + 7) // 8, 'little'))
+    values = _bits_to_bytes(bits, n) if n else bytearray()
+    if out == 'list':
+        return list(map(bool, values))
+    if out == 'bytearray':
+        return values
+    import numpy as np
+    return np.frombuffer(bytes(values), dtype=np.bool_).copy()
+
+
+def _from_numpy(values, out):
+    if out == 'numpy':
+        return values
+    if out == 'list':
+        return values.tolist()
+    import numpy as np
+    if out == 'packed':
+        return bytearray(np.packbits(values, bitorder='little').tobytes())
+    return bytearray(values.view(np.uint8).tobytes())
+
+
+def randbool_stream(p=0.5, rng=None, blocksize=4096):
+    """Infinite iterator of random booleans which are True with probability p.
+
+    The values are generated by randbools in blocks of blocksize values, so
+    per value only the cost of iterating remains.
+
+    >>> from itertools import islice
+    >>> list(islice(randbool_stream(rng=random.Random(42)), 10))
+    [True, False, True, True, True, False, False, True, True, False]
+
+    :param p: probability for True
+    :param rng: random.Random instance or NumPy Generator, defaults to the
+        global random module
+    :param blocksize: number of values generated at once
+    """
+    if blocksize < 1:
+        raise ValueError('blocksize must be >= 1, got %r' % (blocksize,))
+    _p_fraction(p)  # raise for invalid p now, not on first next()
+    return _randbool_stream(p, rng, blocksize)
+
+
+def _randbool_stream(p, rng, blocksize):
+    while True:
+        for value in randbools(blocksize, p, rng):
+            yield value
+
+
+class _Sampler(object):
+    """Base class of the samplers.
+
+    Subclasses set self.pool and implement _sample(k) (python rng) and
+    _index_matrix(np_rng, k).
+    """
+    def __init__(self, rng=None, seed=None):
+        if rng is None:
+            # own instance: reproducible with seed and no contention on the
+            # global random module's lock
+            rng = random.Random(seed)
+        elif seed is not None:
+            raise ValueError('pass either rng or seed, not both')
+        self.rng = rng
+        self._numpy = _is_numpy_generator(rng)
+        self._np_rng = rng if self._numpy else None
+
+    def __call__(self):
+        """Draw a single sample."""
+        return self.sample(1)[0]
+
+    def sample(self, k):
+        """Return a list of k samples (tuples)."""
+        if self._numpy:
+            return self._take(self.index_matrix(k).tolist())
+        return self._sample(k)
+
+    def _take(self, rows):
+        getter = self.pool.__getitem__
+        return [tuple(map(getter, row)) for row in rows]
+
+    def stream(self, blocksize=1024):
+        """Infinite iterator of samples, drawn in blocks of blocksize."""
+        sample = self.sample
+        while True:
+            for s in sample(blocksize):
+                yield s
+
+    __iter__ = stream
+
+    def index_matrix(self, k):
+        """Return a (k, r) NumPy array of pool indices, one sample per row.
+
+        Requires NumPy. With a python rng a NumPy Generator is seeded from it
+        once, so results stay reproducible.
+        """
+        if self._np_rng is None:
+            import numpy as np
+            self._np_rng = np.random.default_rng(self.rng.getrandbits(128))
+        return self._index_matrix(self._np_rng, k)
+
+    def __repr__(self):
+        return '<%s pool of %d, r=%d>' % (
+            self.__class__.__name__, len(self.pool), self.r)
+
+
+def _check_r(n, r):
+    if r < 0:
+        raise ValueError('r must be >= 0, got %r' % (r,))
+    if r > n:
+        raise ValueError('r=%d larger than pool of %d' % (r, n))
+
+
+class ProductSampler(_Sampler):
+    """Random selections from product(*pools, repeat=repeat).
+
+    >>> sampler = ProductSampler('ab', [1, 2, 3], seed=1)
+    >>> sampler()
+    ('a', 3)
+    >>> sampler.sample(3)
+    [('b', 2), ('a', 2), ('a', 3)]
+
+    Samples are drawn column wise with one rng.choices call per pool.
+
+    :param pools: iterables to choose from (each is tupled once)
+    :param repeat: repeat the pools like itertools.product
+    :param rng: random.Random instance or NumPy Generator
+    :param seed: seed for a new random.Random instance (if no rng)
+    """
+    def __init__(self, *pools, **kwds):
+        repeat = kwds.pop('repeat', 1)
+        super(ProductSampler, self).__init__(**kwds)
+        self.pools = tuple(map(tuple, pools)) * repeat
+        if not all(self.pools):
+            raise ValueError('cannot sample from an empty pool')
+        self.r = len(self.pools)
+
+    @property
+    def pool(self):
+        return self.pools
+
+    def _sample(self, k):
+        if not self.pools:
+            return [()] * k
+        choices = self.rng.choices
+        return list(zip(*[choices(pool, k=k) for pool in self.pools]))
+
+    def _take(self, rows):
+        pools = self.pools
+        return [tuple(map(tuple.__getitem__, pools, row)) for row in rows]
+
+    def _index_matrix(self, np_rng, k):
+        import numpy as np
+        return np.column_stack(
+            [np_rng.integers(0, len(pool), size=k) for pool in self.pools]
+        ).reshape(k, self.r)
+
+    def __repr__(self):
+        return '<ProductSampler of %d pools>' % self.r
+
+
+class PermutationSampler(_Sampler):
+    """Random selections from permutations(iterable, r).
+
+    >>> sampler = PermutationSampler(range(5), 3, seed=1)
+    >>> sampler.sample(2)
+    [(1, 0, 4), (0, 3, 1)]
+
+    :param iterable: the pool (tupled once)
+    :param r: length of each permutation, defaults to the pool size
+    :param rng: random.Random instance or NumPy Generator
+    :param seed: seed for a new random.Random instance (if no rng)
+    """
+    def __init__(self, iterable, r=None, rng=None, seed=None):
+        super(PermutationSampler, self).__init__(rng, seed)
+        self.pool = tuple(iterable)
+        self.r = len(self.pool) if r is None else r
+        _check_r(len(self.pool), self.r)
+
+    def _sample(self, k, _tuple=tuple):
+        sample, pool, r = self.rng.sample, self.pool, self.r
+        return [_tuple(sample(pool, r)) for _ in range(k)]
+
+    def _index_matrix(self, np_rng, k):
+        return _random_subsets(np_rng, len(self.pool), self.r, k, False)
+
+
+def _random_subsets(np_rng, n, r, k, sort):
+    """(k, r) array of distinct indices < n per row, optionally sorted."""
+    import numpy as np
+    if k * n <= 1 << 24:
+        # argsort of random keys is a uniform random permutation per row
+        keys = np_rng.random((k, n))
+        if r < n:
+            idx = np.argpartition(keys, r - 1, axis=1)[:, :r] if r else (
+                np.empty((k, 0), dtype=np.intp))
+            if not sort:
+                # argpartition doesn't randomize order within the first r
+                order = np.take_along_axis(keys, idx, axis=1).argsort(axis=1)
+                idx = np.take_along_axis(idx, order, axis=1)
+        else:
+            idx = keys.argsort(axis=1)
+    else:  # don't allocate k * n keys
+        idx = np.array(
+            [np_rng.choice(n, r, replace=False) for _ in range(k)],
+            dtype=np.intp).reshape(k, r)
+    if sort:
+        idx.sort(axis=1)
+    return idx
+
+
+class CombinationSampler(_Sampler):
+    """Random selections from combinations(iterable, r).
+
+    >>> sampler = CombinationSampler('abcde', 3, seed=1)
+    >>> sampler.sample(2)
+    [('a', 'b', 'e'), ('a', 'b', 'd')]
+
+    :param iterable: the pool (tupled once)
+    :param r: length of each combination
+    :param rng: random.Random instance or NumPy Generator
+    :param seed: seed for a new random.Random instance (if no rng)
+    """
+    def __init__(self, iterable, r, rng=None, seed=None):
+        super(CombinationSampler, self).__init__(rng, seed)
+        self.pool = tuple(iterable)
+        self.r = r
+        _check_r(len(self.pool), r)
+        self._indices = range(len(self.pool))
+
+    def _sample(self, k, _tuple=tuple, _map=map, _sorted=sorted):
+        sample, indices, r = self.rng.sample, self._indices, self.r
+        getter = self.pool.__getitem__
+        return [
+            _tuple(_map(getter, _sorted(sample(indices, r))))
+            for _ in range(k)
+        ]
+
+    def _index_matrix(self, np_rng, k):
+        return _random_subsets(np_rng, len(self.pool), self.r, k, True)
+
+
+class CombinationWithReplacementSampler(_Sampler):
+    """Random selections from combinations_with_replacement(iterable, r).
+
+    Like random_combination_with_replacement, each sample is r sorted
+    uniform choices, which is not uniform over all combinations.
+
+    >>> sampler = CombinationWithReplacementSampler([1, 2, 3], 4, seed=1)
+    >>> sampler.sample(2)
+    [(1, 1, 3, 3), (2, 2, 2, 3)]
+
+    :param iterable: the pool (tupled once)
+    :param r: length of each combination
+    :param rng: random.Random instance or NumPy Generator
+    :param seed: seed for a new random.Random instance (if no rng)
+    """
+    def __init__(self, iterable, r, rng=None, seed=None):
+        super(CombinationWithReplacementSampler, self).__init__(rng, seed)
+        self.pool = tuple(iterable)
+        self.r = r
+        if r < 0:
+            raise ValueError('r must be >= 0, got %r' % (r,))
+        if r and not self.pool:
+            raise ValueError('cannot sample from an empty pool')
+        self._indices = range(len(self.pool))
+
+    def _sample(self, k, _tuple=tuple, _map=map, _sorted=sorted):
+        choices, indices, r = self.rng.choices, self._indices, self.r
+        getter = self.pool.__getitem__
+        return [
+            _tuple(_map(getter, _sorted(choices(indices, k=r))))
+            for _ in range(k)
+        ]
+
+    def _index_matrix(self, np_rng, k):
+        idx = np_rng.integers(0, len(self.pool), size=(k, self.r))
+        idx.sort(axis=1)
+        return idx
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Memory bounded "seen" sets, e.g., for unique_everseen on endless streams.
+
+LRUSet is exact but only remembers the maxsize most recently seen elements.
+BloomFilter remembers all elements in a fixed number of bits, at the cost of
+false positives (elements reported as seen although they weren't) at a
+configurable rate.
+
+Both offer the set methods add and __contains__ plus test_and_add, which
+does both with a single lookup, and report their memory usage and error
+stats.
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+import math
+import sys
+
+
+__all__ = [
+    'BloomFilter',
+    'LRUSet',
+]
+
+
+class LRUSet(object):
+    """Set of the maxsize most recently seen elements.
+
+    Adding an element that is already contained refreshes it, so frequently
+    seen elements stay while the least recently seen ones are evicted:
+
+    >>> s = LRUSet(2)
+    >>> s.test_and_add('a'), s.test_and_add('b'), s.test_and_add('a')
+    (False, False, True)
+    >>> s.add('c')  # evicts 'b'
+    >>> sorted(s), 'b' in s, s.evictions
+    (['a', 'c'], False, 1)
+
+    :param maxsize: max number of elements
+    """
+    def __init__(self, maxsize):
+        if maxsize < 1:
+            raise ValueError('maxsize must be >= 1, got %r' % (maxsize,))
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def test_and_add(self, element):
+        """Add element, return if it was contained before."""
+        data = self._data
+        if element in data:
+            data.move_to_end(element)
+            return True
+        data[element] = None
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+            self.evictions += 1
+        return False
+
+    def add(self, element):
+        self.test_and_add(element)
+
+    def discard(self, element):
+        self._data.pop(element, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, element):
+        return element in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    @property
+    def memory_usage(self):
+        """Bytes used by the container (without the elements themselves)."""
+        return sys.getsizeof(self._data)
+
+    def stats(self):
+        """Dict of size, memory and eviction stats.
+
+        Evicted elements are forgotten, so each eviction is a potential
+        false negative (an element reported as unseen although it was).
+        """
+        return {
+            'len': len(self),
+            'maxsize': self.maxsize,
+            'evictions': self.evictions,
+            'memory_usage': self.memory_usage,
+        }
+
+    def __repr__(self):
+        return '<LRUSet %d/%d>' % (len(self), self.maxsize)
+
+
+_MASK64 = (1 << 64) - 1
+_INT64 = 1 << 63
+
+
+def _mix64(x):
+    """Two 32 bit hashes of int x from the splitmix64 finalizer (a bijection
+    on 64 bit ints, so signed 64 bit ints never collide)."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    x ^= x >> 31
+    return x & 0xFFFFFFFF, x >> 32 | 1
+
+
+def _hashes(element, _isinstance=isinstance, _int=int, _hash=hash,
+            _from_bytes=int.from_bytes):
+    """Two hashes of element for BloomFilter.
+
+    hash() can't be used for ints (e.g., hash(-1) == hash(-2)) and isn't
+    stable across processes for str and bytes, so 64 bit ints (and equal
+    floats) are mixed from their value and str, bytes and larger ints hashed
+    with a digest. Other elements fall back to hash().
+    """
+    if _isinstance(element, _int):
+        if -_INT64 <= element < _INT64:
+            return _mix64(element)
+        data = b'i' + element.to_bytes(
+            element.bit_length() // 8 + 1, 'little', signed=True)
+    elif _isinstance(element, str):
+        data = b's' + element.encode('utf-8', 'surrogatepass')
+    elif _isinstance(element, bytes):
+        data = b'b' + element
+    elif _isinstance(element, float) and element.is_integer():
+        return _hashes(_int(element))
+    else:
+        return _hash((element,)), _hash((element, 1)) | 1
+    h = _from_bytes(blake2b(data, digest_size=16).digest(), 'little')
+    return h & _MASK64, h >> 64 | 1
+
+
+class BloomFilter(object):
+    """Approximate set with a fixed memory size (a Bloom filter).
+
+    Elements are never forgotten, but while at most capacity distinct
+    elements were added, only error_rate of unseen elements are falsely
+    reported as contained (there are no false negatives). False positives
+    while adding also make len() slightly undercount:
+
+    >>> bf = BloomFilter(capacity=1000, error_rate=0.01)
+    >>> bf.num_bits, bf.num_hashes, bf.memory_usage
+    (9586, 7, 1199)
+    >>> bf.test_and_add(-5), bf.test_and_add(-5), -7 in bf
+    (False, True, False)
+    >>> for i in range(1000):
+    ...     bf.add(i)
+    >>> len(bf), round(bf.estimated_error_rate, 3)
+    (999, 0.011)
+
+    Ints, str and bytes are hashed by value (the same in all processes),
+    other elements with hash(), so they need to be hashable and membership
+    is only meaningful within one process.
+
+    :param capacity: expected max number of distinct elements
+    :param error_rate: max false positive rate at capacity
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1, got %r' % (capacity,))
+        if not 0. < error_rate < 1.:
+            raise ValueError(
+                'error_rate must be in (0, 1), got %r' % (error_rate,))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        ln2 = math.log(2)
+        self.num_bits = int(math.ceil(
+            -capacity * math.log(error_rate) / (ln2 * ln2)))
+        self.num_hashes = max(1, int(round(
+            self.num_bits / capacity * ln2)))
+        self.bits_set = 0
+        self._count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _indices(self, element, _hashes=_hashes):
+        # double hashing: num_hashes indices from two hashes (reduced first,
+        # which gives the same indices with cheaper small int arithmetic)
+        h1, h2 = _hashes(element)
+        m = self.num_bits
+        h1 %= m
+        h2 = h2 % m or 1
+        return [i % m for i in range(h1, h1 + self.num_hashes * h2, h2)]
+
+    def test_and_add(self, element):
+        """Add element, return if it was (probably) contained before."""
+        bits = self._bits
+        indices = self._indices(element)
+        for i in indices:
+            if not bits[i >> 3] >> (i & 7) & 1:
+                break
+        else:
+            return True
+        new = 0
+        for i in indices:
+            byte, mask = i >> 3, 1 << (i & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new += 1
+        self.bits_set += new
+        self._count += 1
+        return False
+
+    def add(self, element):
+        self.test_and_add(element)
+
+    def __contains__(self, element):
+        bits = self._bits
+        for i in self._indices(element):
+            if not bits[i >> 3] >> (i & 7) & 1:
+                return False
+        return True
+
+    def __len__(self):
+        """Number of distinct elements added (approximately, false
+        positives are not counted)."""
+        return self._count
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.bits_set = 0
+        self._count = 0
+
+    @property
+    def memory_usage(self):
+        """Bytes used by the bit array."""
+        return len(self._bits)
+
+    @property
+    def fill_ratio(self):
+        return self.bits_set / self.num_bits
+
+    @property
+    def estimated_error_rate(self):
+        """Current probability of a false positive for an unseen element."""
+        return self.fill_ratio ** self.num_hashes
+
+    def stats(self):
+        """Dict of size, memory and (estimated) error stats."""
+        return {
+            'len': len(self),
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'estimated_error_rate': self.estimated_error_rate,
+            'fill_ratio': self.fill_ratio,
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'memory_usage': self.memory_usage,
+        }
+
+    @classmethod
+    def for_memory(cls, max_bytes, error_rate=0.01):
+        """Filter with the largest capacity fitting into max_bytes.
+
+        >>> bf = BloomFilter.for_memory(2 ** 20, error_rate=0.001)
+        >>> bf.capacity, bf.memory_usage
+        (583450, 1048576)
+        """
+        ln2 = math.log(2)
+        bits_per_element = -math.log(error_rate) / (ln2 * ln2)
+        return cls(int(max_bytes * 8 / bits_per_element), error_rate)
+
+    def __repr__(self):
+        return '<BloomFilter %d/%d, %d bytes>' % (
+            len(self), self.capacity, self.memory_usage)
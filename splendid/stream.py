@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Lazy, fused stream pipelines over the itertools recipes.
+
+Chaining chunker, flatten, unique_everseen, pairwise, take, ... by hand
+adds a generator frame and a function call per item and stage. Stream
+instead records the stages as a plan and only compiles it when iterated:
+runs of map and filter stages are fused into a single generated loop that
+processes batches of items, a chunk immediately followed by a flatten is
+dropped and consecutive takes are merged. The other stages are executed with
+the C speed building blocks of splendid (chunker, windowed, ...).
+"""
+
+from itertools import chain
+from itertools import islice
+
+from . import chunker
+from .itertools_recipies import pairwise
+from .itertools_recipies import unique_everseen
+from .windows import windowed
+
+
+__all__ = [
+    'Stream',
+]
+
+
+class _Fused(object):
+    """Picklable callable applying a run of map and filter stages to a batch
+    of items in a single (generated) loop, returning a list."""
+    def __init__(self, stages):
+        self.stages = tuple(stages)
+        self._func = None
+
+    def __call__(self, batch):
+        if self._func is None:
+            self._func = _compile_fused(self.stages)
+        return self._func(batch)
+
+    def __getstate__(self):
+        return {'stages': self.stages}
+
+    def __setstate__(self, state):
+        self.stages = state['stages']
+        self._func = None
+
+    def __repr__(self):
+        return 'fused(%s)' % ', '.join(_describe(s) for s in self.stages)
+
+
+# generated fused function factories by tuple of stage kinds
+_fused_makers = {}
+
+
+def _compile_fused(stages):
+    """Generate a function looping over a batch that applies stages.
+
+    For (map f0, filter f1, map f2) the generated code is:
+
+    def fused(batch):
+        out = []
+        append = out.append
+        for x in batch:
+            x = f0(x)
+            if not f1(x):
+                continue
+            x = f2(x)
+            append(x)
+        return out
+    """
+    kinds = tuple(kind for kind, _ in stages)
+    make = _fused_makers.get(kinds)
+    if make is None:
+        names = ['f%d' % i for i in range(len(kinds))]
+        lines = [
+            'def make(%s):' % ', '.join(names),
+            '    def fused(batch):',
+            '        out = []',
+            '        append = out.append',
+            '        for x in batch:',
+        ]
+        for kind, name in zip(kinds, names):
+            if kind == 'map':
+                lines.append('            x = %s(x)' % name)
+            else:
+                lines.append('            if not %s(x):' % name)
+                lines.append('                continue')
+        lines += [
+            '            append(x)',
+            '        return out',
+            '    return fused',
+        ]
+        namespace = {}
+        exec(compile('\n'.join(lines), '<splendid.stream fused>', 'exec'),
+             namespace)
+        make = _fused_makers[kinds] = namespace['make']
+    return make(*[func for _, func in stages])
+
+
+def _name(func):
+    return getattr(func, '__name__', None) or repr(func)
+
+
+# parameters of the stages: names of required ones, (name, default) pairs
+_PARAMS = {
+    'map': ('func',),
+    'filter': ('pred',),
+    'chunk': ('n', ('fillvalue', None)),
+    'flatten': (),
+    'unique': (('key', None), ('max_seen', None)),
+    'window': ('n', ('step', 1), ('fillvalue', None), ('partial', False)),
+    'pairwise': (),
+    'take': ('k',),
+}
+
+
+def _describe(stage):
+    """E.g., 'window(3, step=2)', only showing non-default arguments."""
+    args = []
+    for param, value in zip(_PARAMS[stage[0]], stage[1:]):
+        text = _name(value) if callable(value) else repr(value)
+        if not isinstance(param, tuple):
+            args.append(text)
+        elif value != param[1]:
+            args.append('%s=%s' % (param[0], text))
+    return '%s(%s)' % (stage[0], ', '.join(args))
+
+
+def _optimize(stages):
+    """Rewrite the stages: drop chunk + flatten pairs, merge takes."""
+    res = []
+    for stage in stages:
+        if res and stage[0] == 'flatten' and res[-1][0] == 'chunk' and (
+                res[-1][2] is None):
+            res.pop()
+            continue
+        if res and stage[0] == 'take' and res[-1][0] == 'take':
+            res[-1] = ('take', min(res[-1][1], stage[1]))
+            continue
+        res.append(stage)
+    return res
+
+
+def _plan(stages, batch_size):
+    """List of (description, step) with step(iterator) -> iterator."""
+    plan = []
+    run = []
+    for stage in _optimize(stages) + [('end',)]:
+        if stage[0] in ('map', 'filter'):
+            run.append(stage)
+            continue
+        if len(run) == 1:
+            # a single stage is fastest (and fully lazy) as builtin
+            plan.append((_describe(run[0]), _builtin(*run[0])))
+        elif run:
+            fused = _Fused(run)
+            plan.append((
+                '%r in batches of %d' % (fused, batch_size),
+                _batched(fused, batch_size)))
+        run = []
+        if stage[0] != 'end':
+            plan.append((_describe(stage), _STEPS[stage[0]](*stage[1:])))
+    return plan
+
+
+def _builtin(kind, func):
+    builtin = map if kind == 'map' else filter
+    return lambda it: builtin(func, it)
+
+
+def _batched(fused, batch_size):
+    def step(it):
+        return chain.from_iterable(
+            map(fused, chunker(it, batch_size, dtype=tuple)))
+    return step
+
+
+_STEPS = {
+    'chunk': lambda n, fillvalue: (
+        lambda it: chunker(it, n, fillvalue=fillvalue)),
+    'flatten': lambda: chain.from_iterable,
+    'unique': lambda key, max_seen: (
+        lambda it: unique_everseen(it, key=key, max_seen=max_seen)),
+    'window': lambda n, step, fillvalue, partial: (
+        lambda it: windowed(
+            it, n, step=step, fillvalue=fillvalue, partial=partial,
+            dtype=tuple)),
+    'pairwise': lambda: pairwise,
+    'take': lambda k: lambda it: islice(it, k),
+}
+
+
+class Stream(object):
+    """Fluent, lazy pipeline over an iterable.
+
+    Each method returns a new Stream with one more stage, nothing is computed
+    before the stream is iterated:
+
+    >>> s = Stream(range(20)).map(abs).filter(lambda x: x % 3)
+    >>> s = s.map(str).chunk(4).take(2)
+    >>> list(s)
+    [['1', '2', '4', '5'], ['7', '8', '10', '11']]
+
+    Consecutive map and filter stages are fused into a single generated loop
+    over batches of batch_size items (which is read ahead from the source), a
+    chunk directly followed by a flatten is removed and takes are merged, see
+    explain():
+
+    >>> s = Stream([3, 1, 3, 2]).map(abs).filter(bool).map(str).chunk(2)
+    >>> print(s.flatten().unique().take(5).take(3).explain())
+    Stream([3, 1, 3, 2])
+      fused(map(abs), filter(bool), map(str)) in batches of 1024
+      unique()
+      take(3)
+    >>> s.flatten().unique().take(3).to_list()
+    ['3', '1', '2']
+
+    :param iterable: the source items
+    :param batch_size: number of items fused map/filter stages process at
+        once (1 for no read-ahead)
+    """
+    def __init__(self, iterable, batch_size=1024):
+        if batch_size < 1:
+            raise ValueError('batch_size must be >= 1, got %r' % (batch_size,))
+        self.source = iterable
+        self.batch_size = batch_size
+        self.stages = ()
+
+    def _then(self, *stage):
+        res = Stream(self.source, self.batch_size)
+        res.stages = self.stages + (stage,)
+        return res
+
+    def map(self, func):
+        """Apply func to each item."""
+        return self._then('map', func)
+
+    def filter(self, pred):
+        """Only keep items for which pred(item) is true."""
+        return self._then('filter', pred)
+
+    def chunk(self, n, fillvalue=None):
+        """Group items into lists of n (see splendid.chunker)."""
+        if n < 1:
+            raise ValueError("can't chunk by n=%r" % (n,))
+        return self._then('chunk', n, fillvalue)
+
+    def flatten(self):
+        """Flatten one level of nesting."""
+        return self._then('flatten')
+
+    def unique(self, key=None, max_seen=None):
+        """Only keep the first occurrence of each item (see unique_everseen).
+        """
+        return self._then('unique', key, max_seen)
+
+    def window(self, n, step=1, fillvalue=None, partial=False):
+        """Tuples of n consecutive items every step items (see
+        splendid.windows.windowed)."""
+        if n < 1 or step < 1:
+            raise ValueError('n and step must be >= 1, got %r, %r' % (n, step))
+        return self._then('window', n, step, fillvalue, partial)
+
+    def pairwise(self):
+        """Tuples of each two consecutive items."""
+        return self._then('pairwise')
+
+    def take(self, k):
+        """Only the first k items."""
+        if k < 0:
+            raise ValueError('k must be >= 0, got %r' % (k,))
+        return self._then('take', k)
+
+    def __iter__(self):
+        it = iter(self.source)
+        for _, step in _plan(self.stages, self.batch_size):
+            it = step(it)
+        return it
+
+    def to_list(self):
+        return list(self)
+
+    def explain(self):
+        """Describe the optimized plan, one step per line."""
+        source = repr(self.source)
+        if len(source) > 60:
+            source = '<%s>' % type(self.source).__name__
+        return '\n'.join(['Stream(%s)' % source] + [
+            '  ' + description
+            for description, _ in _plan(self.stages, self.batch_size)])
+
+    def __repr__(self):
+        return '<Stream with %d stages>' % len(self.stages)
+
+    def parallel(self, workers=None, chunksize=None, executor='thread',
+                 ordered=True):
+        """Iterate, running the map/filter stages in parallel.
+
+        Each run of map and filter stages is applied to chunks of chunksize
+        items in a pool of workers (see splendid.parallel.map_chunks), the
+        other stages run in this thread:
+
+        >>> s = Stream(range(10)).map(abs).filter(lambda x: x % 2).chunk(2)
+        >>> list(s.parallel(2, chunksize=3))
+        [[1, 3], [5, 7], [9]]
+
+        :param workers: pool size (default: see ThreadPoolExecutor)
+        :param chunksize: items per task (default: batch_size)
+        :param executor: 'thread', 'process' (then all functions need to be
+            picklable) or an Executor instance
+        :param ordered: keep the order of the items
+        :return: an iterator over the results
+        """
+        from .parallel import map_chunks
+        chunksize = chunksize or self.batch_size
+        it = iter(self.source)
+        for stage in self._parallel_stages():
+            if isinstance(stage, _Fused):
+                it = chain.from_iterable(map_chunks(
+                    stage, it, chunksize, executor=executor,
+                    ordered=ordered, max_workers=workers))
+            else:
+                it = _STEPS[stage[0]](*stage[1:])(it)
+        return it
+
+    def _parallel_stages(self):
+        res = []
+        for stage in _optimize(self.stages):
+            if stage[0] not in ('map', 'filter'):
+                res.append(stage)
+            elif res and isinstance(res[-1], _Fused):
+                res[-1] = _Fused(res[-1].stages + (stage,))
+            else:
+                res.append(_Fused([stage]))
+        return res
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Batch versions of the timedelta_to_* conversions for whole columns.
+
+The conversions avoid a python function call per timedelta and collect
+their results into compact array.array objects (or lists). NumPy timedelta64
+and datetime64 arrays are converted vectorized (NumPy is optional and only
+used if such arrays are passed in or out='numpy' is requested).
+"""
+
+from array import array
+import datetime
+from itertools import repeat
+from operator import sub
+from operator import truediv
+
+
+__all__ = [
+    'datetime_diffs_to_microseconds',
+    'datetime_diffs_to_ms',
+    'datetime_diffs_to_s',
+    'timedeltas_to_microseconds',
+    'timedeltas_to_ms',
+    'timedeltas_to_s',
+]
+
+
+# unit: (array typecode, numpy dtype)
+_UNITS = {
+    'us': ('q', 'int64'),
+    'ms': ('d', 'float64'),
+    's': ('d', 'float64'),
+}
+
+
+def _is_numpy(x):
+    return type(x).__module__ == 'numpy' and hasattr(x, 'dtype')
+
+
+def _microseconds(tds):
+    # inlined arithmetic beats a function call per item and even
+    # td // timedelta(microseconds=1), which goes through generic (slow) C
+    # long arithmetic
+    return [
+        (td.days * 86400 + td.seconds) * 1000000 + td.microseconds
+        for td in tds
+    ]
+
+
+def _values(tds, unit):
+    if unit == 's':
+        # same as microseconds / 10**6, correctly rounded, in C
+        return map(datetime.timedelta.total_seconds, tds)
+    us = _microseconds(tds)
+    if unit == 'ms':
+        return map(truediv, us, repeat(1000))
+    return us
+
+
+def _convert(tds, unit, out):
+    typecode, np_dtype = _UNITS[unit]
+    if _is_numpy(tds) and tds.dtype.kind == 'm':
+        import numpy as np
+        if unit == 'us':
+            res = tds.astype('timedelta64[us]').astype(np.int64)
+        else:
+            res = tds / np.timedelta64(1, unit)
+        return res if out in ('numpy', 'array') else res.tolist()
+    values = _values(tds, unit)
+    if out == 'array':
+        return array(typecode, values)
+    if out == 'list':
+        return list(values)
+    if out == 'numpy':
+        import numpy as np
+        return np.fromiter(values, dtype=np_dtype)
+    raise ValueError("out must be 'array', 'list' or 'numpy', got %r" % out)
+
+
+def _diffs(ends, starts):
+    if _is_numpy(ends) or _is_numpy(starts):
+        import numpy as np
+        return np.asarray(ends) - np.asarray(starts)
+    return map(sub, ends, starts)
+
+
+def timedeltas_to_microseconds(tds, out='array'):
+    """Convert many timedelta objects into microseconds.
+
+    Equivalent to [timedelta_to_microseconds(td) for td in tds], but faster
+    and returning a compact array('q') by default.
+
+    >>> tds = [datetime.timedelta(seconds=1, microseconds=5),
+    ...        datetime.timedelta(days=-1)]
+    >>> timedeltas_to_microseconds(tds)
+    array('q', [1000005, -86400000000])
+    >>> timedeltas_to_microseconds(tds, out='list')
+    [1000005, -86400000000]
+
+    NumPy timedelta64 arrays are converted vectorized into int64 arrays.
+
+    :param tds: iterable of timedeltas or NumPy timedelta64 array
+    :param out: 'array' (array.array, NumPy array for NumPy input),
+        'list' or 'numpy'
+    """
+    return _convert(tds, 'us', out)
+
+
+def timedeltas_to_ms(tds, out='array'):
+    """Convert many timedelta objects into milliseconds (floats).
+
+    >>> timedeltas_to_ms([datetime.timedelta(microseconds=1500)])
+    array('d', [1.5])
+    """
+    return _convert(tds, 'ms', out)
+
+
+def timedeltas_to_s(tds, out='array'):
+    """Convert many timedelta objects into seconds (floats).
+
+    >>> timedeltas_to_s([datetime.timedelta(minutes=1, microseconds=1)])
+    array('d', [60.000001])
+    """
+    return _convert(tds, 's', out)
+
+
+def datetime_diffs_to_microseconds(ends, starts, out='array'):
+    """Microseconds between aligned sequences of datetimes (ends - starts).
+
+    >>> starts = [datetime.datetime(2010, 10, 28, 19, 14, 12, 1539)] * 2
+    >>> ends = [datetime.datetime(2010, 10, 28, 19, 15, 12, 298),
+    ...         datetime.datetime(2010, 10, 28, 19, 14, 12, 1539)]
+    >>> datetime_diffs_to_microseconds(ends, starts)
+    array('q', [59998759, 0])
+
+    Also accepts NumPy datetime64 arrays.
+    """
+    return _convert(_diffs(ends, starts), 'us', out)
+
+
+def datetime_diffs_to_ms(ends, starts, out='array'):
+    """Milliseconds between aligned sequences of datetimes (ends - starts).
+
+    >>> starts = [datetime.datetime(2010, 10, 28, 19, 14, 12, 1539)]
+    >>> ends = [datetime.datetime(2010, 10, 28, 19, 15, 12, 298)]
+    >>> datetime_diffs_to_ms(ends, starts)
+    array('d', [59998.759])
+    """
+    return _convert(_diffs(ends, starts), 'ms', out)
+
+
+def datetime_diffs_to_s(ends, starts, out='array'):
+    """Seconds between aligned sequences of datetimes (ends - starts).
+
+    >>> starts = [datetime.datetime(2010, 10, 28, 19, 15, 12, 298)]
+    >>> ends = [datetime.datetime(2010, 10, 28, 19, 14, 12, 1539)]
+    >>> datetime_diffs_to_s(ends, starts)
+    array('d', [-59.998759])
+    """
+    return _convert(_diffs(ends, starts), 's', out)
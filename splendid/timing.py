@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Statistical micro-benchmarks.
+
+splendid.time_func times a single call, which is fine for slow functions,
+but for fast ones noise and timer resolution dominate. benchmark() instead
+auto-ranges the number of loops per trial (like timeit), warms up, runs
+several trials with the garbage collector disabled and summarizes them.
+compare() runs two callables interleaved and tests if the difference between
+them is statistically significant (Welch's t-test). import_times() measures
+how long importing a module takes in fresh interpreters.
+"""
+
+import gc
+import math
+import subprocess
+import sys
+from timeit import default_timer as timer
+
+
+__all__ = [
+    'Benchmark',
+    'BenchmarkResult',
+    'Comparison',
+    'benchmark',
+    'compare',
+    'import_times',
+]
+
+
+def _percentile(sorted_values, p):
+    """Linearly interpolated percentile (0 <= p <= 100) of sorted values."""
+    if not sorted_values:
+        raise ValueError('no values')
+    k = (len(sorted_values) - 1) * p / 100.
+    lo = int(math.floor(k))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    lo_value = sorted_values[lo]
+    return lo_value + (sorted_values[hi] - lo_value) * (k - lo)
+
+
+class BenchmarkResult(object):
+    """Per call timings (in seconds) of all trials of a benchmark.
+
+    >>> r = BenchmarkResult([3., 1., 2., 4.], loops=10, name='foo')
+    >>> r.min, r.median, r.mean, r.max
+    (1.0, 2.5, 2.5, 4.0)
+    >>> round(r.stdev, 3), round(r.p90, 3), r.ops_per_sec
+    (1.291, 3.7, 0.4)
+    >>> print(r)
+    foo: median 2.5 s (min 1 s, p90 3.7 s, stdev 1.29 s), 0.4 ops/s, 4 x 10 loops
+    """
+    def __init__(self, times, loops=1, name=None):
+        self.times = sorted(times)
+        self.loops = loops
+        self.name = name
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def min(self):
+        return self.times[0]
+
+    @property
+    def max(self):
+        return self.times[-1]
+
+    @property
+    def mean(self):
+        return math.fsum(self.times) / len(self.times)
+
+    @property
+    def median(self):
+        return _percentile(self.times, 50)
+
+    @property
+    def variance(self):
+        n = len(self.times)
+        if n < 2:
+            return 0.
+        mean = self.mean
+        return math.fsum((t - mean) ** 2 for t in self.times) / (n - 1)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def p90(self):
+        return _percentile(self.times, 90)
+
+    @property
+    def p99(self):
+        return _percentile(self.times, 99)
+
+    @property
+    def ops_per_sec(self):
+        """Calls per second based on the median."""
+        median = self.median
+        return 1. / median if median > 0 else float('inf')
+
+    def percentile(self, p):
+        return _percentile(self.times, p)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'loops': self.loops,
+            'times': self.times,
+            'min': self.min,
+            'median': self.median,
+            'mean': self.mean,
+            'stdev': self.stdev,
+            'p90': self.p90,
+            'p99': self.p99,
+            'ops_per_sec': self.ops_per_sec,
+        }
+
+    def __repr__(self):
+        return '<BenchmarkResult %s>' % self
+
+    def __str__(self):
+        return (
+            '%s: median %s (min %s, p90 %s, stdev %s), %.3g ops/s, '
+            '%d x %d loops' % (
+                self.name or 'benchmark',
+                format_seconds(self.median),
+                format_seconds(self.min),
+                format_seconds(self.p90),
+                format_seconds(self.stdev),
+                self.ops_per_sec,
+                len(self.times),
+                self.loops,
+            ))
+
+
+def format_seconds(s):
+    """Format a duration with a sensible unit.
+
+    >>> format_seconds(1.5), format_seconds(.0021), format_seconds(3.2e-7)
+    ('1.5 s', '2.1 ms', '320 ns')
+    """
+    for unit, factor in (('s', 1.), ('ms', 1e3), ('us', 1e6)):
+        if abs(s) * factor >= 1.:
+            return '%.3g %s' % (s * factor, unit)
+    return '%.3g ns' % (s * 1e9)
+
+
+def _betacf(a, b, x):
+    """Continued fraction for the incomplete beta function (Lentz)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1., a - 1.
+    c = 1.
+    d = 1. - qab * x / qap
+    d = 1. / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1. + aa * d
+        d = 1. / (d if abs(d) > tiny else tiny)
+        c = 1. + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1. + aa * d
+        d = 1. / (d if abs(d) > tiny else tiny)
+        c = 1. + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.) < 1e-12:
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.:
+        return 0.
+    if x >= 1.:
+        return 1.
+    lbt = (
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+        + a * math.log(x) + b * math.log(1. - x))
+    if x < (a + 1.) / (a + b + 2.):
+        return math.exp(lbt) * _betacf(a, b, x) / a
+    return 1. - math.exp(lbt) * _betacf(b, a, 1. - x) / b
+
+
+def welch_t_test(a, b):
+    """Welch's t-test for two BenchmarkResults, returns (t, df, p).
+
+    p is the two-sided p-value for the hypothesis that both have equal means.
+    """
+    va, vb = a.variance / len(a), b.variance / len(b)
+    if va + vb == 0.:
+        return (0., float('inf'), 1. if a.mean == b.mean else 0.)
+    t = (a.mean - b.mean) / math.sqrt(va + vb)
+    df = (va + vb) ** 2 / (
+        (va ** 2 / (len(a) - 1) if len(a) > 1 else 0.)
+        + (vb ** 2 / (len(b) - 1) if len(b) > 1 else 0.)
+        or 1e-300)
+    p = _betainc(df / 2., .5, df / (df + t * t))
+    return t, df, p
+
+
+class Comparison(object):
+    """Result of compare(): baseline vs. candidate benchmark results."""
+    def __init__(self, baseline, candidate, alpha=0.05):
+        self.baseline = baseline
+        self.candidate = candidate
+        self.alpha = alpha
+        self.t, self.df, self.p_value = welch_t_test(baseline, candidate)
+
+    @property
+    def speedup(self):
+        """How many times faster candidate is than baseline (by median)."""
+        return self.baseline.median / self.candidate.median
+
+    @property
+    def significant(self):
+        return self.p_value < self.alpha
+
+    def __repr__(self):
+        return '<Comparison %s>' % self
+
+    def __str__(self):
+        return '%s vs. %s: %.3gx %s (p=%.3g%s)' % (
+            self.candidate.name or 'candidate',
+            self.baseline.name or 'baseline',
+            self.speedup if self.speedup >= 1 else 1. / self.speedup,
+            'faster' if self.speedup >= 1 else 'slower',
+            self.p_value,
+            '' if self.significant else ', not significant',
+        )
+
+
+class Benchmark(object):
+    """Configurable micro-benchmark runner.
+
+    >>> bench = Benchmark(repeat=3, min_time=0.001)
+    >>> res = bench.run(sum, range(100))
+    >>> len(res.times), res.loops >= 1, res.min <= res.median <= res.max
+    (3, True, True)
+
+    :param repeat: number of trials
+    :param min_time: min duration of each trial in seconds, the number of
+        loops per trial is auto-ranged (1, 2, 5, 10, 20, 50, ...) to reach it
+    :param loops: fixed number of loops per trial (disables auto-ranging)
+    :param warmup: number of calls before timing
+    :param disable_gc: disable the garbage collector while timing
+    """
+    def __init__(self, repeat=7, min_time=0.2, loops=None, warmup=1,
+                 disable_gc=True):
+        if repeat < 1:
+            raise ValueError('repeat must be >= 1, got %d' % repeat)
+        self.repeat = repeat
+        self.min_time = min_time
+        self.loops = loops
+        self.warmup = warmup
+        self.disable_gc = disable_gc
+
+    def _trial(self, func, args, kwds, loops, _timer=timer, _range=range):
+        it = _range(loops)
+        start = _timer()
+        for _ in it:
+            func(*args, **kwds)
+        return _timer() - start
+
+    def autorange(self, func, *args, **kwds):
+        """Return the number of loops needed for a trial to take min_time."""
+        if self.loops:
+            return self.loops
+        i = 1
+        while True:
+            for loops in (i, 2 * i, 5 * i):
+                if self._trial(func, args, kwds, loops) >= self.min_time:
+                    return loops
+            i *= 10
+
+    def _prepare(self, func, args, kwds):
+        for _ in range(self.warmup):
+            func(*args, **kwds)
+        return self.autorange(func, *args, **kwds)
+
+    def _run_trials(self, funcs_loops, args, kwds):
+        times = [[] for _ in funcs_loops]
+        gc_was_enabled = gc.isenabled()
+        if self.disable_gc:
+            gc.disable()
+        try:
+            for _ in range(self.repeat):
+                # interleave funcs to spread out drift (e.g., CPU throttling)
+                for res, (func, loops) in zip(times, funcs_loops):
+                    res.append(self._trial(func, args, kwds, loops) / loops)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return times
+
+    def run(self, func, *args, **kwds):
+        """Benchmark func(*args, **kwds), returns a BenchmarkResult."""
+        loops = self._prepare(func, args, kwds)
+        times, = self._run_trials([(func, loops)], args, kwds)
+        return BenchmarkResult(times, loops, _name(func))
+
+    def compare(self, baseline, candidate, *args, **kwds):
+        """Benchmark two callables with the same args, returns a Comparison."""
+        funcs_loops = [
+            (func, self._prepare(func, args, kwds))
+            for func in (baseline, candidate)
+        ]
+        times_a, times_b = self._run_trials(funcs_loops, args, kwds)
+        return Comparison(
+            BenchmarkResult(times_a, funcs_loops[0][1], _name(baseline)),
+            BenchmarkResult(times_b, funcs_loops[1][1], _name(candidate)),
+        )
+
+
+def _name(func):
+    return getattr(func, '__name__', None) or repr(func)
+
+
+def benchmark(func, *args, **kwds):
+    """Benchmark func(*args, **kwds) with default settings.
+
+    For other settings use Benchmark(...).run(func, *args, **kwds).
+
+    >>> res = benchmark(sorted, [3, 1, 2])
+    >>> res.name, len(res.times)
+    ('sorted', 7)
+    >>> 0 < res.min <= res.median <= res.p99 <= res.max
+    True
+    """
+    return Benchmark().run(func, *args, **kwds)
+
+
+def compare(baseline, candidate, *args, **kwds):
+    """Compare two callables with default settings (but 15 trials each).
+
+    For other settings use Benchmark(...).compare(baseline, candidate, ...).
+
+    >>> def slow(iterable):
+    ...     res = []
+    ...     for i in iterable:
+    ...         res.append(i)
+    ...     return res
+    >>> bench = Benchmark(repeat=10, min_time=0.005)
+    >>> c = bench.compare(slow, list, range(1000))
+    >>> c.speedup > 1
+    True
+
+    (See c.significant if the difference could be noise.)
+    """
+    return Benchmark(repeat=15).compare(baseline, candidate, *args, **kwds)
+
+
+def _parse_importtime(output, module):
+    """Cumulative seconds of module and all modules it imported from the
+    -X importtime output (a post-order tree: the lines above module's top
+    level line with deeper indentation are the modules it imported)."""
+    lines = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        lines.append((depth, name.strip(), int(cumulative) / 1e6))
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i][:2] == (0, module):
+            break
+    else:
+        raise ValueError('%r was not imported' % (module,))
+    res = {module: lines[i][2]}
+    for depth, name, cumulative in reversed(lines[:i]):
+        if depth == 0:
+            break
+        res[name] = cumulative
+    return res
+
+
+def import_times(module, repeat=5, executable=None):
+    """Measure the import time of module (and all modules it imports).
+
+    Imports module in repeat fresh interpreters with -X importtime (python
+    >= 3.7) and returns a dict of module name: min cumulative seconds, which
+    contains module and all modules only imported because of it (modules
+    python imports on startup anyway are not included):
+
+    >>> times = import_times('json', repeat=1)
+    >>> 'json' in times and 'json.decoder' in times
+    True
+    >>> times['json'] >= times['json.decoder'] > 0
+    True
+
+    :param module: name of the module to import
+    :param repeat: number of interpreters to start (the min time is used)
+    :param executable: python interpreter (default: the current one)
+    :return: dict of module name: cumulative import seconds
+    """
+    cmd = [executable or sys.executable, '-X', 'importtime', '-c',
+           'import ' + module]
+    res = {}
+    for _ in range(repeat):
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        _, err = proc.communicate()
+        if proc.returncode:
+            raise RuntimeError('importing %s failed:\n%s' % (module, err))
+        for name, seconds in _parse_importtime(err, module).items():
+            res[name] = min(seconds, res.get(name, seconds))
+    return res
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Accurate streaming dot products.
+
+The dotproduct recipe (sum(map(mul, vec1, vec2))) accumulates rounding
+errors on long float vectors. dotproduct here consumes both vectors in fixed
+size blocks and sums the products of each block exactly (math.fsum), so it
+also works on vectors too large for memory and rounds once per block instead
+of once per item. Float arrays and buffers are handed to numpy.dot block by
+block if NumPy is installed. dotproducts computes the dot products of many
+vectors with one vector.
+"""
+
+from array import array
+from itertools import islice
+import math
+import operator
+
+
+__all__ = [
+    'dotproduct',
+    'dotproducts',
+]
+
+
+# array.array typecodes and memoryview formats of float vectors
+_FLOAT_FORMATS = ('f', 'd')
+
+
+def _sum_exact(values, _sum=sum, _fsum=math.fsum, _float=float):
+    """Sum of a list of values, exact for ints and correctly rounded for
+    floats."""
+    if values and type(values[0]) is _float:  # the sum will be a float
+        return _fsum(values)
+    total = _sum(values)
+    if type(total) is _float:
+        return _fsum(values)
+    return total
+
+
+def _is_numpy_vector(vec):
+    """If vec is a NumPy array or a float buffer that NumPy can view."""
+    if hasattr(vec, '__array_interface__'):
+        return True
+    if isinstance(vec, array):
+        return vec.typecode in _FLOAT_FORMATS
+    if isinstance(vec, memoryview):
+        return vec.format in _FLOAT_FORMATS and vec.ndim == 1
+    return False
+
+
+def _has_numpy():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def dotproduct(vec1, vec2, blocksize=4096, use_numpy=None):
+    """Dot product of two (possibly huge) vectors.
+
+    Unlike sum(map(mul, vec1, vec2)), the products of each block are summed
+    exactly (math.fsum) and the block sums again, so rounding errors don't
+    accumulate per item. Int vectors stay exact:
+
+    >>> v = [1e16, 1., -1e16]
+    >>> dotproduct(v, [1, 1, 1]), sum(v)
+    (1.0, 0.0)
+    >>> dotproduct([1, 2, 3], [4, 5, 6])
+    32
+
+    Both vectors are consumed in blocks of blocksize items, so they can be
+    iterators too large for memory (or infinite, as long as one ends). Like
+    zip, the longer vector is truncated:
+
+    >>> from itertools import repeat
+    >>> dotproduct(range(10 ** 5), repeat(2))
+    9999900000
+
+    If NumPy is installed, NumPy arrays and float buffers (array.array and
+    memoryviews of typecode 'f' or 'd') are multiplied block-wise with
+    numpy.dot (without copying them). use_numpy=True also converts blocks of
+    other iterables to float64 arrays (np.fromiter), which is much faster
+    for long float streams, but computes int vectors as floats.
+
+    :param vec1: iterable of numbers
+    :param vec2: iterable of numbers
+    :param blocksize: number of items multiplied and summed per block
+    :param use_numpy: None: use numpy.dot for arrays and float buffers if
+        NumPy is installed, True: always (for all iterables), False: never
+    :return: the dot product
+    """
+    if blocksize < 1:
+        raise ValueError('blocksize must be >= 1, got %r' % (blocksize,))
+    if use_numpy is None:
+        use_numpy = (
+            _is_numpy_vector(vec1) and _is_numpy_vector(vec2) and
+            _has_numpy())
+    if use_numpy:
+        return _numpy_dotproduct(vec1, vec2, blocksize)
+    return _dotproduct(iter(vec1), iter(vec2), blocksize)
+
+
+def _dotproduct(it1, it2, blocksize, _list=list, _imap=map,
+                _mul=operator.mul, _islice=islice, _sum_exact=_sum_exact):
+    partials = []
+    append = partials.append
+    while True:
+        products = _list(_imap(
+            _mul, _islice(it1, blocksize), _islice(it2, blocksize)))
+        if products:
+            append(_sum_exact(products))
+        if len(products) < blocksize:
+            return _sum_exact(partials)
+
+
+def _numpy_blocks(vec, blocksize, np):
+    """Iterate over float64 (or the array's dtype) blocks of vec."""
+    if _is_numpy_vector(vec):
+        arr = np.asarray(vec)
+        for start in range(0, len(arr), blocksize):
+            yield arr[start:start + blocksize]
+        return
+    it = iter(vec)
+    while True:
+        block = np.fromiter(islice(it, blocksize), dtype=np.float64)
+        if not len(block):
+            return
+        yield block
+
+
+def _numpy_dotproduct(vec1, vec2, blocksize):
+    import numpy as np
+    partials = []
+    for block1, block2 in zip(
+            _numpy_blocks(vec1, blocksize, np),
+            _numpy_blocks(vec2, blocksize, np)):
+        n = min(len(block1), len(block2))
+        partials.append(np.dot(block1[:n], block2[:n]).item())
+        if n < blocksize:
+            break
+    return _sum_exact(partials)
+
+
+def dotproducts(rows, vec, blocksize=4096, use_numpy=None):
+    """Dot products of each of many vectors (rows) with vec.
+
+    vec is materialized once and then reused for all rows, rows are
+    consumed lazily:
+
+    >>> list(dotproducts([[1, 2], [3, 4], [5, 6]], iter([10, 1])))
+    [12, 34, 56]
+
+    If NumPy is installed, a 2-D NumPy array of rows is multiplied at once
+    (rows @ vec) and returned as NumPy array. use_numpy=True also stacks
+    blocks of blocksize rows (which then all need the length of vec) into
+    float64 arrays, which is much faster for many short float rows.
+
+    :param rows: iterable of vectors (iterables of numbers)
+    :param vec: finite iterable of numbers
+    :param blocksize: block size of the dot products (or number of rows per
+        NumPy block)
+    :param use_numpy: None: use NumPy for NumPy rows (if installed), True:
+        always, False: never
+    :return: an iterator over the dot products (or a NumPy array)
+    """
+    if blocksize < 1:
+        raise ValueError('blocksize must be >= 1, got %r' % (blocksize,))
+    if use_numpy is None:
+        use_numpy = hasattr(rows, '__array_interface__')
+    if use_numpy:
+        import numpy as np
+        v = np.asarray(vec) if _is_numpy_vector(vec) else np.fromiter(
+            vec, dtype=np.float64)
+        if hasattr(rows, '__array_interface__'):
+            return np.asarray(rows).dot(v)
+        return _numpy_dotproducts(iter(rows), v, blocksize, np)
+    if not isinstance(vec, (list, tuple, array)):
+        vec = list(vec)
+    return _dotproducts(rows, vec, blocksize)
+
+
+def _dotproducts(rows, vec, blocksize):
+    for row in rows:
+        yield _dotproduct(iter(row), iter(vec), blocksize)
+
+
+def _numpy_dotproducts(rows, v, blocksize, np):
+    while True:
+        block = list(islice(rows, blocksize))
+        if not block:
+            return
+        for res in np.array(block, dtype=np.float64).dot(v).tolist():
+            yield res
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+"""Sliding windows and rolling aggregates.
+
+pairwise only yields windows of width 2 and builds on tee. windowed yields
+n-wide windows with a step, using a fixed-size deque for iterators and views
+(slices, memoryviews, NumPy stride tricks) for sequences. The rolling_*
+functions update their aggregate incrementally instead of recomputing it for
+every window.
+"""
+
+from collections import deque
+from itertools import islice
+import math
+import operator
+
+from . import _sequence_types
+
+_BUFFER_TYPES, Sequence = _sequence_types()
+
+
+__all__ = [
+    'rolling_max',
+    'rolling_mean',
+    'rolling_min',
+    'rolling_sum',
+    'windowed',
+]
+
+
+def windowed(iterable, n, step=1, fillvalue=None, partial=False, dtype=None):
+    """Yield windows of n consecutive items, starting every step items.
+
+    >>> list(windowed([1, 2, 3, 4, 5], 3))
+    [[1, 2, 3], [2, 3, 4], [3, 4, 5]]
+    >>> list(windowed(iter([1, 2, 3, 4, 5]), 2, step=2))
+    [(1, 2), (3, 4)]
+
+    Items not covered by a full window (like 5 above) are dropped unless a
+    fillvalue pads the last window or partial yields it shorter:
+    >>> list(windowed(iter([1, 2, 3, 4, 5]), 2, step=2, fillvalue=0))
+    [(1, 2), (3, 4), (5, 0)]
+    >>> list(windowed('abcde', 3, step=3, partial=True))
+    ['abc', 'de']
+
+    Like chunker(..., dtype=None) windows are yielded without copying items
+    where possible: buffers (bytes, bytearray, memoryview, array.array) yield
+    memoryviews, NumPy arrays yield views (via stride tricks), other
+    sequences yield slices and any other iterable yields tuples (from a
+    deque holding the current window):
+    >>> [bytes(w) for w in windowed(b'abcd', 2)]
+    [b'ab', b'bc', b'cd']
+    >>> list(windowed((1, 2, 3), 2, dtype=list))
+    [[1, 2], [2, 3]]
+
+    :param iterable: the items (possibly infinite)
+    :param n: width of each window
+    :param step: distance between the starts of consecutive windows (may
+        be larger than n to skip items)
+    :param fillvalue: if not None, pad the last window to width n with it
+    :param partial: yield the last window even if shorter than n
+    :param dtype: callable applied to each window or None for native windows
+    :return: an iterator over the windows
+    """
+    if n < 1:
+        raise ValueError('window width n must be >= 1, got %r' % (n,))
+    if step < 1:
+        raise ValueError('step must be >= 1, got %r' % (step,))
+    if dtype is None:
+        if isinstance(iterable, _BUFFER_TYPES):
+            return _slice_windows(
+                memoryview(iterable), n, step, fillvalue, partial)
+        if hasattr(iterable, '__array_interface__'):
+            return _numpy_windows(iterable, n, step, fillvalue, partial)
+        if isinstance(iterable, Sequence):
+            return _slice_windows(iterable, n, step, fillvalue, partial)
+        dtype = tuple
+    return _deque_windows(iter(iterable), n, step, fillvalue, partial, dtype)
+
+
+def _pad(window, n, fillvalue):
+    return tuple(window) + (fillvalue,) * (n - len(window))
+
+
+def _tail_start(length, n, step, num_windows):
+    """Start of the last (incomplete) window or None if all items are
+    covered by the num_windows full windows."""
+    if num_windows:
+        start = num_windows * step
+        if start < length and start - step + n < length:
+            return start
+        return None
+    return 0 if length else None
+
+
+def _slice_windows(seq, n, step, fillvalue, partial):
+    starts = range(0, len(seq) - n + 1, step)
+    for start in starts:
+        yield seq[start:start + n]
+    if partial or fillvalue is not None:
+        start = _tail_start(len(seq), n, step, len(starts))
+        if start is not None:
+            tail = seq[start:]
+            yield tail if fillvalue is None else _pad(tail, n, fillvalue)
+
+
+def _numpy_windows(arr, n, step, fillvalue, partial):
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    num_windows = 0
+    if len(arr) >= n:
+        views = sliding_window_view(arr, n, axis=0)[::step]
+        num_windows = len(views)
+        for view in views:
+            yield view
+    if partial or fillvalue is not None:
+        start = _tail_start(len(arr), n, step, num_windows)
+        if start is not None:
+            tail = arr[start:]
+            if fillvalue is not None:
+                tail = np.concatenate([tail, np.full(
+                    (n - len(tail),) + tail.shape[1:], fillvalue,
+                    dtype=arr.dtype)])
+            yield tail
+
+
+def _deque_windows(it, n, step, fillvalue, partial, dtype):
+    window = deque(islice(it, n), maxlen=n)
+    if len(window) < n:
+        if window and (partial or fillvalue is not None):
+            yield dtype(
+                window if fillvalue is None else _pad(window, n, fillvalue))
+        return
+    yield dtype(window)
+    append = window.append
+    if step == 1:
+        for item in it:
+            append(item)
+            yield dtype(window)
+        return
+    skip, take = max(step - n, 0), min(step, n)
+    while True:
+        if skip:
+            next(islice(it, skip - 1, skip), None)
+        new = list(islice(it, take))
+        window.extend(new)
+        if len(new) == take:
+            yield dtype(window)
+            continue
+        if new and (partial or fillvalue is not None):
+            # the last window starts step after the previous one
+            tail = list(window)[-(n - take + len(new)):]
+            yield dtype(
+                tail if fillvalue is None else _pad(tail, n, fillvalue))
+        return
+
+
+def rolling_sum(iterable, n):
+    """Yield the sum of each window of n consecutive items.
+
+    Each step adds the new and subtracts the oldest item (O(1)). Float sums
+    are recomputed exactly (math.fsum) every n steps, so rounding errors
+    don't accumulate on long streams.
+
+    >>> list(rolling_sum([1, 2, 3, 4, 5], 3))
+    [6, 9, 12]
+    >>> list(rolling_sum([0.1] * 5, 2))
+    [0.2, 0.2, 0.2, 0.2]
+    """
+    if n < 1:
+        raise ValueError('window width n must be >= 1, got %r' % (n,))
+    return _rolling_sum(iter(iterable), n)
+
+
+def _rolling_sum(it, n):
+    window = deque(islice(it, n), maxlen=n)
+    if len(window) < n:
+        return
+    total = sum(window)
+    if type(total) is float:
+        total = math.fsum(window)
+    yield total
+    popleft, append = window.popleft, window.append
+    since_resync = 0
+    for item in it:
+        total += item - popleft()
+        append(item)
+        if type(total) is float:
+            since_resync += 1
+            if since_resync >= n:
+                total = math.fsum(window)
+                since_resync = 0
+        yield total
+
+
+def rolling_mean(iterable, n):
+    """Yield the mean of each window of n consecutive items.
+
+    >>> list(rolling_mean([1, 2, 3, 4, 5], 2))
+    [1.5, 2.5, 3.5, 4.5]
+    """
+    return (total / n for total in rolling_sum(iterable, n))
+
+
+def _rolling_extreme(iterable, n, better):
+    # monotonic deque of (index, item): items that can still become the
+    # extreme of a later window, the current extreme first. Every item is
+    # appended and removed once, so each step is amortized O(1).
+    candidates = deque()
+    append, pop = candidates.append, candidates.pop
+    popleft = candidates.popleft
+    for i, item in enumerate(iterable):
+        while candidates and not better(candidates[-1][1], item):
+            pop()
+        append((i, item))
+        if candidates[0][0] <= i - n:
+            popleft()
+        if i >= n - 1:
+            yield candidates[0][1]
+
+
+def rolling_min(iterable, n):
+    """Yield the minimum of each window of n consecutive items (O(1) amortized
+    per item).
+
+    >>> list(rolling_min([3, 1, 4, 1, 5, 9, 2, 6], 3))
+    [1, 1, 1, 1, 2, 2]
+    """
+    if n < 1:
+        raise ValueError('window width n must be >= 1, got %r' % (n,))
+    return _rolling_extreme(iterable, n, operator.lt)
+
+
+def rolling_max(iterable, n):
+    """Yield the maximum of each window of n consecutive items (O(1) amortized
+    per item).
+
+    >>> list(rolling_max([3, 1, 4, 1, 5, 9, 2, 6], 3))
+    [4, 4, 5, 9, 9, 9]
+    """
+    if n < 1:
+        raise ValueError('window width n must be >= 1, got %r' % (n,))
+    return _rolling_extreme(iterable, n, operator.gt)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import asyncio
+
+from splendid.aitertools import aconsume
+from splendid.aitertools import alist
+from splendid.aitertools import amerge
+from splendid.aitertools import aroundrobin
+from splendid.aitertools import atake
+
+
+async def slow_source(name, n, delay):
+    for i in range(n):
+        await asyncio.sleep(delay)
+        yield name, i
+
+
+def test_aroundrobin_fetches_concurrently():
+    log = []
+
+    async def logged_source(name, n):
+        for i in range(n):
+            log.append(('fetch', name, i))
+            await asyncio.sleep(.01)
+            log.append(('got', name, i))
+            yield name, i
+    res = asyncio.run(alist(aroundrobin(
+        logged_source('a', 2), logged_source('b', 2))))
+    assert res == [('a', 0), ('b', 0), ('a', 1), ('b', 1)]
+    # b's first item is fetched while waiting for a's (sequential pulling
+    # would wait for each item before fetching the next one)
+    assert log[:2] == [('fetch', 'a', 0), ('fetch', 'b', 0)]
+
+
+def test_amerge_yields_fast_sources_first():
+    res = asyncio.run(alist(amerge(
+        slow_source('slow', 1, .2), slow_source('fast', 3, .01))))
+    assert res == [('fast', 0), ('fast', 1), ('fast', 2), ('slow', 0)]
+
+
+def test_amerge_early_stop_cancels_sources():
+    res = asyncio.run(atake(2, amerge(
+        slow_source('slow', 10, 10), slow_source('fast', 3, .01))))
+    assert res == [('fast', 0), ('fast', 1)]
+
+
+def test_aconsume_sync_and_async_iterators():
+    it = iter(range(10))
+    asyncio.run(aconsume(it, 3))
+    assert next(it) == 3
+    asyncio.run(aconsume(it, None))
+    assert list(it) == []
+
+    async def consume_async():
+        ait = slow_source('a', 5, 0)
+        await aconsume(ait, 2)
+        return await alist(ait)
+    assert asyncio.run(consume_async()) == [('a', 2), ('a', 3), ('a', 4)]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from splendid import bench
+from splendid import itertools_recipies
+from splendid.timing import Benchmark
+
+
+def test_every_recipe_has_a_case():
+    assert set(itertools_recipies.__all__) <= set(bench.CASES)
+
+
+def test_all_cases_run():
+    res = bench.run(sizes=[20], bench=Benchmark(repeat=1, loops=1, warmup=0))
+    assert len(res['results']) >= 2 * len(bench.CASES)
+    assert all(r['median'] > 0 for r in res['results'].values())
+
+
+def test_main_detects_regressions():
+    tmpdir = mkdtemp()
+    try:
+        out = os.path.join(tmpdir, 'res.json')
+        argv = ['-k', '^take$', '-s', '10', '-r', '1', '-t', '0', '-q']
+        assert bench.main(argv + ['-o', out]) == 0
+        assert bench.main(argv + ['-b', out, '--threshold', '1e9']) == 0
+
+        with open(out) as f:
+            baseline = json.load(f)
+        for r in baseline['results'].values():
+            r['median'] /= 1e6
+        with open(out, 'w') as f:
+            json.dump(baseline, f)
+        assert bench.main(argv + ['-b', out]) == 1
+    finally:
+        rmtree(tmpdir)
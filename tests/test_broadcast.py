@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+import random
+import threading
+import time
+
+import pytest
+
+from splendid.broadcast import broadcast
+from splendid.broadcast import BufferFull
+
+
+def test_single_threaded_like_tee():
+    a, b, c = broadcast(range(100), 3, maxbuffer=10, block=False)
+    res = [[], [], []]
+    rnd = random.Random(3)
+    while len(res[0]) + len(res[1]) + len(res[2]) < 300:
+        i = rnd.randrange(3)
+        try:
+            res[i].append(next((a, b, c)[i]))
+        except (BufferFull, StopIteration):
+            pass
+    assert res == [list(range(100))] * 3
+
+
+def test_threads_bounded():
+    pulled = []
+    lock = threading.Lock()
+
+    def source():
+        for i in range(2000):
+            with lock:
+                pulled.append(i)
+            yield i
+    consumers = broadcast(source(), 4, maxbuffer=16)
+    bc = consumers[0].broadcast
+    max_lag = [0]
+
+    def consume(consumer):
+        res = []
+        rnd = random.Random(consumer.index)
+        for item in consumer:
+            res.append(item)
+            max_lag[0] = max(max_lag[0], bc.stats()['max_lag'])
+            if rnd.random() < 0.01:
+                time.sleep(0.001)
+        return res
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(consume, consumers))
+    assert results == [list(range(2000))] * 4
+    assert pulled == list(range(2000))  # each item pulled once
+    assert max_lag[0] <= 16
+    stats = bc.stats()
+    assert stats['produced'] == 2000 and stats['lags'] == [0] * 4
+
+
+def test_close_releases_others():
+    a, b = broadcast(count(), 2, maxbuffer=4, block=False)
+    assert next(b) == 0
+    with pytest.raises(BufferFull):
+        [next(a) for _ in range(10)]
+    b.close()
+    assert [next(a) for _ in range(10)] == list(range(5, 15))
+    assert list(b) == [] and b.lag == 0
+
+
+def test_timeout():
+    a, b = broadcast(count(), 2, maxbuffer=2, timeout=0.01)
+    next(a), next(a)
+    with pytest.raises(BufferFull):
+        next(a)
+    assert a.broadcast.stats()['waits'] == [1, 0]
+
+
+def test_source_error():
+    def source():
+        yield 1
+        raise KeyError('boom')
+    a, b = broadcast(source(), 2)
+    assert next(a) == 1
+    with pytest.raises(KeyError):
+        next(a)
+    assert next(b) == 1
+    with pytest.raises(KeyError):
+        next(b)
+
+
+def test_invalid_args():
+    with pytest.raises(ValueError):
+        broadcast([], 0)
+    with pytest.raises(ValueError):
+        broadcast([], 2, maxbuffer=0)
+
+
+def tb_depth(exc_info):
+    tb, depth = exc_info.value.__traceback__, 0
+    while tb is not None:
+        tb, depth = tb.tb_next, depth + 1
+    return depth
+
+
+def test_repeated_raises_dont_grow_tracebacks():
+    a, = broadcast([], 1)
+    depths = set()
+    for _ in range(100):
+        with pytest.raises(StopIteration) as exc_info:
+            next(a)
+        depths.add(tb_depth(exc_info))
+    assert len(depths) == 1
+
+    def source():
+        raise KeyError('boom')
+        yield
+    a, b = broadcast(source(), 2)
+    with pytest.raises(KeyError) as first:
+        next(a)
+    depths = set()
+    for consumer in (a, b) * 50:
+        with pytest.raises(KeyError) as exc_info:
+            next(consumer)
+        assert exc_info.value is first.value
+        depths.add(tb_depth(exc_info))
+    assert len(depths) == 1
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+import time
+
+import pytest
+
+from splendid import run_once
+from splendid.caching import memoize
+
+
+def run_in_threads(func, n=10):
+    barrier = threading.Barrier(n)
+    results = []
+
+    def target():
+        barrier.wait()
+        results.append(func())
+
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_run_once_is_thread_safe():
+    calls = []
+
+    @run_once
+    def load():
+        calls.append(1)
+        time.sleep(.05)
+        return 'config'
+
+    assert run_in_threads(load) == ['config'] * 10
+    assert len(calls) == 1
+
+
+def test_run_once_retries_after_error():
+    calls = []
+
+    @run_once
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise IOError('not yet')
+        return len(calls)
+
+    with pytest.raises(IOError):
+        flaky()
+    assert flaky() == 2
+    assert flaky() == 2
+
+
+def test_memoize_collapses_concurrent_calls():
+    calls = []
+
+    @memoize()
+    def load(name):
+        calls.append(name)
+        time.sleep(.05)
+        return name.upper()
+
+    assert run_in_threads(lambda: load('meta')) == ['META'] * 10
+    assert calls == ['meta']
+    info = load.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (9, 1, 1)
+    assert info.load_time >= .05
+
+
+def test_memoize_shares_errors_of_collapsed_calls():
+    calls = []
+
+    @memoize()
+    def fail():
+        calls.append(1)
+        time.sleep(.05)
+        raise ValueError('nope')
+
+    def call():
+        try:
+            fail()
+        except ValueError as e:
+            return str(e)
+
+    assert run_in_threads(call, 5) == ['nope'] * 5
+    assert len(calls) == 1
+    assert fail.cache_info().currsize == 0
+
+
+def test_memoize_ttl():
+    now = [0.]
+
+    @memoize(ttl=10, clock=lambda: now[0])
+    def inc(x):
+        return x + now[0]
+
+    assert inc(1) == 1
+    now[0] = 5.
+    assert inc(1) == 1
+    now[0] = 10.
+    assert inc(1) == 11
+    info = inc.cache_info()
+    assert (info.hits, info.misses, info.evictions) == (1, 2, 1)
+
+
+def test_memoize_typed_and_invalidate():
+    @memoize(typed=True)
+    def ident(x, **kwds):
+        return x, kwds
+
+    assert ident(1) == (1, {})
+    assert ident(1.) == (1., {})
+    assert ident(1, a=1, b=2) is ident(1, b=2, a=1)
+    assert ident.cache_info().currsize == 3
+    assert ident.cache_invalidate(1)
+    assert not ident.cache_invalidate(1)
+    ident.cache_clear()
+    assert ident.cache_info() == (0, 0, 0, 128, 0, 0.)
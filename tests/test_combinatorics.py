@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from itertools import combinations
+from itertools import permutations
+import random
+
+import pytest
+
+from splendid.combinatorics import Combinations
+from splendid.combinatorics import Permutations
+from splendid.combinatorics import Powerset
+from splendid.itertools_recipies import powerset
+
+
+def cases(pool):
+    yield Powerset(pool), list(powerset(pool))
+    for r in range(len(pool) + 2):
+        yield Combinations(pool, r), list(combinations(pool, r))
+        yield Permutations(pool, r), list(permutations(pool, r))
+    yield Permutations(pool), list(permutations(pool))
+
+
+@pytest.mark.parametrize('pool', [
+    '', 'a', 'abcde', 'aabc', [[1], [2], [1]], list(range(6))])
+def test_matches_itertools(pool):
+    unique = len(set(map(repr, pool))) == len(pool)
+    for seq, expected in cases(pool):
+        assert len(seq) == len(expected)
+        assert list(seq) == expected
+        for i, element in enumerate(expected):
+            assert seq[i] == element
+            assert list(seq[i:]) == expected[i:]
+            assert expected[seq.index(element)] == element
+            if unique:
+                assert seq.index(element) == i
+            assert element in seq
+        assert list(seq[1:-1:2]) == expected[1:-1:2]
+        assert list(seq[::-1]) == expected[::-1]
+        for num_shards in (1, 3):
+            shards = [list(seq.shard(i, num_shards))
+                      for i in range(num_shards)]
+            assert sum(shards, []) == expected
+
+
+def test_huge():
+    c = Combinations(range(1000), 50)
+    i = random.randrange(c.size)
+    assert c.index(c[i]) == i
+    assert list(c[i:i + 3]) == [c[i], c[i + 1], c[i + 2]]
+    with pytest.raises(OverflowError):
+        len(c)
+    assert c.choice(random.Random(1)) in c
+
+
+def test_not_contained():
+    c = Combinations('abc', 2)
+    assert ('b', 'a') not in c
+    assert ('a', 'x') not in c
+    assert ('a',) not in c
+    assert [[]] not in c  # unhashable
+    with pytest.raises(ValueError):
+        c.index(('b', 'a'))
+    with pytest.raises(IndexError):
+        c[3]
+    assert ('a', 'a') not in Permutations('abc', 2)
+    assert ('a', 'a') in Permutations('aab', 2)
+    with pytest.raises(ValueError):
+        Combinations('abc', -1)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import os
+import random
+
+import pytest
+
+from splendid.extsort import external_sort
+from splendid.extsort import merge_sorted
+
+
+def test_external_sort(tmpdir):
+    data = [random.randint(-1000, 1000) for _ in range(10000)]
+    res = external_sort(data, chunk_size=999, tmpdir=str(tmpdir))
+    assert list(res) == sorted(data)
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_external_sort_key_reverse_stable():
+    data = [(random.randint(0, 10), i) for i in range(5000)]
+
+    def key(x):
+        return x[0]
+
+    assert list(external_sort(data, key=key, chunk_size=100)) == \
+        sorted(data, key=key)
+    assert list(external_sort(data, key=key, reverse=True, chunk_size=77)) \
+        == sorted(data, key=key, reverse=True)
+
+
+def test_external_sort_typecode_and_multi_pass(tmpdir):
+    data = [random.random() for _ in range(5000)]
+    res = external_sort(
+        data, chunk_size=100, typecode='d', max_merge=3, tmpdir=str(tmpdir))
+    assert list(res) == sorted(data)
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_external_sort_small_and_empty(tmpdir):
+    assert list(external_sort([], tmpdir=str(tmpdir))) == []
+    assert list(external_sort([3, 1, 2], tmpdir=str(tmpdir))) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        external_sort([], chunk_size=0)
+
+
+def test_external_sort_cleanup_on_close(tmpdir):
+    res = external_sort(range(1000, 0, -1), chunk_size=10, tmpdir=str(tmpdir))
+    assert next(res) == 1
+    assert len(os.listdir(str(tmpdir))) == 1
+    res.close()
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_external_sort_processes():
+    data = [random.randint(-100, 100) for _ in range(2000)]
+    res = external_sort(data, key=abs, chunk_size=300, processes=2)
+    assert list(res) == sorted(data, key=abs)
+
+
+def test_merge_sorted():
+    assert list(merge_sorted()) == []
+    assert list(merge_sorted([1, 2])) == [1, 2]
+    assert list(merge_sorted([1, 3], [2, 4], [0])) == [0, 1, 2, 3, 4]
+    with pytest.raises(TypeError):
+        merge_sorted([1], foo=1)
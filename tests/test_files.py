@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+
+import pytest
+
+from splendid.files import atomic_write
+from splendid.files import BulkWriter
+from splendid.files import byte_ranges
+from splendid.files import mmap_chunks
+from splendid.files import mmap_lines
+from splendid.files import mmap_records
+
+
+def test_atomic_write_replaces(tmpdir):
+    path = os.path.join(tmpdir, 'a', 'b.txt')
+    assert atomic_write(path, u'hällo') == 6
+    assert atomic_write(path, b'bye') == 3
+    with open(path, 'rb') as f:
+        assert f.read() == b'bye'
+    assert os.listdir(os.path.dirname(path)) == ['b.txt']
+
+
+@pytest.mark.parametrize('atomic', [True, False])
+@pytest.mark.parametrize('fsync', [True, False])
+def test_bulk_writer(tmpdir, atomic, fsync):
+    with BulkWriter(max_workers=4, atomic=atomic, fsync=fsync,
+                    fsync_batch=7, max_pending=3) as writer:
+        for i in range(50):
+            writer.write(os.path.join(tmpdir, str(i % 5), str(i)), b'x' * i)
+    assert writer.files == 50
+    assert writer.bytes == sum(range(50))
+    for i in range(50):
+        with open(os.path.join(tmpdir, str(i % 5), str(i)), 'rb') as f:
+            assert f.read() == b'x' * i
+    assert sum(len(files) for _, _, files in os.walk(tmpdir)) == 50
+
+
+def test_bulk_writer_raises_errors(tmpdir):
+    blocker = os.path.join(tmpdir, 'file')
+    atomic_write(blocker, b'')
+    writer = BulkWriter(max_workers=2)
+    writer.write(os.path.join(tmpdir, 'ok'), b'ok')
+    future = writer.write(os.path.join(blocker, 'nope'), b'nope')
+    with pytest.raises(OSError):
+        writer.close()
+    assert future.exception() is not None
+    assert writer.files == 1
+
+
+def _write_lines(tmpdir, num_lines, trailing_newline=True):
+    rnd = random.Random(num_lines)
+    data = b''.join(
+        b'x' * rnd.randrange(20) + b'\n' for _ in range(num_lines))
+    if not trailing_newline:
+        data += b'last'
+    path = os.path.join(tmpdir, 'lines.txt')
+    atomic_write(path, data)
+    return path, data
+
+
+@pytest.mark.parametrize('trailing_newline', [True, False])
+def test_mmap_lines(tmpdir, trailing_newline):
+    path, data = _write_lines(tmpdir, 1000, trailing_newline)
+    lines = data.splitlines(True)
+    for batch in (1, 3, 1000, 5000):
+        views = list(mmap_lines(path, batch))
+        assert [bytes(v) for v in views] == [
+            b''.join(lines[i:i + batch]) for i in range(0, len(lines), batch)]
+    assert list(mmap_lines(path, start=len(data))) == []
+
+
+def test_mmap_chunks(tmpdir):
+    path, data = _write_lines(tmpdir, 1000)
+    views = [bytes(v) for v in mmap_chunks(path, 100)]
+    assert b''.join(views) == data
+    assert all(len(v) == 100 for v in views[:-1])
+    views = [bytes(v) for v in mmap_chunks(path, 100, sep=b'\n')]
+    assert b''.join(views) == data
+    assert all(v.endswith(b'\n') and len(v) >= 100 for v in views[:-1])
+
+
+def test_mmap_empty_file(tmpdir):
+    path = os.path.join(tmpdir, 'empty')
+    atomic_write(path, b'')
+    assert list(mmap_chunks(path, 10)) == []
+    assert list(mmap_lines(path)) == []
+    assert list(mmap_records(path, 4)) == []
+    assert byte_ranges(path, 4) == []
+
+
+def test_mmap_records(tmpdir):
+    path = os.path.join(tmpdir, 'records')
+    atomic_write(path, bytes(bytearray(range(100))))
+    views = list(mmap_records(path, 10, batch=3, start=20, stop=90))
+    assert [bytes(v) for v in views] == [
+        bytes(bytearray(range(a, min(a + 30, 90)))) for a in (20, 50, 80)]
+    with pytest.raises(ValueError):
+        list(mmap_records(path, 7))
+    with pytest.raises(ValueError):
+        mmap_records(path, 10, start=5)
+
+
+def _count_lines(path_range):
+    path, start, stop = path_range
+    return sum(
+        bytes(v).count(b'\n') for v in mmap_lines(path, 64, start, stop))
+
+
+def test_byte_ranges(tmpdir):
+    path, data = _write_lines(tmpdir, 5000, trailing_newline=False)
+    for num_ranges in (1, 2, 7, 100000):
+        ranges = byte_ranges(path, num_ranges)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert len(ranges) <= num_ranges
+        for (_, stop), (start, _) in zip(ranges, ranges[1:]):
+            assert stop == start and data[stop - 1:stop] == b'\n'
+    ranges = byte_ranges(path, 4)
+    with ProcessPoolExecutor(2) as pool:
+        counts = list(pool.map(
+            _count_lines, [(path, a, b) for a, b in ranges]))
+    assert sum(counts) == data.count(b'\n')
+
+
+def test_byte_ranges_records(tmpdir):
+    path = os.path.join(tmpdir, 'records')
+    atomic_write(path, b'x' * 100)
+    assert byte_ranges(path, 3, record_size=10) == [
+        (0, 30), (30, 60), (60, 100)]
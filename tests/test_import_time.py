@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import subprocess
+import sys
+
+import pytest
+
+import splendid
+from splendid.timing import import_times
+
+# min cumulative import time of splendid (without NumPy & co, it's ~1 ms with
+# and ~6 ms without cached bytecode, importing all submodules takes ~25 ms)
+IMPORT_BUDGET = 0.015
+
+# slow to import modules that import splendid must not pull in
+HEAVY_MODULES = [
+    'array',
+    'collections',
+    'datetime',
+    'random',
+    'six',
+    'threading',
+    'timeit',
+]
+
+
+def test_import_time_budget():
+    times = import_times('splendid', repeat=5)
+    assert times['splendid'] < IMPORT_BUDGET, sorted(
+        times.items(), key=lambda kv: -kv[1])
+
+
+def test_import_no_heavy_modules():
+    times = import_times('splendid', repeat=1)
+    assert not set(HEAVY_MODULES) & set(times)
+    assert not any(name.startswith('splendid.') for name in times)
+
+
+def test_lazy_submodules():
+    code = (
+        'import sys, splendid\n'
+        'assert "splendid.windows" not in sys.modules\n'
+        'print(splendid.windows.windowed.__name__)\n'
+        'assert "splendid.windows" in sys.modules\n'
+    )
+    out = subprocess.check_output(
+        [sys.executable, '-c', code], universal_newlines=True)
+    assert out.strip() == 'windowed'
+
+
+def test_getattr():
+    assert 'windows' in dir(splendid) and 'chunker' in dir(splendid)
+    assert splendid.sets is sys.modules['splendid.sets']
+    with pytest.raises(AttributeError):
+        splendid.no_such_module
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from collections import Counter
+from itertools import count
+from itertools import islice
+import random
+
+import pytest
+
+from splendid.itertools_recipies import interleave
+from splendid.itertools_recipies import roundrobin
+
+
+def random_sources(r, num):
+    return [
+        [(i, j) for j in range(r.choice([0, 1, 2, 5, 50]))]
+        for i in range(num)
+    ]
+
+
+def test_interleave_equals_roundrobin():
+    r = random.Random(0)
+    for num in (0, 1, 3, 100, 1000):
+        sources = random_sources(r, num)
+        assert list(interleave(*sources)) == list(roundrobin(*sources))
+        assert list(interleave(*map(iter, sources))) == \
+            list(roundrobin(*sources))
+
+
+def test_interleave_batch():
+    r = random.Random(1)
+    sources = random_sources(r, 200)
+    res = list(interleave(*sources, batch=3))
+    assert sorted(res) == sorted(x for s in sources for x in s)
+    # each source keeps its order
+    for i, s in enumerate(sources):
+        assert [x for x in res if x[0] == i] == s
+    assert list(interleave('abcd', 'xy', batch=3)) == list('abcxyd')
+
+
+def test_interleave_weighted():
+    res = list(islice(
+        interleave(count(), iter(str, None), weights=[3, 0.5]), 7000))
+    counts = Counter(type(x) for x in res)
+    assert counts[int] == 6000 and counts[str] == 1000
+    # works with exhausted sources and batch
+    assert list(interleave('ab', 'cdef', weights=[1, 2], batch=2)) == \
+        list('abcdef')
+    with pytest.raises(ValueError):
+        interleave('a', 'b', weights=[1])
+    with pytest.raises(ValueError):
+        interleave('a', weights=[0])
+    with pytest.raises(ValueError):
+        interleave('a', batch=0)
+    with pytest.raises(TypeError):
+        interleave('a', foo=1)
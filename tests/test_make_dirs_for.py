@@ -5,6 +5,9 @@ import os
 from tempfile import mkdtemp
 from shutil import rmtree
 
+import pytest
+
+from splendid import invalidate_dirs_cache
 from splendid import make_dirs_for
 
 
@@ -19,3 +22,53 @@ def test_make_dirs_for():
 
     # Cleanup:
     rmtree(tmpdir)
+
+
+def test_make_dirs_for_cache():
+    tmpdir = mkdtemp()
+    try:
+        my_filepath = os.path.join(tmpdir, 'some', 'dirs', 'testfile.txt')
+        make_dirs_for(my_filepath)
+        rmtree(os.path.join(tmpdir, 'some'))
+        # cached, so the directory isn't created again
+        make_dirs_for(my_filepath)
+        assert not os.path.exists(os.path.dirname(my_filepath))
+
+        invalidate_dirs_cache(os.path.join(tmpdir, 'some'))
+        with open(make_dirs_for(my_filepath), 'w') as f:
+            f.write("hello world")
+
+        invalidate_dirs_cache()
+        assert make_dirs_for('no_dir.txt') == 'no_dir.txt'
+    finally:
+        rmtree(tmpdir)
+
+
+def test_make_dirs_for_raises_if_dir_cant_be_created():
+    tmpdir = mkdtemp()
+    try:
+        blocker = os.path.join(tmpdir, 'file')
+        with open(blocker, 'w') as f:
+            f.write("i'm not a dir")
+        with pytest.raises(OSError):
+            make_dirs_for(os.path.join(blocker, 'testfile.txt'))
+    finally:
+        rmtree(tmpdir)
+
+
+def test_make_dirs_for_relative_paths_across_chdir(tmpdir, monkeypatch):
+    invalidate_dirs_cache()
+    my_filepath = os.path.join('out', 'testfile.txt')
+    for d in ('a', 'b'):
+        monkeypatch.chdir(str(tmpdir.mkdir(d)))
+        with open(make_dirs_for(my_filepath), 'w') as f:
+            f.write("hello world")
+    assert os.path.isfile(os.path.join(str(tmpdir), 'a', my_filepath))
+    assert os.path.isfile(os.path.join(str(tmpdir), 'b', my_filepath))
+
+    # invalidation by relative path applies to the current dir
+    rmtree(os.path.join(str(tmpdir), 'b', 'out'))
+    invalidate_dirs_cache('out')
+    make_dirs_for(my_filepath)
+    assert os.path.isdir(os.path.join(str(tmpdir), 'b', 'out'))
+    invalidate_dirs_cache()
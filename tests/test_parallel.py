@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from itertools import islice
+import operator
+import threading
+
+import pytest
+
+from splendid.parallel import chunked_map
+from splendid.parallel import map_chunks
+
+
+def test_ordered():
+    assert list(chunked_map(operator.neg, range(1000), 7)) == \
+        [-i for i in range(1000)]
+
+
+def test_unordered():
+    res = chunked_map(operator.neg, range(1000), 7, ordered=False)
+    assert sorted(res) == sorted(-i for i in range(1000))
+
+
+def test_process_pool():
+    res = chunked_map(operator.neg, range(100), 10, executor='process',
+                      max_workers=2)
+    assert list(res) == [-i for i in range(100)]
+
+
+def test_bounded_in_flight():
+    lock = threading.Lock()
+    pulled = [0]
+
+    def source():
+        for i in count():
+            with lock:
+                pulled[0] += 1
+            yield i
+
+    res = chunked_map(operator.neg, source(), 10, max_in_flight=3,
+                      max_workers=2)
+    assert list(islice(res, 5)) == [0, -1, -2, -3, -4]
+    # at most the consumed chunk plus max_in_flight chunks were pulled
+    assert pulled[0] <= 4 * 10
+    del res
+
+
+def test_given_executor_is_not_shut_down():
+    with ThreadPoolExecutor(2) as pool:
+        assert list(map_chunks(len, range(10), 4, executor=pool)) == [4, 4, 2]
+        assert pool.submit(operator.neg, 1).result() == -1
+
+
+def test_errors_propagate():
+    with pytest.raises(ZeroDivisionError):
+        list(chunked_map(lambda x: 1 / x, [1, 2, 0, 3], 2))
+
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        chunked_map(abs, [1], 1, executor='fibers')
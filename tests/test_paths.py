@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from array import array
+import io
+import json
+import random
+
+import pytest
+
+from splendid import get_path
+from splendid.paths import PathIndex
+from splendid.paths import RECURSIVE
+from splendid.paths import WILDCARD
+from splendid.paths import compile_path
+from splendid.paths import extract_many
+from splendid.paths import iter_path
+from splendid.paths import query_jsonl
+
+
+class CountingDict(dict):
+    lookups = 0
+
+    def __getitem__(self, key):
+        CountingDict.lookups += 1
+        return dict.__getitem__(self, key)
+
+
+NESTED = {
+    'a': [{'id': 1, 'x': {'id': 4}}, {'id': 2}, 'str', None],
+    'b': {'id': 3, 'c': {'d': [{'id': 5}]}},
+    'id': 0,
+}
+
+
+@pytest.mark.parametrize('key_path, expected', [
+    (['a', WILDCARD, 'id'], [1, 2]),
+    (['a', WILDCARD, WILDCARD, 'id'], [4]),
+    (['b', WILDCARD], [3, {'d': [{'id': 5}]}]),
+    ([RECURSIVE, 'id'], [0, 1, 4, 2, 3, 5]),
+    (['b', RECURSIVE, 'd', WILDCARD, 'id'], [5]),
+    (['a', 3, WILDCARD], []),
+    (['foo', WILDCARD], []),
+    (['foo', 'bar', RECURSIVE], []),
+    (['id', WILDCARD], []),
+])
+def test_wildcards_agree(key_path, expected):
+    assert list(iter_path(NESTED, key_path)) == expected
+    assert compile_path(key_path, 'default')(NESTED) == expected
+    assert get_path(NESTED, key_path, 'default') == expected
+
+
+def test_extract_many_shared_prefix():
+    records = [
+        CountingDict(user=CountingDict(id=i, name=str(i), tags=['t'] * i))
+        for i in range(4)
+    ] + [CountingDict()]
+    CountingDict.lookups = 0
+    cols = extract_many(records, {
+        'id': ['user', 'id'],
+        'name': ['user', 'name'],
+        'tags': ['user', 'tags', WILDCARD],
+        'none': ['user', 'nope', 'deeper'],
+    }, default=-1)
+    assert cols == {
+        'id': [0, 1, 2, 3, -1],
+        'name': ['0', '1', '2', '3', -1],
+        'tags': [[], ['t'], ['t', 't'], ['t', 't', 't'], []],
+        'none': [-1] * 5,
+    }
+    # 'user' once per record, 'id', 'name', 'tags' and 'nope' once per user
+    assert CountingDict.lookups == 5 + 4 * 4
+
+
+def test_query_jsonl_blank_and_prefiltered_lines():
+    lines = [
+        {'user': {'id': 1}},
+        {'other': 'user'},  # passes the prefilter (user in a value)
+        {'other': 2},  # prefiltered
+        {u'caf\xe9': {'id': 3}},
+        {u'caf\xe9': {'id': 4}, 'user': {'id': 5}},
+    ]
+    data = u'\n'.join(
+        json.dumps(l, ensure_ascii=i % 2 == 0) for i, l in enumerate(lines))
+    data = u'\n  \n' + data.replace(u'\n', u'\n\n', 1) + u'\n\n'
+    paths = [['user', 'id'], [u'caf\xe9', 'id'], ['other']]
+    expected = [
+        (1, None, None),
+        (None, None, 'user'),
+        (None, None, 2),
+        (None, 3, None),
+        (5, 4, None),
+    ]
+    for prefilter in (True, False):
+        for f in (io.StringIO(data), io.BytesIO(data.encode('utf-8'))):
+            assert list(query_jsonl(
+                f, paths, prefilter=prefilter, blocksize=16)) == expected
+    # only the first keys are checked by the prefilter
+    res = list(query_jsonl(
+        io.StringIO(data), [[u'caf\xe9', 'id'], ['user', WILDCARD]]))
+    assert res == [
+        (None, [1]), (None, []), (None, []), (3, []), (4, [5])]
+
+
+def random_records(r, num):
+    res = []
+    for _ in range(num):
+        record = {'type': r.choice(['click', 'view'])}
+        if r.random() < 0.9:
+            record['user'] = {'id': r.randrange(20)}
+        record['tags'] = r.sample('abcde', r.randrange(3))
+        res.append(record)
+    return res
+
+
+def scan(records, path, pred, removed=()):
+    return [
+        pos for pos, record in enumerate(records)
+        if pos not in removed and pred(get_path(record, path, KeyError))]
+
+
+def test_path_index_matches_scans():
+    records = random_records(random.Random(0), 500)
+    index = PathIndex(records, ['user', 'id'])
+    path = ['user', 'id']
+    for uid in range(-1, 21):
+        assert list(index.get(uid, positions=True)) == scan(
+            records, path, lambda v: v == uid)
+        assert index.get(uid) == [
+            records[p] for p in scan(records, path, lambda v: v == uid)]
+    assert list(index.range(5, 9, positions=True)) == sorted(
+        scan(records, path, lambda v: v != KeyError and 5 <= v < 9),
+        key=lambda p: (records[p]['user']['id'], p))
+    assert list(index.missing) == scan(records, path, lambda v: v == KeyError)
+    assert sum(len(rs) for _, rs in index.groups()) + len(
+        index.missing) == len(records)
+    assert index.keys(sort=True) == sorted(index.keys())
+
+
+def test_incremental_updates_match_rebuild():
+    r = random.Random(1)
+    records = random_records(r, 200)
+    index = PathIndex(records, ['user', 'id'])
+    index.range(0)  # build the sorted keys, so they are maintained as well
+    removed = set()
+    for new in random_records(r, 300):
+        op = r.random()
+        pos = r.randrange(len(records))
+        if op < 0.3:
+            index.add(new)
+        elif op < 0.6:
+            index.update(pos, new)
+            removed.discard(pos)
+        elif op < 0.8:
+            index.remove(pos)
+            removed.add(pos)
+        elif pos not in removed:
+            # change in place: remove before, re-index after
+            index.remove(pos)
+            records[pos]['user'] = {'id': r.randrange(20)}
+            index.update(pos)
+    fresh = PathIndex([
+        rec for pos, rec in enumerate(records) if pos not in removed],
+        ['user', 'id'])
+    kept = [pos for pos in range(len(records)) if pos not in removed]
+    assert index.keys(sort=True) == fresh.keys(sort=True)
+    for key in fresh.keys():
+        assert list(index.get(key, positions=True)) == [
+            kept[p] for p in fresh.get(key, positions=True)]
+    assert index.range(3, 7, inclusive=True) == fresh.range(
+        3, 7, inclusive=True)
+    assert list(index.missing) == [kept[p] for p in fresh.missing]
+
+
+def test_composite_and_wildcard_keys():
+    records = random_records(random.Random(2), 300)
+    index = PathIndex(records, ['user', 'id'], ['type'])
+    assert index.get((3, 'view')) == [
+        rec for rec in records
+        if get_path(rec, ['user', 'id']) == 3 and rec['type'] == 'view']
+    by_tag = PathIndex(records, ['tags', WILDCARD])
+    for tag in 'abcde':
+        assert by_tag.count(tag) == sum(tag in rec['tags'] for rec in records)
+    assert list(by_tag.missing) == [
+        pos for pos, rec in enumerate(records) if not rec['tags']]
+    both = PathIndex(records, ['tags', WILDCARD], ['type'])
+    assert both.count(('a', 'click')) == sum(
+        'a' in rec['tags'] and rec['type'] == 'click' for rec in records)
+    # each record once, even if a tag repeats
+    assert PathIndex([{'t': ['a', 'a']}], ['t', WILDCARD]).get(
+        'a', positions=True) == array('q', [0])
+
+
+def test_path_index_args():
+    with pytest.raises(TypeError):
+        PathIndex([])
+    with pytest.raises(TypeError):
+        PathIndex([], ['a'], sort=True)
+    index = PathIndex(iter([{'a': 1}]), ['a'])
+    assert index.records == [{'a': 1}] and 1 in index and len(index) == 1
+    assert repr(index) == "<PathIndex ['a']: 1 keys, 1 records>"
+
+
+def test_query_jsonl_path_like(tmp_path):
+    path = tmp_path / 'x.jsonl'
+    path.write_text(u'{"user": {"id": 1}}\n{"user": {"id": 2}}\n')
+    expected = [(1,), (2,)]
+    assert list(query_jsonl(path, [['user', 'id']])) == expected
+    assert list(query_jsonl(str(path), [['user', 'id']])) == expected
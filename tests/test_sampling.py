@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from collections import Counter
+from itertools import combinations
+from itertools import islice
+import random
+
+import pytest
+
+from splendid.sampling import CombinationSampler
+from splendid.sampling import CombinationWithReplacementSampler
+from splendid.sampling import PermutationSampler
+from splendid.sampling import ProductSampler
+from splendid.sampling import randbool_stream
+from splendid.sampling import randbools
+
+
+def test_randbools_fair():
+    values = randbools(100000, rng=random.Random(1))
+    assert len(values) == 100000
+    assert set(values) == {True, False}
+    assert 49000 < sum(values) < 51000
+
+
+@pytest.mark.parametrize('p', [0.01, 0.1, 0.25, 0.3, 0.9])
+def test_randbools_biased(p):
+    n = 100000
+    values = randbools(n, p=p, rng=random.Random(2))
+    # within ~5 standard deviations
+    assert abs(sum(values) - n * p) < 5 * (n * p * (1 - p)) ** .5
+
+
+def test_randbools_extreme_p():
+    assert randbools(100, p=0) == [False] * 100
+    assert randbools(100, p=1) == [True] * 100
+    assert randbools(0) == []
+    assert sum(randbools(10000, p=1e-30)) == 0
+    with pytest.raises(ValueError):
+        randbools(10, p=1.5)
+    with pytest.raises(ValueError):
+        randbools(-1)
+    with pytest.raises(ValueError):
+        randbools(10, out='foo')
+
+
+def test_randbools_reproducible_and_outputs_agree():
+    values = randbools(1001, p=0.3, rng=random.Random(3))
+    assert values == randbools(1001, p=0.3, rng=random.Random(3))
+    ba = randbools(1001, p=0.3, rng=random.Random(3), out='bytearray')
+    assert list(map(bool, ba)) == values
+    packed = randbools(1001, p=0.3, rng=random.Random(3), out='packed')
+    assert len(packed) == 126
+    unpacked = [bool(packed[i >> 3] >> (i & 7) & 1) for i in range(1001)]
+    assert unpacked == values
+
+
+def test_randbool_stream():
+    stream = randbool_stream(p=0.2, rng=random.Random(4), blocksize=64)
+    values = list(islice(stream, 10000))
+    assert len(values) == 10000
+    assert 1800 < sum(values) < 2200
+    with pytest.raises(ValueError):
+        randbool_stream(p=-1)
+
+
+def test_samplers_reproducible():
+    for cls, args in [
+        (ProductSampler, ('abc', range(10))),
+        (PermutationSampler, (range(10), 3)),
+        (CombinationSampler, (range(10), 3)),
+        (CombinationWithReplacementSampler, (range(10), 3)),
+    ]:
+        a = cls(*args, seed=5)
+        b = cls(*args, rng=random.Random(5))
+        assert a.sample(100) == b.sample(100)
+        assert a() == b()
+        assert list(islice(a, 10)) == list(islice(b, 10))
+        with pytest.raises(ValueError):
+            cls(*args, rng=random.Random(5), seed=5)
+
+
+def test_product_sampler():
+    sampler = ProductSampler('ab', repeat=3, seed=1)
+    samples = sampler.sample(1000)
+    assert len(samples) == 1000
+    assert all(len(s) == 3 and set(s) <= set('ab') for s in samples)
+    assert len(set(samples)) == 8
+    assert ProductSampler(seed=1).sample(2) == [(), ()]
+    with pytest.raises(ValueError):
+        ProductSampler('ab', [])
+
+
+def test_permutation_sampler():
+    sampler = PermutationSampler('abcdef', 4, seed=2)
+    for s in sampler.sample(1000):
+        assert len(set(s)) == 4 and set(s) <= set('abcdef')
+    assert sorted(PermutationSampler('abc', seed=2)()) == ['a', 'b', 'c']
+    with pytest.raises(ValueError):
+        PermutationSampler('abc', 4)
+
+
+def test_combination_sampler_uniform():
+    sampler = CombinationSampler('abcde', 2, seed=3)
+    counts = Counter(sampler.sample(10000))
+    assert set(counts) == set(combinations('abcde', 2))
+    assert all(800 < c < 1200 for c in counts.values())
+    with pytest.raises(ValueError):
+        CombinationSampler('abc', 4)
+
+
+def test_combination_with_replacement_sampler():
+    sampler = CombinationWithReplacementSampler('abc', 5, seed=4)
+    for s in sampler.sample(1000):
+        assert len(s) == 5 and list(s) == sorted(s)
+    assert CombinationWithReplacementSampler('', 0).sample(1) == [()]
+    with pytest.raises(ValueError):
+        CombinationWithReplacementSampler('', 1)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from array import array
+from collections import deque
+from itertools import groupby
+from itertools import islice
+
+import pytest
+
+from splendid.itertools_recipies import all_equal
+from splendid.itertools_recipies import consume
+from splendid.itertools_recipies import nth
+from splendid.itertools_recipies import quantify
+from splendid.itertools_recipies import take
+
+
+SEQUENCES = [
+    [],
+    [0, 1, 0, 2, None, '', 'x'],
+    [3, 3, 3],
+    (1, 1, 0),
+    'aaa',
+    u'\xe9t\xe9',
+    b'',
+    b'\x00ab',
+    bytearray(b'bbb'),
+    range(7),
+    range(5, 6),
+    array('d', [0., -0., 1.5, float('nan')]),
+    array('i', [2, 2]),
+]
+
+
+def plain_all_equal(iterable):
+    g = groupby(iterable)
+    return next(g, True) and not next(g, False)
+
+
+class MyList(list):
+    def __iter__(self):
+        return iter(reversed(self))
+
+
+@pytest.mark.parametrize('seq', SEQUENCES, ids=repr)
+def test_same_results_as_iterating(seq):
+    for n in [0, 1, 2, 3, 100]:
+        # (repr, as nan != nan)
+        assert repr(take(n, seq)) == repr(list(islice(seq, n)))
+        assert repr(nth(seq, n, 'd')) == repr(next(islice(seq, n, None), 'd'))
+    assert all_equal(seq) == plain_all_equal(iter(seq))
+    assert quantify(seq) == sum(map(bool, seq))
+    consume(seq, 2)
+    consume(seq, None)
+    assert repr(list(seq)) == repr(list(iter(seq)))
+
+
+@pytest.mark.parametrize('seq', SEQUENCES, ids=repr)
+def test_seek_iterators(seq):
+    for n in [0, 1, 2, 3, 100, None]:
+        it, ref = iter(seq), iter(seq)
+        next(it, None), next(ref, None)
+        consume(it, n)
+        deque(islice(ref, n), maxlen=0)
+        assert repr(list(it)) == repr(list(ref))
+        it, ref = iter(seq), iter(seq)
+        if n is not None:
+            assert repr(nth(it, n, 'd')) == repr(
+                next(islice(ref, n, None), 'd'))
+            assert repr(list(it)) == repr(list(ref))
+
+
+def test_exhausted_iterator_releases_sequence():
+    it = iter([1, 2, 3])
+    consume(it, 5)
+    assert it.__reduce__()[1] == ([],)
+    consume(it, 1)
+    assert nth(it, 0) is None
+
+
+def test_invalid_n_still_raises():
+    for seq in [[1, 2], iter([1, 2])]:
+        with pytest.raises(ValueError):
+            take(-1, seq)
+        with pytest.raises(ValueError):
+            nth(seq, -1)
+        with pytest.raises(ValueError):
+            consume(iter(seq), -1)
+
+
+def test_subclasses_and_others_iterate():
+    l = MyList([1, 2, 3])
+    assert take(2, l) == [3, 2] and nth(l, 0) == 3
+    d = deque([1, 2, 3])
+    assert take(2, d) == [1, 2] and nth(d, 2) == 3 and not all_equal(d)
+
+
+def test_all_equal_identity_and_nan():
+    nan = float('nan')
+    assert all_equal([nan, nan]) == plain_all_equal([nan, nan]) is True
+    assert all_equal([nan, float('nan')]) is False
+    assert all_equal([1, 2, 1]) is False
+    assert all_equal([1, 1.0, True]) is True
+
+
+def test_quantify_pred():
+    assert quantify(range(10), lambda x: x > 6) == 3
+    assert quantify(b'\x00\x01\x02', lambda x: x == 2) == 1
+
+
+def test_numpy():
+    np = pytest.importorskip('numpy')
+    arr = np.arange(10)
+    assert take(3, arr) == [0, 1, 2] and nth(arr, 9) == 9
+    assert nth(arr, 10) is None
+    assert quantify(arr) == 9 and not all_equal(arr)
+    assert all_equal(np.zeros(5)) and all_equal(np.zeros(0))
+    grid = np.zeros((2, 3))
+    assert nth(grid, 1).tolist() == [0, 0, 0] and len(take(5, grid)) == 2
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import pytest
+
+from splendid.itertools_recipies import unique_everseen
+from splendid.sets import BloomFilter
+from splendid.sets import LRUSet
+
+
+def test_lru_set_window():
+    s = LRUSet(3)
+    for i in range(10):
+        assert not s.test_and_add(i)
+    assert sorted(s) == [7, 8, 9]
+    assert s.evictions == 7
+    assert s.test_and_add(7)  # refreshes 7
+    s.add(10)
+    assert 7 in s and 8 not in s
+    stats = s.stats()
+    assert stats['len'] == 3 and stats['maxsize'] == 3
+    assert stats['memory_usage'] > 0
+    with pytest.raises(ValueError):
+        LRUSet(0)
+
+
+def test_bloom_filter_no_false_negatives_and_error_rate():
+    bf = BloomFilter(capacity=20000, error_rate=0.01)
+    for i in range(20000):
+        bf.add(('id', i))
+    assert all(('id', i) in bf for i in range(20000))
+    false_positives = sum(('other', i) in bf for i in range(20000))
+    assert false_positives < 2 * 0.01 * 20000
+    stats = bf.stats()
+    assert 0.005 < stats['estimated_error_rate'] < 0.02
+    assert stats['memory_usage'] == len(bf._bits)
+    assert 19000 < len(bf) <= 20000
+    bf.clear()
+    assert len(bf) == 0 and ('id', 0) not in bf
+    with pytest.raises(ValueError):
+        BloomFilter(10, error_rate=0)
+
+
+def test_unique_everseen_max_seen():
+    data = [1, 2, 1, 3, 4, 5, 1, 5]
+    assert list(unique_everseen(data)) == [1, 2, 3, 4, 5]
+    assert list(unique_everseen(data, max_seen=3)) == [1, 2, 3, 4, 5, 1]
+    assert list(unique_everseen(
+        'aAbBcCa', key=str.lower, max_seen=2)) == ['a', 'b', 'c', 'a']
+    with pytest.raises(ValueError):
+        list(unique_everseen(data, max_seen=2, seen=set()))
+
+
+def test_unique_everseen_seen():
+    seen = {1}
+    assert list(unique_everseen([1, 2, 2, 3], seen=seen)) == [2, 3]
+    assert seen == {1, 2, 3}
+
+    class AddContains(object):
+        def __init__(self):
+            self.items = []
+
+        def add(self, x):
+            self.items.append(x)
+
+        def __contains__(self, x):
+            return x in self.items
+
+    ac = AddContains()
+    assert list(unique_everseen('abab', seen=ac)) == ['a', 'b']
+    assert ac.items == ['a', 'b']
+
+    bf = BloomFilter(capacity=1000, error_rate=0.001)
+    res = list(unique_everseen(
+        [i % 100 for i in range(1000)], key=str, seen=bf))
+    assert res == list(range(100))
+    assert len(bf) == 100
+
+
+def test_bloom_filter_int_hash_collisions():
+    # hash(-1) == hash(-2) and hash(2 ** 61 - 1) == hash(0)
+    elements = [-1, -2, 0, 2 ** 61 - 1, (1 << 64) - 1, -(1 << 63)]
+    assert list(unique_everseen(
+        elements, seen=BloomFilter(10 ** 6, 1e-9))) == elements
+    bf = BloomFilter(100, 1e-9)
+    bf.add(1)
+    bf.add(u'\xe9')
+    assert True in bf and 1.0 in bf and 2.5 not in bf
+    assert u'\xe9' in bf and u'\xe9'.encode('utf-8') not in bf
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from itertools import count
+from itertools import islice
+import operator
+import pickle
+
+import pytest
+
+import splendid
+from splendid import chunker
+from splendid.itertools_recipies import flatten
+from splendid.itertools_recipies import pairwise
+from splendid.itertools_recipies import unique_everseen
+from splendid.stream import Stream
+from splendid.stream import _Fused
+from splendid.windows import windowed
+
+
+def double(x):
+    return 2 * x
+
+
+def is_odd(x):
+    return x % 2
+
+
+def test_fused_pipeline_matches_hand_chained():
+    data = list(range(-50, 50))
+    expected = list(islice(unique_everseen(flatten(chunker(
+        map(str, filter(is_odd, map(abs, map(double, filter(bool, data))))),
+        7)), key=len), 5))
+    s = (Stream(data, batch_size=3).filter(bool).map(double).map(abs)
+         .filter(is_odd).map(str).chunk(7).flatten().unique(key=len).take(5))
+    assert list(s) == expected
+    # a stream can be iterated again (if its source can)
+    assert s.to_list() == expected
+
+
+def test_stages():
+    s = Stream(range(6))
+    assert s.chunk(4, fillvalue=0).to_list() == [[0, 1, 2, 3], [4, 5, 0, 0]]
+    assert s.chunk(4, fillvalue=0).flatten().to_list() == [
+        0, 1, 2, 3, 4, 5, 0, 0]
+    assert s.window(3, step=2).to_list() == list(windowed(
+        iter(range(6)), 3, step=2))
+    assert s.pairwise().to_list() == list(pairwise(range(6)))
+    assert s.take(0).to_list() == []
+    assert s.map(operator.neg).take(2).to_list() == [0, -1]
+
+
+def test_explain():
+    s = Stream(count()).map(abs).chunk(3).flatten().filter(is_odd).map(str)
+    assert s.explain() == (
+        'Stream(count(0))\n'
+        '  fused(map(abs), filter(is_odd), map(str)) in batches of 1024')
+    s = Stream(range(10)).window(2, partial=True).take(4).take(9)
+    assert s.explain().splitlines()[1:] == [
+        '  window(2, partial=True)', '  take(4)']
+
+
+def test_infinite_source():
+    s = Stream(count(), batch_size=10).map(double).filter(bool).map(abs)
+    assert list(islice(s, 3)) == [2, 4, 6]
+    assert list(Stream(count(), batch_size=10).map(double).map(str).take(
+        3)) == ['0', '2', '4']
+
+
+def test_batch_size_read_ahead():
+    seen = []
+
+    def record(x):
+        seen.append(x)
+        return x
+    it = iter(Stream(range(100), batch_size=1).map(record).map(double))
+    assert next(it) == 0 and seen == [0]
+    it = iter(Stream(range(100), batch_size=10).map(record).map(double))
+    assert next(it) == 0 and len(seen) == 11
+    with pytest.raises(ValueError):
+        Stream([], batch_size=0)
+
+
+def test_fused_pickle():
+    fused = _Fused([('map', double), ('filter', is_odd), ('map', abs)])
+    assert fused([1, 2]) == []
+    clone = pickle.loads(pickle.dumps(fused))
+    assert clone([1, 2]) == [] and clone.stages == fused.stages
+
+
+def test_parallel():
+    s = Stream(range(1000)).map(operator.neg).filter(is_odd).map(abs)
+    expected = s.chunk(10).to_list()
+    assert list(s.chunk(10).parallel(4, chunksize=64)) == expected
+    assert sorted(s.parallel(2, chunksize=64, ordered=False)) == sorted(
+        flatten(expected))
+    assert list(s.parallel(2, chunksize=100, executor='process')) == list(s)
+
+
+def test_lazy_toplevel_name():
+    assert splendid.Stream is Stream
+    assert 'Stream' in dir(splendid)
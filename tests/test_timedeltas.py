@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import datetime
+import random
+
+from splendid import timedelta_to_microseconds
+from splendid import timedelta_to_ms
+from splendid import timedelta_to_s
+from splendid.timedeltas import datetime_diffs_to_ms
+from splendid.timedeltas import timedeltas_to_microseconds
+from splendid.timedeltas import timedeltas_to_ms
+from splendid.timedeltas import timedeltas_to_s
+
+
+def random_timedeltas(n):
+    r = random.Random(42)
+    return [
+        datetime.timedelta(
+            days=r.randint(-1000, 1000),
+            seconds=r.randint(0, 86399),
+            microseconds=r.randint(0, 999999))
+        for _ in range(n)
+    ]
+
+
+def test_batch_equals_scalar():
+    tds = random_timedeltas(1000)
+    assert list(timedeltas_to_microseconds(tds)) == \
+        [timedelta_to_microseconds(td) for td in tds]
+    assert list(timedeltas_to_ms(tds)) == [timedelta_to_ms(td) for td in tds]
+    assert timedeltas_to_s(tds, out='list') == \
+        [timedelta_to_s(td) for td in tds]
+
+
+def test_datetime_diffs():
+    start = datetime.datetime(2017, 1, 1)
+    tds = random_timedeltas(100)
+    ends = [start + td for td in tds]
+    assert list(datetime_diffs_to_ms(ends, [start] * 100)) == \
+        [timedelta_to_ms(td) for td in tds]
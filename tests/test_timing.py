@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import math
+import time
+
+from splendid.timing import Benchmark
+from splendid.timing import BenchmarkResult
+from splendid.timing import welch_t_test
+
+
+def test_percentiles():
+    r = BenchmarkResult(range(101))
+    assert (r.min, r.median, r.p90, r.p99, r.max) == (0, 50, 90, 99, 100)
+    assert r.percentile(12.5) == 12.5
+
+
+def test_welch_t_test_p_value():
+    # with one sample each of size 2 and equal variances df == 2 and the
+    # t distribution has the closed form cdf of t / sqrt(2 + t**2)
+    a = BenchmarkResult([1., 3.])
+    b = BenchmarkResult([4., 6.])
+    t, df, p = welch_t_test(a, b)
+    assert math.isclose(t, -3 / math.sqrt(2))
+    assert math.isclose(df, 2)
+    assert math.isclose(p, 1 - abs(t) / math.sqrt(2 + t * t))
+
+
+def test_compare():
+    bench = Benchmark(repeat=5, loops=1, warmup=0)
+    c = bench.compare(time.sleep, time.sleep, .01)
+    assert .5 < c.speedup < 2
+
+    def slower(s):
+        time.sleep(s * 5)
+
+    c = bench.compare(slower, time.sleep, .01)
+    assert c.significant
+    assert c.speedup > 2
+    assert 'sleep vs. slower' in str(c)
+
+
+def test_gc_is_restored():
+    import gc
+    assert gc.isenabled()
+    Benchmark(repeat=2, loops=2).run(len, [])
+    assert gc.isenabled()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from array import array
+from fractions import Fraction
+import math
+import operator
+import random
+
+import pytest
+
+from splendid.vectors import dotproduct
+from splendid.vectors import dotproducts
+
+
+def test_dotproduct_exact():
+    rnd = random.Random(7)
+    v1 = [rnd.uniform(-1e10, 1e10) for _ in range(10000)]
+    v2 = [rnd.uniform(-1, 1) for _ in range(10000)]
+    products = list(map(operator.mul, v1, v2))
+    expected = math.fsum(products)
+    for blocksize in (1, 7, 4096, 20000):
+        # exact sum of each block, one rounding per block
+        for res in (dotproduct(v1, v2, blocksize=blocksize),
+                    dotproduct(iter(v1), iter(v2), blocksize=blocksize)):
+            assert math.isclose(res, expected, rel_tol=1e-13)
+    assert dotproduct(v1, v2, blocksize=len(v1)) == expected
+
+
+def test_dotproduct_types():
+    assert dotproduct([10 ** 20, 1], [10 ** 20, 1]) == 10 ** 40 + 1
+    assert dotproduct([2, 0.5], [3, 3]) == 7.5
+    res = dotproduct([Fraction(1, 3)] * 3, [1, 1, 1])
+    assert res == 1 and isinstance(res, Fraction)
+    assert dotproduct(array('d', [1, 2]), array('d', [3, 4])) == 11.
+    assert dotproduct([], []) == 0
+
+
+def test_dotproduct_truncates():
+    assert dotproduct(range(5), [1] * 3, blocksize=2) == 3
+    assert dotproduct([1] * 3, range(5), blocksize=2) == 3
+    assert dotproduct(iter(range(10)), iter(range(10)), blocksize=5) == 285
+
+
+def test_dotproduct_blocksize():
+    with pytest.raises(ValueError):
+        dotproduct([1], [1], blocksize=0)
+    with pytest.raises(ValueError):
+        dotproducts([[1]], [1], blocksize=0)
+
+
+def test_dotproducts():
+    rows = [[random.random() for _ in range(50)] for _ in range(20)]
+    vec = [random.random() for _ in range(50)]
+    assert list(dotproducts(rows, iter(vec), blocksize=8)) == [
+        dotproduct(row, vec, blocksize=8) for row in rows]
+    assert list(dotproducts(iter([]), [1])) == []
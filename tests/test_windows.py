@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from array import array
+from itertools import count
+from itertools import islice
+import random
+
+import pytest
+
+from splendid.windows import rolling_max
+from splendid.windows import rolling_mean
+from splendid.windows import rolling_min
+from splendid.windows import rolling_sum
+from splendid.windows import windowed
+
+
+def reference_windows(data, n, step, fillvalue, partial):
+    res = []
+    i = 0
+    while i + n <= len(data):
+        res.append(tuple(data[i:i + n]))
+        i += step
+    last_end = i - step + n if res else 0
+    if (partial or fillvalue is not None) and i < len(data) and (
+            not res or last_end < len(data)):
+        tail = tuple(data[i:])
+        if fillvalue is not None:
+            tail += (fillvalue,) * (n - len(tail))
+        res.append(tail)
+    return res
+
+
+def test_windowed_matches_reference():
+    r = random.Random(0)
+    for _ in range(1000):
+        data = list(range(r.randint(0, 12)))
+        n, step = r.randint(1, 5), r.randint(1, 7)
+        fillvalue = r.choice([None, -1])
+        partial = r.random() < .5
+        expected = reference_windows(data, n, step, fillvalue, partial)
+        args = (n, step, fillvalue, partial)
+        assert list(windowed(iter(data), *args)) == expected
+        assert [tuple(w) for w in windowed(data, *args)] == expected
+        assert [tuple(w) for w in windowed(tuple(data), *args)] == expected
+
+
+def test_windowed_views():
+    buf = bytearray(b'abcdef')
+    windows = list(windowed(buf, 3, step=2))
+    assert all(isinstance(w, memoryview) for w in windows)
+    buf[2] = ord('X')
+    assert [bytes(w) for w in windows] == [b'abX', b'Xde']
+    arr = array('i', range(5))
+    assert [w.tolist() for w in windowed(arr, 4)] == [[0, 1, 2, 3],
+                                                       [1, 2, 3, 4]]
+    assert list(windowed('abcd', 2, dtype=''.join)) == ['ab', 'bc', 'cd']
+
+
+def test_windowed_infinite_and_errors():
+    assert list(islice(windowed(count(), 3, step=5), 3)) == [
+        (0, 1, 2), (5, 6, 7), (10, 11, 12)]
+    with pytest.raises(ValueError):
+        windowed([], 0)
+    with pytest.raises(ValueError):
+        windowed([], 1, step=0)
+
+
+def test_rolling_aggregates():
+    r = random.Random(1)
+    data = [r.randint(-100, 100) for _ in range(1000)]
+    floats = [r.random() for _ in range(1000)]
+    for n in (1, 2, 7, 100):
+        windows = list(windowed(data, n))
+        assert list(rolling_sum(data, n)) == [sum(w) for w in windows]
+        assert list(rolling_min(iter(data), n)) == [min(w) for w in windows]
+        assert list(rolling_max(data, n)) == [max(w) for w in windows]
+        means = list(rolling_mean(floats, n))
+        for mean, w in zip(means, windowed(floats, n)):
+            assert abs(mean - sum(w) / n) < 1e-12
+    assert list(rolling_sum([1, 2], 3)) == []
+    assert list(rolling_max([], 3)) == []
+    with pytest.raises(ValueError):
+        rolling_min([], 0)